@@ -1,83 +1,198 @@
+import bisect
 import heapq
 import random
 import math
 from agents.agent import Agent
 from agents.registry import register_agent
-from simulation.game_utils import simulate_move_on_grid, calculate_heuristic
+from agents.search_budget import SearchBudget, BudgetExceeded, default_max_time_s
+from simulation.game_utils import simulate_move_on_grid, cached_heuristic, encode_grid, decode_grid
 
 @register_agent('a_star')
 class AStarAgent(Agent):
-    """A true best‐first (A*) agent with bounded depth."""
-    def __init__(self, game, depth_limit=5):
+    """
+    A true best‐first (A*) agent with bounded depth.
+
+    Boards are kept as packed 64-bit keys (see encode_grid) both on the open
+    list and in the closed set. The open list is capped at `max_open` entries,
+    evicting the worst-f entry when full. With `beam_width` > 0 the agent runs a
+    level-by-level beam search instead, keeping only the best `beam_width` nodes
+    per depth, which keeps depth limits of 8-10 cheap.
+    max_nodes / max_bytes / max_time_s bound each move (see SearchBudget); when
+    the budget runs out the best first move found so far is played. max_time_s
+    defaults to default_max_time_s(); pass 0 for an unbounded search.
+    """
+    def __init__(self, game, depth_limit=5, max_open=4096, beam_width=0, max_nodes=0, max_bytes=0, max_time_s=None):
         super().__init__(game)
         self.moves = ["UP", "RIGHT", "DOWN", "LEFT"]
         self.depth_limit = depth_limit
+        self.max_open = max(1, int(max_open))
+        self.beam_width = int(beam_width or 0)
+        if max_time_s is None:
+            max_time_s = default_max_time_s()
+        self.budget = SearchBudget(max_nodes, max_bytes, max_time_s)
 
     def get_move(self):
+        stats = self.begin_stats()
+        self.budget.start()
         valid = self.get_valid_moves()
         if not valid:
             raise ValueError("No valid moves available")
 
-        # A priority queue of (–f, g, grid, depth, first_move)
-        # we negate f because heapq is a min‐heap but we want max‐f first
-        open_heap = []
-        closed = {}  # grid‐tuple → best g seen
+        if self.beam_width > 0:
+            best_moves = self._beam_search(valid)
+        else:
+            best_moves = self._best_first_search(valid)
+        self.budget.record(stats)
+
+        # pick randomly among the top-scoring first moves
+        if best_moves:
+            return random.choice(best_moves)
+        else:
+            return random.choice(valid)
+
+    def _best_first_search(self, valid):
+        """Bounded A*: returns the first moves leading to the best f seen."""
+        # Open list of (f, g, board_key, depth, first_move) kept sorted by f,
+        # so the best entry is popped from the end and the worst from the front
+        open_list = []
+        closed = {}  # board key → best g seen
 
-        # Seed the heap with each one‐ply successor
+        # Seed the open list with each one‐ply successor
+        stats = self.stats
+        stats.nodes_expanded += 1
+        stats.max_depth = 1
         base_g = max(max(row) for row in self.game.grid)
         for m in valid:
             g_delta, changed, grid0 = self._simulate_and_cost(self.game.grid, m, base_g)
             if not changed:
                 continue
+            stats.children_generated += 1
+            stats.nodes_evaluated += 1
             g0 = g_delta
-            h0 = calculate_heuristic(grid0)
+            key0 = encode_grid(grid0)
+            h0 = cached_heuristic(grid0, key=key0)
             f0 = g0 + h0
-            tup0 = tuple(map(tuple, grid0))
-            closed[tup0] = g0
+            closed[key0] = g0
             # store depth=1 and remember the initial move
-            heapq.heappush(open_heap, (-f0, g0, grid0, 1, m))
+            self._push(open_list, (f0, g0, key0, 1, m))
 
         best_f = float('-inf')
         best_moves = []
 
         # Expand until frontier empty or we've drained our budget
-        while open_heap:
-            neg_f, g_total, grid, depth, first_move = heapq.heappop(open_heap)
-            f = -neg_f
+        try:
+            while open_list:
+                f, g_total, key, depth, first_move = open_list.pop()
 
-            # record if this leaf is the best we've seen
-            if f > best_f:
-                best_f, best_moves = f, [first_move]
-            elif f == best_f:
-                best_moves.append(first_move)
+                # record if this leaf is the best we've seen
+                if f > best_f:
+                    best_f, best_moves = f, [first_move]
+                elif f == best_f:
+                    best_moves.append(first_move)
 
-            # don't expand past depth limit
-            if depth >= self.depth_limit:
+                # don't expand past depth limit
+                if depth >= self.depth_limit:
+                    continue
+
+                # otherwise expand children
+                self.budget.charge()
+                stats.nodes_expanded += 1
+                grid = decode_grid(key)
+                parent_g = max(max(row) for row in grid)
+                for m in self.moves:
+                    g_delta, changed, grid1 = self._simulate_and_cost(grid, m, parent_g)
+                    if not changed:
+                        continue
+
+                    stats.children_generated += 1
+                    g1 = g_total + g_delta
+                    key1 = encode_grid(grid1)
+
+                    if key1 in closed and closed[key1] >= g1:
+                        stats.cache_hits += 1
+                        continue
+
+                    closed[key1] = g1
+                    stats.nodes_evaluated += 1
+                    if depth + 1 > stats.max_depth:
+                        stats.max_depth = depth + 1
+                    h1 = cached_heuristic(grid1, key=key1)
+                    f1 = g1 + h1
+                    self._push(open_list, (f1, g1, key1, depth + 1, first_move))
+        except BudgetExceeded:
+            pass
+
+        return best_moves
+
+    def _push(self, open_list, entry):
+        """Insert into the sorted open list, evicting the worst-f entry past max_open."""
+        bisect.insort(open_list, entry)
+        if len(open_list) > self.max_open:
+            del open_list[0]
+
+    def _beam_search(self, valid):
+        """Beam search: keep the beam_width best nodes per depth, return best first moves."""
+        closed = {}  # board key → best g seen
+        beam = []  # (f, g, board_key, first_move)
+
+        stats = self.stats
+        stats.nodes_expanded += 1
+        stats.max_depth = 1
+        base_g = max(max(row) for row in self.game.grid)
+        for m in valid:
+            g_delta, changed, grid0 = self._simulate_and_cost(self.game.grid, m, base_g)
+            if not changed:
                 continue
+            stats.children_generated += 1
+            stats.nodes_evaluated += 1
+            key0 = encode_grid(grid0)
+            closed[key0] = g_delta
+            beam.append((g_delta + cached_heuristic(grid0, key=key0), g_delta, key0, m))
+        beam = heapq.nlargest(self.beam_width, beam)
 
-            # otherwise expand children
-            parent_g = max(max(row) for row in grid)
-            for m in self.moves:
-                g_delta, changed, grid1 = self._simulate_and_cost(grid, m, parent_g)
-                if not changed:
-                    continue
-                
-                g1 = g_total + g_delta
-                tup1 = tuple(map(tuple, grid1))
+        best_f = float('-inf')
+        best_moves = []
+        depth = 1
+        while beam:
+            for f, _, _, first_move in beam:
+                if f > best_f:
+                    best_f, best_moves = f, [first_move]
+                elif f == best_f:
+                    best_moves.append(first_move)
 
-                if tup1 in closed and closed[tup1] >= g1:
-                    continue
+            if depth >= self.depth_limit:
+                break
 
-                closed[tup1] = g1
-                h1 = calculate_heuristic(grid1)
-                f1 = g1 + h1
-                heapq.heappush(open_heap, (-f1, g1, grid1, depth + 1, first_move))
+            candidates = []
+            try:
+                for _, g_total, key, first_move in beam:
+                    self.budget.charge()
+                    stats.nodes_expanded += 1
+                    grid = decode_grid(key)
+                    parent_g = max(max(row) for row in grid)
+                    for m in self.moves:
+                        g_delta, changed, grid1 = self._simulate_and_cost(grid, m, parent_g)
+                        if not changed:
+                            continue
+                        stats.children_generated += 1
+                        g1 = g_total + g_delta
+                        key1 = encode_grid(grid1)
+                        if key1 in closed and closed[key1] >= g1:
+                            stats.cache_hits += 1
+                            continue
+                        closed[key1] = g1
+                        stats.nodes_evaluated += 1
+                        candidates.append((g1 + cached_heuristic(grid1, key=key1), g1, key1, first_move))
+            except BudgetExceeded:
+                # out of budget: the partially expanded level still counts as seen
+                pass
 
-        # pick randomly among the top-scoring first moves
-        if best_moves:
-            return random.choice(best_moves)
-        else:
-            return random.choice(valid)
+            beam = heapq.nlargest(self.beam_width, candidates)
+            depth += 1
+            if beam:
+                stats.max_depth = depth
+
+        return best_moves
 
     def _simulate_and_cost(self, grid, move, prev_g):
         """Helper: simulate move, return (g_delta, changed, new_grid).
@@ -85,8 +200,8 @@ class AStarAgent(Agent):
         new_grid, _, changed = simulate_move_on_grid(grid, move)
         if not changed:
             return 0, False, grid
-        
+
         new_g = max(max(row) for row in new_grid)
         g_delta = (new_g - prev_g) * 10
-        
+
         return g_delta, True, new_grid
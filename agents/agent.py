@@ -1,10 +1,29 @@
 from abc import ABC, abstractmethod
 from simulation.game_utils import simulate_move_on_grid
+from agents.search_stats import SearchStats
+from agents.search_budget import SearchBudget
 
 class Agent(ABC):
     def __init__(self, game):
         """Initialize the agent with a reference to the game instance."""
         self.game = game
+        # Search counters for the most recent get_move (see agents/search_stats.py)
+        self.stats = SearchStats(decisions=1)
+        # Per-move node / memory / time limits; unlimited unless a search agent sets them
+        self.budget = SearchBudget()
+
+    def reset(self):
+        """
+        Start a new game. Game.reset_grid reuses one agent instance for every game
+        with the same name and params, so expensive resources (weights, API
+        clients, tables) built in __init__ are kept; subclasses with per-game
+        state clear it here.
+        """
+        self.stats.reset()
+
+    def begin_stats(self):
+        """Reset and return the per-decision search stats. Called at the top of get_move."""
+        return self.stats.reset()
 
     def get_valid_moves(self):
         """
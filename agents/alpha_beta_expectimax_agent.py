@@ -1,48 +1,74 @@
 from agents.agent import Agent
 from agents.registry import register_agent
-from simulation.game_utils import simulate_move_on_grid, calculate_heuristic, get_empty_cells, is_terminal
+from agents.search_budget import SearchBudget, BudgetExceeded, default_max_time_s
+from simulation.game_utils import simulate_move_on_grid, cached_heuristic, get_empty_cells, is_terminal
 import random
 import math
 
 @register_agent('alpha_beta_expectimax')
 class AlphaBetaExpectimaxAgent(Agent):
-    """Agent using the Expectimax algorithm with alpha-beta pruning to handle randomness more efficiently."""
-    def __init__(self, game, depth=2):
+    """
+    Agent using the Expectimax algorithm with alpha-beta pruning to handle randomness more efficiently.
+    Per-move budgets work as in ExpectimaxAgent, including the default time limit.
+    """
+    def __init__(self, game, depth=2, max_nodes=0, max_bytes=0, max_time_s=None):
         super().__init__(game)
         self.search_depth = 2
+        self.root_depth = self.search_depth
+        if max_time_s is None:
+            max_time_s = default_max_time_s()
+        self.budget = SearchBudget(max_nodes, max_bytes, max_time_s)
 
     def get_move(self):
+        stats = self.begin_stats()
         valid_moves = self.get_valid_moves()
         
         if not valid_moves:
             raise ValueError("No valid moves available - game should be over")
             
         best_move = None
-        best_value = -float('inf')
-        alpha = -float('inf')
-        beta = float('inf')
 
         current_grid = self.game.grid
         current_score = self.game.score
+        stats.nodes_expanded += 1
+        stats.children_generated += len(valid_moves)
+
+        budget = self.budget.start()
+        depths = range(1, self.search_depth + 1) if budget.limited else (self.search_depth,)
+        try:
+            for depth in depths:
+                best_move = self._best_root_move(current_grid, current_score, valid_moves, depth)
+        except BudgetExceeded:
+            # keep the move from the last depth that finished
+            budget.record(stats)
+
+        if best_move is None and valid_moves:
+            best_move = valid_moves[0]
+        
+        return best_move
 
+    def _best_root_move(self, grid, score, valid_moves, depth):
+        """ Runs the pruned expectimax below each root move with the given depth and returns the best move. """
+        self.root_depth = depth
+        best_move = None
+        best_value = -float('inf')
+        alpha = -float('inf')
+        beta = float('inf')
         for move in valid_moves:
-            sim_grid, score_increase, _ = simulate_move_on_grid(current_grid, move)
-            value = self._chance_node(sim_grid, current_score + score_increase, self.search_depth, alpha, beta)
+            sim_grid, score_increase, _ = simulate_move_on_grid(grid, move)
+            value = self._chance_node(sim_grid, score + score_increase, depth, alpha, beta)
 
             if value > best_value:
                 best_value = value
                 best_move = move
             alpha = max(alpha, best_value)
-
-        if best_move is None and valid_moves:
-            best_move = valid_moves[0]
-        
         return best_move
 
     def _max_node(self, grid, score, depth, alpha, beta):
         """ Represents the player's turn (maximizing node). """
+        self.budget.charge()
         if depth == 0 or is_terminal(grid):
-            return calculate_heuristic(grid, score)
+            return self._evaluate(grid, score)
 
         max_value = -float('inf')
         
@@ -53,8 +79,10 @@ class AlphaBetaExpectimaxAgent(Agent):
                 valid_moves.append(move)
         
         if not valid_moves:
-            return calculate_heuristic(grid, score)
+            return self._evaluate(grid, score)
 
+        self.stats.nodes_expanded += 1
+        self.stats.children_generated += len(valid_moves)
         for move in valid_moves:
             sim_grid, score_increase, _ = simulate_move_on_grid(grid, move)
             max_value = max(max_value, self._chance_node(sim_grid, score + score_increase, depth - 1, alpha, beta))
@@ -68,15 +96,21 @@ class AlphaBetaExpectimaxAgent(Agent):
 
     def _chance_node(self, grid, score, depth, alpha, beta):
         """ Represents the environment's turn (random tile spawn). """
+        self.budget.charge()
+        ply = self.root_depth - depth + 1  # player moves made to reach this node
+        if ply > self.stats.max_depth:
+            self.stats.max_depth = ply
         if depth == 0 or is_terminal(grid):
-            return calculate_heuristic(grid, score)
+            return self._evaluate(grid, score)
 
         empty_cells = get_empty_cells(grid)
         if not empty_cells:
-            return calculate_heuristic(grid, score)
+            return self._evaluate(grid, score)
 
         expected_value = 0
         num_empty = len(empty_cells)
+        self.stats.nodes_expanded += 1
+        self.stats.children_generated += 2 * num_empty
 
         # Consider placing a 2 (90% probability)
         prob_2 = 0.9 / num_empty
@@ -94,4 +128,9 @@ class AlphaBetaExpectimaxAgent(Agent):
             child_value = self._max_node(grid_with_4, score, depth, alpha, beta)
             expected_value += prob_4 * child_value
 
-        return expected_value
\ No newline at end of file
+        return expected_value
+
+    def _evaluate(self, grid, score):
+        """ Leaf evaluation with the shared (optionally cached) heuristic. """
+        self.stats.nodes_evaluated += 1
+        return cached_heuristic(grid, score)
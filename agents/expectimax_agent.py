@@ -1,15 +1,27 @@
 from agents.agent import Agent
 from agents.registry import register_agent
-from simulation.game_utils import simulate_move_on_grid, calculate_heuristic, get_empty_cells, is_terminal
+from agents.search_budget import SearchBudget, BudgetExceeded, default_max_time_s
+from simulation.game_utils import simulate_move_on_grid, cached_heuristic, get_empty_cells, is_terminal
 
 @register_agent('expectimax')
 class ExpectimaxAgent(Agent):
-    """Agent using the Expectimax algorithm to handle randomness."""
-    def __init__(self, game, depth=5):
+    """
+    Agent using the Expectimax algorithm to handle randomness.
+    max_nodes / max_bytes / max_time_s bound each move (see SearchBudget). With a
+    budget set, the search deepens one ply at a time so that running out falls
+    back to the move of the deepest fully searched depth. max_time_s defaults to
+    default_max_time_s() (SEARCH_MAX_TIME_S, 5 s); pass 0 for an unbounded search.
+    """
+    def __init__(self, game, depth=5, max_nodes=0, max_bytes=0, max_time_s=None):
         super().__init__(game)
         self.search_depth = depth
+        self.root_depth = depth
+        if max_time_s is None:
+            max_time_s = default_max_time_s()
+        self.budget = SearchBudget(max_nodes, max_bytes, max_time_s)
 
     def get_move(self):
+        stats = self.begin_stats()
         valid_moves = self.get_valid_moves()
         
         # If there are no valid moves, the game should be over
@@ -17,18 +29,20 @@ class ExpectimaxAgent(Agent):
             raise ValueError("No valid moves available - game should be over")
             
         best_move = None
-        best_value = -float('inf')
 
         current_grid = self.game.grid
         current_score = self.game.score
+        stats.nodes_expanded += 1
+        stats.children_generated += len(valid_moves)
 
-        for move in valid_moves:
-            sim_grid, score_increase, _ = simulate_move_on_grid(current_grid, move)
-            value = self._chance_node(sim_grid, current_score + score_increase, self.search_depth)
-
-            if value > best_value:
-                best_value = value
-                best_move = move
+        budget = self.budget.start()
+        depths = range(1, self.search_depth + 1) if budget.limited else (self.search_depth,)
+        try:
+            for depth in depths:
+                best_move = self._best_root_move(current_grid, current_score, valid_moves, depth)
+        except BudgetExceeded:
+            # keep the move from the last depth that finished
+            budget.record(stats)
 
         # Fallback if no move is found (shouldn't happen since we checked for valid moves)
         if best_move is None and valid_moves:
@@ -36,10 +50,25 @@ class ExpectimaxAgent(Agent):
         
         return best_move
 
+    def _best_root_move(self, grid, score, valid_moves, depth):
+        """ Runs expectimax below each root move with the given depth and returns the best move. """
+        self.root_depth = depth
+        best_move = None
+        best_value = -float('inf')
+        for move in valid_moves:
+            sim_grid, score_increase, _ = simulate_move_on_grid(grid, move)
+            value = self._chance_node(sim_grid, score + score_increase, depth)
+
+            if value > best_value:
+                best_value = value
+                best_move = move
+        return best_move
+
     def _max_node(self, grid, score, depth):
         """ Represents the player's turn (maximizing node). """
+        self.budget.charge()
         if depth == 0 or is_terminal(grid):
-            return calculate_heuristic(grid, score)
+            return self._evaluate(grid, score)
 
         max_value = -float('inf')
         
@@ -52,8 +81,10 @@ class ExpectimaxAgent(Agent):
         
         # If no valid moves, this is a terminal state
         if not valid_moves:
-            return calculate_heuristic(grid, score)
+            return self._evaluate(grid, score)
 
+        self.stats.nodes_expanded += 1
+        self.stats.children_generated += len(valid_moves)
         for move in valid_moves:
             sim_grid, score_increase, _ = simulate_move_on_grid(grid, move)
             # After the player moves, it's the environment's turn (CHANCE node)
@@ -63,16 +94,22 @@ class ExpectimaxAgent(Agent):
 
     def _chance_node(self, grid, score, depth):
         """ Represents the environment's turn (random tile spawn). """
+        self.budget.charge()
+        ply = self.root_depth - depth + 1  # player moves made to reach this node
+        if ply > self.stats.max_depth:
+            self.stats.max_depth = ply
         if depth == 0 or is_terminal(grid): # Terminal check might be redundant if called after valid move
-            return calculate_heuristic(grid, score)
+            return self._evaluate(grid, score)
 
         empty_cells = get_empty_cells(grid)
         if not empty_cells:
              # If no empty cells after a move, shouldn't happen in standard 2048 unless game over
-             return calculate_heuristic(grid, score) 
+             return self._evaluate(grid, score) 
 
         expected_value = 0
         num_empty = len(empty_cells)
+        self.stats.nodes_expanded += 1
+        self.stats.children_generated += 2 * num_empty
 
         # Consider placing a 2 (90% probability)
         prob_2 = 0.9 / num_empty
@@ -90,4 +127,9 @@ class ExpectimaxAgent(Agent):
             # Next node is the player's turn (MAX node)
             expected_value += prob_4 * self._max_node(grid_with_4, score, depth)
 
-        return expected_value
\ No newline at end of file
+        return expected_value
+
+    def _evaluate(self, grid, score):
+        """ Leaf evaluation with the shared (optionally cached) heuristic. """
+        self.stats.nodes_evaluated += 1
+        return cached_heuristic(grid, score)
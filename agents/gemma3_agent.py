@@ -1,29 +1,28 @@
 import os
-import google.generativeai as genai
-from agents.llm_base_agent import LLMBaseAgent
+from agents.llm_base_agent import LLMBaseAgent, LLMResponse
+from agents.llm_transport import get_gemini_model, gemini_request_options
 from agents.registry import register_agent
 
 @register_agent('gemma3')
 class Gemma3Agent(LLMBaseAgent):
     """Agent that uses Google's Gemma 3 model to play 2048."""
     
-    def __init__(self, game):
-        super().__init__(game)
+    provider = "google"
+    model_name = "gemma-3b"
+    llm_params = {
+        "temperature": 0.2,  # Lower temperature for more consistent outputs
+        "max_output_tokens": 10,  # Short response with just the move
+    }
+
+    def __init__(self, game, **llm_options):
+        super().__init__(game, **llm_options)
         
         # Configure the Gemini API with API key from environment
         api_key = os.getenv("GEMINI_API_KEY")  # Same API key as Gemini
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable is not set")
         
-        genai.configure(api_key=api_key)
-        
-        # Initialize model using Gemma 3
-        self.model = genai.GenerativeModel('gemma-3b',
-            generation_config={
-                "temperature": 0.2,  # Lower temperature for more consistent outputs
-                "max_output_tokens": 10,  # Short response with just the move
-            },
-        )
+        self.api_key = api_key
     
     def call_llm(self, prompt):
         """
@@ -49,8 +48,18 @@ class Gemma3Agent(LLMBaseAgent):
             },
         ]
         
-        response = self.model.generate_content(
+        # configured once and shared per process (see agents/llm_transport.py)
+        model = get_gemini_model(self.api_key, self.model_name, self.llm_params)
+        response = model.generate_content(
             prompt,
-            safety_settings=safety_settings
+            safety_settings=safety_settings,
+            generation_config=self.request_params(prompt),
+            request_options=gemini_request_options()
         )
-        return response.text 
\ No newline at end of file
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            response.text,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0),
+            cached_tokens=getattr(usage, "cached_content_token_count", 0),
+            completion_tokens=getattr(usage, "candidates_token_count", 0),
+        ) 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from agents.agent import Agent
 from agents.registry import register_agent
-from simulation.game_utils import simulate_move_on_grid, calculate_heuristic
+from simulation.game_utils import simulate_move_on_grid, cached_heuristic
 import copy
 
 @register_agent('greedy_bfs')
@@ -8,11 +8,17 @@ class GreedyBFSAgent(Agent):
     """Agent that chooses the move leading to the best state based on a heuristic (1-ply lookahead)."""
 
     def get_move(self):
+        stats = self.begin_stats()
         valid_moves = self.get_valid_moves()
         
         # If there are no valid moves, the game should be over
         if not valid_moves:
             raise ValueError("No valid moves available - game should be over")
+
+        stats.nodes_expanded = 1
+        stats.children_generated = len(valid_moves)
+        stats.nodes_evaluated = len(valid_moves)
+        stats.max_depth = 1
             
         best_move = None
         best_heuristic_value = -float('inf')
@@ -25,7 +31,7 @@ class GreedyBFSAgent(Agent):
             simulated_grid, score_increase, _ = simulate_move_on_grid(current_grid, move)
             
             # Calculate the heuristic value for this move
-            heuristic_value = calculate_heuristic(simulated_grid, current_score + score_increase)
+            heuristic_value = cached_heuristic(simulated_grid, current_score + score_increase)
 
             if heuristic_value > best_heuristic_value:
                 best_heuristic_value = heuristic_value
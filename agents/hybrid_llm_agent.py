@@ -0,0 +1,117 @@
+from agents.agent import Agent
+from agents.greedy_bfs_agent import GreedyBFSAgent
+from agents.llm_base_agent import LLMBaseAgent
+from agents.registry import register_agent, get_agent_with_params
+from simulation.game_utils import simulate_move_on_grid, cached_heuristic
+
+@register_agent('hybrid_llm')
+class HybridLLMAgent(Agent):
+    """
+    Plays most moves with a cheap agent and asks an LLM agent only at critical
+    positions.
+
+    Each valid move's afterstate is scored with the heuristic. A position is
+    critical when the two best scores are within `margin` of each other
+    (relative to the best), so the heuristic has no clear preference, or when
+    the board has at most `endgame_empty_cells` empty cells and a wrong move
+    can end the game. Critical positions go to the LLM agent (`llm_agent`, built
+    with `llm_params`, including its cache, deadline and batching options). All
+    other moves are the cheap agent's (`cheap_agent`, greedy_bfs by default). A
+    position with a single valid move is never critical. A greedy_bfs cheap agent
+    is not called at all: its move is the best-scored afterstate, already known.
+
+    The heuristic is dominated by its snake-weight term, so score gaps are tiny
+    relative to the scores. With the defaults (margin 1e-5, a full board as the
+    endgame) about one move in ten goes to the model in greedy-played games
+    (9.6% over 10 games).
+
+    stats.extras["llm_delegated_moves"] counts the moves the LLM made (0 or 1
+    per move, so runs report llm_delegation_rate), split into
+    llm_delegated_close and llm_delegated_endgame by the reason. The LLM agent's
+    own counters (calls, tokens, ...) are added to the same stats.
+    """
+
+    def __init__(self, game, llm_agent='gpt4o_mini', llm_params=None, cheap_agent='greedy_bfs', cheap_params=None,
+                 margin=1e-5, endgame_empty_cells=0):
+        super().__init__(game)
+        self.llm = get_agent_with_params(llm_agent, game, llm_params)
+        if self.llm is None:
+            raise ValueError(f"LLM agent '{llm_agent}' not found")
+        if not isinstance(self.llm, LLMBaseAgent):
+            raise ValueError(f"Agent '{llm_agent}' is not an LLM agent")
+        self.cheap = get_agent_with_params(cheap_agent, game, cheap_params)
+        if self.cheap is None:
+            raise ValueError(f"Cheap agent '{cheap_agent}' not found")
+        # greedy_bfs plays the heuristic's best afterstate, which _assess has already scored
+        self._cheap_is_greedy = type(self.cheap) is GreedyBFSAgent
+        self.margin = float(margin)
+        self.endgame_empty_cells = int(endgame_empty_cells)
+
+    def reset(self):
+        super().reset()
+        self.llm.reset()
+        self.cheap.reset()
+
+    def get_move(self):
+        reason, best_move = self._assess()
+        if reason is None:
+            return self._cheap_move(best_move)
+        return self._delegate(self.llm, self.llm.get_move(), reason)
+
+    async def get_move_async(self):
+        """get_move for the asyncio runner: only critical positions await the model."""
+        reason, best_move = self._assess()
+        if reason is None:
+            return self._cheap_move(best_move)
+        return self._delegate(self.llm, await self.llm.get_move_async(), reason)
+
+    def _cheap_move(self, best_move):
+        """The cheap agent's move; for greedy_bfs that is `best_move`, the best-scored afterstate."""
+        if self._cheap_is_greedy:
+            return best_move
+        return self._delegate(self.cheap, self.cheap.get_move())
+
+    def _assess(self):
+        """
+        (reason, best move): reason is 'close' or 'endgame' if the current position
+        should go to the LLM, else None. The best move is the valid move with the
+        highest heuristic score (ties to the first, as greedy_bfs), or None if the
+        scores weren't needed.
+        """
+        stats = self.begin_stats()
+        valid_moves = self.get_valid_moves()
+        if not valid_moves:
+            raise ValueError("No valid moves available - game should be over")
+
+        stats.nodes_expanded = 1
+        stats.children_generated = len(valid_moves)
+        stats.nodes_evaluated = len(valid_moves)
+        stats.max_depth = 1
+        stats.extras["llm_delegated_moves"] = 0
+        if len(valid_moves) == 1:
+            return None, valid_moves[0]
+
+        grid = self.game.grid
+        if sum(cell == 0 for row in grid for cell in row) <= self.endgame_empty_cells:
+            return "endgame", None
+
+        scores = []
+        for move in valid_moves:
+            simulated_grid, score_increase, _ = simulate_move_on_grid(grid, move)
+            scores.append(cached_heuristic(simulated_grid, self.game.score + score_increase))
+        best_move = valid_moves[scores.index(max(scores))]
+        scores.sort(reverse=True)
+        if scores[0] - scores[1] <= self.margin * max(abs(scores[0]), 1.0):
+            return "close", best_move
+        return None, best_move
+
+    def _delegate(self, agent, move, reason=None):
+        """Returns `move`, counting the delegate's work and the reason in this decision's stats."""
+        stats = self.stats
+        decisions = stats.decisions
+        stats.add(agent.stats)
+        stats.decisions = decisions
+        if reason:
+            stats.extras["llm_delegated_moves"] = 1
+            stats.extras[f"llm_delegated_{reason}"] = 1
+        return move
@@ -1,17 +1,44 @@
 import random
 from agents.agent import Agent
 from agents.registry import register_agent
-from simulation.game_utils import simulate_move_on_grid, calculate_heuristic
+from agents.search_budget import SearchBudget, BudgetExceeded, default_max_time_s
+from simulation.game_utils import simulate_move_on_grid, calculate_heuristic, cached_heuristic, encode_grid, decode_grid
+
+# Transposition table entry slots
+_F, _CHILDREN, _ITER, _BEST = range(4)
 
 @register_agent('ida_star')
 class IDAStartAgent(Agent):
-    """An iterative deepening A* (IDA*) agent with bounded depth."""
-    def __init__(self, game, depth_limit=5):
+    """
+    An iterative deepening A* (IDA*) agent with bounded depth.
+
+    A transposition table keyed by packed board (see encode_grid) lives for the
+    whole move, across threshold iterations. Per position it caches the f-value,
+    the successor keys and, for the current iteration, the best leaf f found
+    below it for each remaining depth searched. Re-deepening doesn't recompute
+    heuristics or moves, and a position reached again with the same remaining
+    depth reuses its result, so the search returns the same values as an
+    uncached one whatever the move order.
+    Holds at most `tt_size` positions; further positions are searched uncached.
+    Table hits are reported as stats.cache_hits, so the stats' cache_hit_rate is
+    the share of node visits that needed no heuristic evaluation.
+    max_nodes / max_bytes / max_time_s bound each move (see SearchBudget); when
+    the budget runs out the best leaf of the interrupted iteration is played.
+    max_time_s defaults to default_max_time_s(); pass 0 for an unbounded search.
+    """
+    def __init__(self, game, depth_limit=5, tt_size=100000, max_nodes=0, max_bytes=0, max_time_s=None):
         super().__init__(game)
         self.moves = ["UP", "RIGHT", "DOWN", "LEFT"]
         self.depth_limit = depth_limit
+        self.tt_size = int(tt_size)
+        if max_time_s is None:
+            max_time_s = default_max_time_s()
+        self.budget = SearchBudget(max_nodes, max_bytes, max_time_s)
 
     def get_move(self):
+        stats = self.begin_stats()
+        self.budget.start()
+        stats.extras = {"iterations": 0, "nodes_visited": 0, "tt_cutoffs": 0}
         valid = self.get_valid_moves()
         if not valid:
             raise ValueError("No valid moves available")
@@ -21,56 +48,118 @@ class IDAStartAgent(Agent):
         # initial A* bound = g(root) + h(root)
         threshold = base_g + calculate_heuristic(base_grid)
 
-        while True:
-            # for this iteration
-            self.next_threshold = float('inf')
-            self.best_f = float('-inf')
-            self.best_moves = []
-
-            # try each one-ply successor
-            for m in valid:
-                g_delta, changed, grid0 = self._simulate_and_cost(base_grid, m, base_g)
-                if not changed:
-                    continue
-                self._search(grid0, g_delta, depth=1, first_move=m, threshold=threshold)
-
-            # if any leaf under this threshold produced a best_f, pick among them
-            if self.best_moves:
-                return random.choice(self.best_moves)
-
-            # otherwise increase threshold to the smallest f that exceeded it
-            if self.next_threshold == float('inf'):
-                # no more nodes to try – fallback
-                return random.choice(valid)
-            threshold = self.next_threshold
-
-    def _search(self, grid, g_total, depth, first_move, threshold):
-        """Recursive DFS with f-cost pruning and tracking of best leafs."""
-        h = calculate_heuristic(grid)
-        f = g_total + h
+        self.tt = {}
+        self.iteration = 0
+
+        # one-ply successors don't change between iterations
+        stats.nodes_expanded += 1
+        roots = []
+        for m in valid:
+            g_delta, changed, grid0 = self._simulate_and_cost(base_grid, m, base_g)
+            if changed:
+                stats.children_generated += 1
+                roots.append((m, g_delta, encode_grid(grid0)))
+
+        try:
+            while True:
+                # for this iteration
+                self.iteration += 1
+                stats.extras["iterations"] = self.iteration
+                self.next_threshold = float('inf')
+                self.best_f = float('-inf')
+                self.best_moves = []
+
+                # try each one-ply successor
+                for m, g_delta, key0 in roots:
+                    self._search(key0, g_delta, depth=1, first_move=m, threshold=threshold)
+
+                # if any leaf under this threshold produced a best_f, pick among them
+                if self.best_moves:
+                    return random.choice(self.best_moves)
+
+                # otherwise increase threshold to the smallest f that exceeded it
+                if self.next_threshold == float('inf'):
+                    # no more nodes to try – fallback
+                    return random.choice(valid)
+                threshold = self.next_threshold
+        except BudgetExceeded:
+            self.budget.record(stats)
+            return random.choice(self.best_moves or valid)
+        finally:
+            self.tt = {}
+
+    def _search(self, key, g_total, depth, first_move, threshold):
+        """
+        Recursive DFS with f-cost pruning and tracking of best leafs.
+        Returns the best leaf f found below this node in the current iteration.
+        """
+        self.budget.charge()
+        stats = self.stats
+        stats.extras["nodes_visited"] += 1
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+
+        entry = self.tt.get(key)
+        if entry is None:
+            # g is path independent (it telescopes to the max tile gain), so f is per-position
+            entry = [g_total + cached_heuristic(None, key=key), None, 0, None]
+            stats.nodes_evaluated += 1
+            if len(self.tt) < self.tt_size:
+                self.tt[key] = entry
+        else:
+            stats.cache_hits += 1
+        remaining = self.depth_limit - depth
+        if entry[_ITER] != self.iteration:
+            entry[_ITER] = self.iteration
+            entry[_BEST] = {}  # remaining depth -> best leaf f below this position
+        elif remaining in entry[_BEST]:
+            # identical subtree already searched this iteration: reuse its result for this first move
+            stats.extras["tt_cutoffs"] += 1
+            best = entry[_BEST][remaining]
+            self._record_leaf(best, first_move)
+            return best
+        f = entry[_F]
 
         # f-cost exceeds our current bound → remember for next iteration
         if f > threshold:
             if f < self.next_threshold:
                 self.next_threshold = f
-            return
+            entry[_BEST][remaining] = float('-inf')
+            return float('-inf')
 
         # at depth limit: record as a candidate
-        if depth >= self.depth_limit:
-            if f > self.best_f:
-                self.best_f = f
-                self.best_moves = [first_move]
-            elif f == self.best_f:
-                self.best_moves.append(first_move)
-            return
-
-        # otherwise expand children
-        parent_g = max(max(row) for row in grid)
-        for m in self.moves:
-            g_delta, changed, grid1 = self._simulate_and_cost(grid, m, parent_g)
-            if not changed:
-                continue
-            self._search(grid1, g_total + g_delta, depth + 1, first_move, threshold)
+        if remaining <= 0:
+            self._record_leaf(f, first_move)
+            entry[_BEST][remaining] = f
+            return f
+
+        # otherwise expand children, once per move
+        children = entry[_CHILDREN]
+        if children is None:
+            stats.nodes_expanded += 1
+            grid = decode_grid(key)
+            parent_g = max(max(row) for row in grid)
+            children = []
+            for m in self.moves:
+                g_delta, changed, grid1 = self._simulate_and_cost(grid, m, parent_g)
+                if changed:
+                    stats.children_generated += 1
+                    children.append((g_delta, encode_grid(grid1)))
+            entry[_CHILDREN] = children
+
+        best = float('-inf')
+        for g_delta, key1 in children:
+            best = max(best, self._search(key1, g_total + g_delta, depth + 1, first_move, threshold))
+        entry[_BEST][remaining] = best
+        return best
+
+    def _record_leaf(self, f, first_move):
+        """Track the first moves leading to the best leaf f of this iteration."""
+        if f > self.best_f:
+            self.best_f = f
+            self.best_moves = [first_move]
+        elif f == self.best_f and f != float('-inf'):
+            self.best_moves.append(first_move)
 
     def _simulate_and_cost(self, grid, move, prev_g):
         """Same cost helper as in AStarAgent."""
@@ -80,4 +169,4 @@ class IDAStartAgent(Agent):
 
         new_g = max(max(row) for row in new_grid)
         g_delta = (new_g - prev_g) * 10
-        return g_delta, True, new_grid
\ No newline at end of file
+        return g_delta, True, new_grid
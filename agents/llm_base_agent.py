@@ -1,17 +1,169 @@
+import asyncio
+import concurrent.futures
 import os
+import re
+import threading
+import time
 from abc import abstractmethod
 from agents.agent import Agent
+from agents.llm_batching import get_prompt_batcher
+from agents.llm_cache import LLMResponseCache, get_llm_cache
+from agents.llm_rate_limit import RetryPolicy, get_rate_limiter, is_retryable
+from agents.llm_transport import transport_config
+from agents.registry import get_agent_with_params
 from simulation.game_utils import simulate_move_on_grid
 
+_MOVE_WORDS = re.compile(r"\b(UP|DOWN|LEFT|RIGHT)\b")
+_BATCH_ANSWER = re.compile(r"^\W*(?:BOARD\s*)?(\d+)\W+(UP|DOWN|LEFT|RIGHT)\b", re.M)
+
+RULES_TEXT = """You are a 2048 agent, an expert AI that plays the 2048 puzzle.
+
+GAME RULES
+- The board is a 4 x 4 grid of numbers (powers of 2).  
+- Each turn the player chooses one move: **UP, DOWN, LEFT, or RIGHT**.
+- After all tiles slide and merge per 2048 rules, a new tile (2 or 4) spawns in a random empty cell.  
+- The game is won when any tile reaches **2048**.  
+- The game is lost when no legal moves remain.
+
+OBJECTIVE
+Your goal is to win the game by creating a 2048 tile. 
+If you reach 2048, keep playing the game with the goal to reach higher maximum tiles, until no legal moves remain.
+You should try to follow the following strategies:
+1. **Moves with empty tiles**: Make moves that create empty tiles, especially earlier in the game.
+2. **Create a snake pattern**: Try to create a snake-like pattern in the grid, with the highest value starting in the upper left corner of the grid."""
+
+# How get_grid_representation writes a board, per board_format.
+BOARD_LEGENDS = {
+    "tiles": "Boards are written row by row from the top, one row per line, with tile values and \"_\" for an empty cell.",
+    "log2": "Boards are written row by row from the top, one row per line. Each cell is the exponent n of its tile 2^n "
+            "(1 = 2, 2 = 4, ..., 11 = 2048) and 0 for an empty cell.",
+}
+
+BATCH_INSTRUCTION = ("You are playing several separate games at once. For **each** board below, pick exactly one of its valid moves. "
+                     "Reply with one line per board in the form \"<board number>: <MOVE>\" (for example \"1: LEFT\"), "
+                     "in board order, and nothing else.")
+
+class LLMResponse(str):
+    """
+    A model's reply, with the token usage the provider reported for the call:
+    prompt_tokens, cached_tokens (the part of the prompt served from the
+    provider's prefix cache) and completion_tokens. call_llm may return one
+    instead of a plain string so the usage is counted in the move's stats.
+    """
+    def __new__(cls, text, prompt_tokens=0, cached_tokens=0, completion_tokens=0):
+        response = super().__new__(cls, text or "")
+        response.usage = {
+            "prompt_tokens": int(prompt_tokens or 0),
+            "cached_tokens": int(cached_tokens or 0),
+            "completion_tokens": int(completion_tokens or 0),
+        }
+        return response
+
+class LLMBatchPrompt(str):
+    """
+    A create_batch_prompt prompt, carrying the number of boards it asks about
+    so request_params and system_message can size the request without parsing
+    the text. Single-board prompts are plain strings.
+    """
+    def __new__(cls, text, boards):
+        prompt = super().__new__(cls, text)
+        prompt.boards = int(boards)
+        return prompt
+
 class LLMBaseAgent(Agent):
     """
     Base class for LLM-based agents to play 2048.
-    Subclasses must implement the call_llm method.
+    Subclasses must implement the call_llm method and set model_name / llm_params
+    to the model and sampling parameters they send.
+
+    With a response cache (cache_file, or the LLM_CACHE_FILE environment
+    variable; see agents/llm_cache.py) a position already answered by the same
+    model, parameters and prompt is played from the cache without an API call.
+    Only responses that contained a valid move are stored.
+
+    Model calls go through the provider's shared rate limiter (see
+    agents/llm_rate_limit.py), so concurrent games never exceed its requests /
+    tokens per minute, and transient failures (429, 5xx, timeouts) are retried
+    with exponential backoff and jitter, honouring Retry-After. Only an error
+    that is not transient, or that outlasts max_retries, reaches the game.
+    Retries and the time spent waiting for them are counted in stats.extras
+    (llm_retries, llm_retry_wait_s).
+
+    With move_deadline_s > 0 (default: the LLM_MOVE_DEADLINE_S environment
+    variable, unset = wait for the model), the model is called in the background
+    while a cheap search agent (`fallback_agent`, greedy_bfs by default) computes
+    its own move. If the model hasn't answered by the deadline, the fallback move
+    is played and counted as stats.extras["llm_fallbacks"]; so is a transient
+    failure that can't be retried before the deadline. A late call stops
+    retrying at the deadline. Its answer is still stored in the response cache
+    and its counters (calls, latency, tokens) are added to the next move.
+
+    With plan_length > 1 the model is asked for an ordered plan of up to that
+    many moves. The agent plays the plan without further calls while each
+    board is its previous planned afterstate plus one spawned tile and the next
+    planned move is valid. It re-queries as soon as either check fails. Moves
+    played from a plan are counted as stats.extras["llm_plan_moves"].
+
+    With batch_window_s > 0, get_move_async pools positions from concurrent games
+    of the same model on its event loop (see agents/llm_batching.py). For up to
+    batch_window_s seconds and max_batch boards, positions are collected and
+    sent as one multi-board prompt. A board whose answer can't be parsed falls
+    back to a single call. With a move deadline, the batch call is bounded by
+    the earliest deadline of its boards; a board left without an answer past
+    its own deadline plays the fallback move. Batching applies to one-move
+    prompts (plan_length 1) only.
+
+    Prompts start with a static prefix (rules, board legend, answer format) that
+    is byte-identical on every call, and the system message doesn't depend on
+    the board, so providers that cache prompt prefixes bill most of the input as
+    cached. Only the board and its valid moves follow. board_format "log2" writes
+    tiles as exponents, which takes fewer tokens than "tiles". Each call's
+    latency and the token usage reported in an LLMResponse are added to
+    stats.extras (llm_latency_s, llm_prompt_tokens, llm_cached_tokens,
+    llm_completion_tokens).
     """
-    
-    def __init__(self, game):
+    model_name = None
+    llm_params = {}
+    provider = None # rate limiter shared by every agent of the same provider
+
+    def __init__(self, game, cache_file=None, cache_ttl_s=None, cache_max_entries=None,
+                 max_retries=4, retry_base_delay_s=1.0, retry_max_delay_s=60.0,
+                 move_deadline_s=None, fallback_agent='greedy_bfs', fallback_params=None, plan_length=1,
+                 batch_window_s=0, max_batch=16, board_format="tiles"):
         """Initialize the agent with a reference to the game instance."""
         super().__init__(game)
+        self.response_cache = get_llm_cache(cache_file, cache_ttl_s, cache_max_entries)
+        self.rate_limiter = get_rate_limiter(self.provider or type(self).__name__)
+        self.retry_policy = RetryPolicy(max_retries, retry_base_delay_s, retry_max_delay_s)
+        if move_deadline_s is None:
+            move_deadline_s = float(os.getenv("LLM_MOVE_DEADLINE_S", "0") or 0)
+        self.move_deadline_s = float(move_deadline_s)
+        self.fallback = None
+        if self.move_deadline_s > 0:
+            self.fallback = get_agent_with_params(fallback_agent, game, fallback_params)
+            if self.fallback is None:
+                raise ValueError(f"Fallback agent '{fallback_agent}' not found")
+        self.plan_length = max(1, int(plan_length))
+        if self.plan_length > 1:
+            # room for the whole plan in the reply (~4 tokens per move)
+            self.llm_params = {key: max(value, 4 * self.plan_length) if key in ("max_tokens", "max_output_tokens") else value
+                               for key, value in self.llm_params.items()}
+        self._plan = []         # moves still to play from the last plan
+        self._plan_grid = None  # afterstate the last played planned move should have produced
+        self.batch_window_s = float(batch_window_s or 0)
+        self.max_batch = int(max_batch)
+        if board_format not in BOARD_LEGENDS:
+            raise ValueError(f"Unknown board_format '{board_format}' (expected one of {', '.join(BOARD_LEGENDS)})")
+        self.board_format = board_format
+        self._late_stats = {}  # counters of calls that finished after their move, for the next move
+        self._late_lock = threading.Lock()
+
+    def reset(self):
+        super().reset()
+        self._plan = []
+        self._plan_grid = None
+        if self.fallback:
+            self.fallback.reset()
     
     @abstractmethod
     def call_llm(self, prompt):
@@ -39,74 +191,381 @@ class LLMBaseAgent(Agent):
                 
         return valid_moves
     
-    def get_grid_representation(self):
-        """Convert the current grid to a string representation for the LLM."""
+    def get_grid_representation(self, grid=None):
+        """Convert the current grid (or `grid`) to a string representation for the LLM, per board_format."""
         grid_str = ""
-        for row in self.game.grid:
-            grid_str += " ".join([str(cell) if cell != 0 else "_" for cell in row]) + "\n"
+        for row in (grid if grid is not None else self.game.grid):
+            if self.board_format == "log2":
+                grid_str += " ".join([str(cell.bit_length() - 1) if cell else "0" for cell in row]) + "\n"
+            else:
+                grid_str += " ".join([str(cell) if cell != 0 else "_" for cell in row]) + "\n"
         return grid_str
     
     def create_prompt(self):
-        """Create a prompt for the LLM including the game state, valid moves, 
-        and high-level strategy guidance based on the 2048 heuristics paper."""
+        """Create a prompt for the LLM: the static prompt_prefix (rules, strategy
+        guidance based on the 2048 heuristics paper, answer format), then the
+        current board and its valid moves."""
         grid_str = self.get_grid_representation()
         valid_moves = self.get_valid_moves()
         valid_moves_str = ", ".join(valid_moves) if valid_moves else "UP, DOWN, LEFT, RIGHT"
-        
-        prompt = f"""
-You are a 2048 agent, an expert AI that plays the 2048 puzzle.
+        return f"{self.prompt_prefix()}\nCurrent board:\n{grid_str}Valid moves: {valid_moves_str}\n"
 
-GAME RULES
-- The board is a 4 x 4 grid of numbers (powers of 2).  
-- Each turn the player chooses one move: **UP, DOWN, LEFT, or RIGHT**.
-- After all tiles slide and merge per 2048 rules, a new tile (2 or 4) spawns in a random empty cell.  
-- The game is won when any tile reaches **2048**.  
-- The game is lost when no legal moves remain.
+    def prompt_prefix(self, batch=False):
+        """Start of every prompt, identical across calls so it can be served from a provider's prefix cache."""
+        instruction = BATCH_INSTRUCTION if batch else self.answer_instruction()
+        return f"{RULES_TEXT}\n\n{BOARD_LEGENDS[self.board_format]}\n\n{instruction}\n"
 
-OBJECTIVE
-Your goal is to win the game by creating a 2048 tile. 
-If you reach 2048, keep playing the game with the goal to reach higher maximum tiles, until no legal moves remain.
-You should try to follow the following strategies:
-1. **Moves with empty tiles**: Make moves that create empty tiles, especially earlier in the game.
-2. **Create a snake pattern**: Try to create a snake-like pattern in the grid, with the highest value starting in the upper left corner of the grid.
+    def answer_instruction(self):
+        """The request of the prompt: one move, or a plan of plan_length moves."""
+        if self.plan_length > 1:
+            n = self.plan_length
+            return (f"Given these guidelines, plan your next **{n}** moves on the board below. Reply with up to {n} moves "
+                    f"(UP, DOWN, LEFT or RIGHT) in the order you would play them, separated by commas (for example: LEFT, UP, LEFT), "
+                    f"and nothing else. The first move must be one of the valid moves listed after the board.")
+        return ("Given these guidelines, pick **exactly one** of the valid moves listed after the board below "
+                "(UP, DOWN, LEFT, or RIGHT) and reply with that word only.")
+
+    def create_batch_prompt(self, boards):
+        """
+        One prompt asking for a move on each of several boards, given as
+        [(grid, valid moves)]; answered with one "<board number>: <MOVE>" line per
+        board (see parse_batch_response).
+        """
+        sections = []
+        for number, (grid, valid_moves) in enumerate(boards, 1):
+            sections.append(f"BOARD {number}\n{self.get_grid_representation(grid)}Valid moves: {', '.join(valid_moves)}\n")
+        return LLMBatchPrompt(f"{self.prompt_prefix(batch=True)}\nBOARDS: {len(boards)}\n\n" + "\n".join(sections),
+                              len(boards))
 
-Here is the current grid (0s shown as “_”):
+    @staticmethod
+    def batch_size(prompt):
+        """Number of boards in a create_batch_prompt prompt; 0 for a single-board prompt."""
+        return getattr(prompt, "boards", 0)
 
-{grid_str}
+    @staticmethod
+    def parse_batch_response(response, valid_moves_per_board):
+        """The move for each board of a batched response, None where it is missing or invalid."""
+        answers = {}
+        for number, move in _BATCH_ANSWER.findall(response.upper()):
+            answers.setdefault(int(number), move)
+        return [answers.get(number) if answers.get(number) in valid_moves else None
+                for number, valid_moves in enumerate(valid_moves_per_board, 1)]
 
-Valid moves: {valid_moves_str}
+    def request_params(self, prompt):
+        """Sampling parameters for `prompt`: llm_params, with room for one answer line per board of a batch."""
+        boards = self.batch_size(prompt)
+        if not boards:
+            return self.llm_params
+        return {key: max(value, 8 * boards) if key in ("max_tokens", "max_output_tokens") else value
+                for key, value in self.llm_params.items()}
 
-Given these guidelines, pick **exactly one** of the valid moves (UP, DOWN, LEFT, or RIGHT) and reply with that word only.
-"""
-        return prompt
+    def create_messages(self, prompt):
+        """Chat API messages for `prompt`: the system message, then the prompt as the user turn."""
+        return [
+            {"role": "system", "content": self.system_message(prompt)},
+            {"role": "user", "content": prompt},
+        ]
+
+    def system_message(self, prompt):
+        """System message for chat APIs, matching answer_instruction. It names no board, so it stays part of the cached prefix."""
+        if self.batch_size(prompt):
+            return ("You are a 2048 game agent playing several games. Reply with exactly one line per board, "
+                    "\"<board number>: <MOVE>\", using one of that board's valid moves. Do not include any explanation or additional text.")
+        if self.plan_length > 1:
+            return (f"You are a 2048 game agent. Reply with a comma-separated plan of up to {self.plan_length} moves "
+                    f"(UP, DOWN, LEFT, RIGHT) whose first move is one of the valid moves. Do not include any explanation or additional text.")
+        return "You are a 2048 game agent. Reply with exactly one word from the valid moves. Do not include any explanation or additional text."
 
     
     def get_move(self):
         """Get the next move by querying the LLM, ensuring only valid moves are used."""
+        valid_moves, prompt, cache_key, move = self._prepare_move()
+        if move:
+            return move
+        extras = self.stats.extras
+        call_stats = {}
+        if not self.fallback:
+            try:
+                response = self._call_with_retries(prompt, call_stats)
+            finally:
+                _add_counts(extras, call_stats)
+            return self._finish_move(response, valid_moves, cache_key)
+
+        deadline = time.perf_counter() + self.move_deadline_s
+        call = _call_executor().submit(self._call_with_retries, prompt, call_stats, deadline)
+        fallback_move = self.fallback.get_move()
+        concurrent.futures.wait([call], timeout=max(0.0, deadline - time.perf_counter()))
+        return self._settle_call(call, call_stats, fallback_move, valid_moves, cache_key)
+
+    async def call_llm_async(self, prompt):
+        """
+        Awaitable call_llm. The default runs call_llm on the event loop's executor
+        (the shared clients are thread-safe), so any subclass works under the
+        asyncio runner; override it with the provider's native async API if needed.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.call_llm, prompt)
+
+    async def get_move_async(self):
+        """get_move that awaits the model, so other games can run in the meantime."""
+        valid_moves, prompt, cache_key, move = self._prepare_move()
+        if move:
+            return move
+        extras = self.stats.extras
+        call_stats = {}
+        if not self.fallback:
+            try:
+                response = await self._request_async(prompt, valid_moves, call_stats)
+            finally:
+                _add_counts(extras, call_stats)
+            return self._finish_move(response, valid_moves, cache_key)
+
+        deadline = time.perf_counter() + self.move_deadline_s
+        call = asyncio.ensure_future(self._request_async(prompt, valid_moves, call_stats, deadline))
+        # the fallback search is CPU-bound: keep the loop free for the other games meanwhile
+        fallback_move = await asyncio.get_running_loop().run_in_executor(None, self.fallback.get_move)
+        await asyncio.wait([call], timeout=max(0.0, deadline - time.perf_counter()))
+        return self._settle_call(call, call_stats, fallback_move, valid_moves, cache_key)
+
+    async def _request_async(self, prompt, valid_moves, call_stats, deadline=None):
+        """The model's response for the current board: from a batched prompt when batching, else a single call."""
+        if self.batch_window_s > 0 and self.plan_length == 1:
+            batcher = get_prompt_batcher(self, self.batch_window_s, self.max_batch)
+            response = await batcher.submit(self, valid_moves, call_stats, deadline)
+            if response is not None:
+                return response
+            if deadline is not None and time.perf_counter() >= deadline:
+                raise TimeoutError("batched LLM call missed the move deadline")
+        return await self._call_with_retries_async(prompt, call_stats, deadline)
+
+    def _settle_call(self, call, call_stats, fallback_move, valid_moves, cache_key):
+        """
+        The move of a deadline-bounded call (a concurrent or asyncio future):
+        the model's, or fallback_move if the call is still running or failed
+        with a transient error it had no time left to retry.
+        """
+        extras = self.stats.extras
+        if not call.done():
+            # the call keeps running after this move: its counts go to a later move
+            call.add_done_callback(lambda f: self._late_call_done(f, call_stats, valid_moves, cache_key))
+            extras["llm_fallbacks"] = 1
+            return fallback_move
+        _add_counts(extras, call_stats)
+        try:
+            response = call.result()
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            extras["llm_fallbacks"] = 1
+            return fallback_move
+        return self._finish_move(response, valid_moves, cache_key)
+
+    def _late_call_done(self, call, call_stats, valid_moves, cache_key):
+        """Done callback of a call that missed its deadline: keep its counts and a valid answer for later."""
+        with self._late_lock:
+            _add_counts(self._late_stats, call_stats)
+        if call.cancelled() or call.exception() is not None or not cache_key:
+            return
+        response = call.result()
+        if self.parse_move(response, valid_moves):
+            self.response_cache.put(cache_key, response)
+
+    def estimate_tokens(self, prompt):
+        """Tokens a call is charged against the tokens-per-minute limit: ~4 characters per prompt token plus the output cap."""
+        params = self.request_params(prompt)
+        output = params.get("max_tokens") or params.get("max_output_tokens") or 0
+        return len(prompt) // 4 + output
+
+    # `call_stats` belongs to this call alone and is added to the move's stats
+    # once the call is done, so a call that outlives its deadline never writes
+    # into a move that has already been reported. Past `deadline` nobody waits
+    # for the answer any more, so the call doesn't retry beyond it.
+    def _call_with_retries(self, prompt, call_stats, deadline=None):
+        tokens = self.estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            self._record_call(call_stats, self.rate_limiter.acquire(tokens))
+            start = time.perf_counter()
+            try:
+                response = self.call_llm(prompt)
+            except Exception as e:
+                self._record_response(call_stats, start)
+                delay = self._retry_delay(call_stats, attempt, e, deadline)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+            else:
+                self._record_response(call_stats, start, response)
+                return response
+
+    async def _call_with_retries_async(self, prompt, call_stats, deadline=None):
+        tokens = self.estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            self._record_call(call_stats, await self.rate_limiter.acquire_async(tokens))
+            start = time.perf_counter()
+            try:
+                response = await self.call_llm_async(prompt)
+            except Exception as e:
+                self._record_response(call_stats, start)
+                delay = self._retry_delay(call_stats, attempt, e, deadline)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+            else:
+                self._record_response(call_stats, start, response)
+                return response
+
+    def _record_call(self, extras, waited):
+        extras["llm_calls"] = extras.get("llm_calls", 0) + 1
+        if waited:
+            extras["llm_rate_limit_wait_s"] = extras.get("llm_rate_limit_wait_s", 0) + waited
+
+    def _record_response(self, extras, start, response=None):
+        """Adds a call's latency (failed attempts included) and reported token usage to extras."""
+        extras["llm_latency_s"] = extras.get("llm_latency_s", 0) + time.perf_counter() - start
+        for key, value in getattr(response, "usage", {}).items():
+            extras[f"llm_{key}"] = extras.get(f"llm_{key}", 0) + value
+
+    def _retry_delay(self, extras, attempt, error, deadline=None):
+        """Seconds to wait before retrying, or None to give up (not transient, out of retries, or past the deadline)."""
+        delay = self.retry_policy.delay(attempt, error)
+        if delay is not None and deadline is not None and time.perf_counter() + delay >= deadline:
+            return None
+        if delay is not None:
+            extras["llm_retries"] = extras.get("llm_retries", 0) + 1
+            extras["llm_retry_wait_s"] = extras.get("llm_retry_wait_s", 0) + delay
+        return delay
+
+    def _prepare_move(self):
+        """
+        Everything before the model call: (valid moves, prompt, cache key, move).
+        move is set when the response cache already answered the position.
+        """
+        stats = self.begin_stats()
+        with self._late_lock:
+            _add_counts(stats.extras, self._late_stats)
+            self._late_stats.clear()
         valid_moves = self.get_valid_moves()
         
         # If no moves are valid, the game should be over, but we'll return a default move
         # This shouldn't happen in practice since the game checks for game over before asking for moves
         if not valid_moves:
             raise ValueError("No valid moves available - game should be over")
+
+        stats.nodes_expanded = 1
+        stats.children_generated = len(valid_moves)
+        stats.max_depth = 1
+
+        move = self._next_planned_move(valid_moves)
+        if move:
+            stats.extras["llm_plan_moves"] = 1
+            return valid_moves, None, None, move
         
         # Create prompt that specifies only valid moves
         prompt = self.create_prompt()
-        response = self.call_llm(prompt)
-        
+        cache_key = None
+        if self.response_cache:
+            cache_key = LLMResponseCache.make_key(self.model_name or type(self).__name__, self.llm_params,
+                                                  self.game.grid, prompt)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                move = self._adopt_plan(cached, valid_moves)
+                if move:
+                    stats.cache_hits = 1
+                    stats.extras["llm_cache_hits"] = 1
+                    return valid_moves, prompt, cache_key, move
+            stats.extras["llm_cache_misses"] = 1
+        return valid_moves, prompt, cache_key, None
+
+    def _finish_move(self, response, valid_moves, cache_key):
+        """The move named in the model's response, caching the response if it had one."""
+        move = self._adopt_plan(response, valid_moves)
+        if move:
+            if cache_key:
+                self.response_cache.put(cache_key, response)
+            return move
+
+        # If we can't determine a valid move from the response, use the first valid move
+        # This ensures we never make an invalid move
+        first_valid_move = valid_moves[0]
+        raise ValueError(f"LLM response '{response.strip().upper()}' did not contain a valid move. Defaulting to {first_valid_move} would be necessary.")
+
+    def _adopt_plan(self, response, valid_moves):
+        """First move of the response; with plan_length > 1 the rest is kept as the plan."""
+        if self.plan_length == 1:
+            return self.parse_move(response, valid_moves)
+        plan = self.parse_plan(response, valid_moves)[:self.plan_length]
+        if not plan:
+            return None
+        self._plan = plan[1:]
+        self._plan_grid = simulate_move_on_grid(self.game.grid, plan[0])[0] if self._plan else None
+        return plan[0]
+
+    def _next_planned_move(self, valid_moves):
+        """The next move of the current plan if the game is still on it, else None (and the plan is dropped)."""
+        if not self._plan:
+            return None
+        grid = self.game.grid
+        if self._plan[0] in valid_moves and self._spawned_one_tile(self._plan_grid, grid):
+            move = self._plan.pop(0)
+            self._plan_grid = simulate_move_on_grid(grid, move)[0] if self._plan else None
+            return move
+        self._plan = []
+        self._plan_grid = None
+        return None
+
+    @staticmethod
+    def _spawned_one_tile(expected, grid):
+        """True if grid is `expected` plus one new 2 or 4 on an empty cell."""
+        if expected is None:
+            return False
+        changed = [(r, c) for r in range(4) for c in range(4) if grid[r][c] != expected[r][c]]
+        if len(changed) != 1:
+            return False
+        r, c = changed[0]
+        return expected[r][c] == 0 and grid[r][c] in (2, 4)
+
+    @classmethod
+    def parse_plan(cls, response, valid_moves):
+        """Moves of a plan response in order; [] unless the first one is valid."""
+        moves = _MOVE_WORDS.findall(response.upper())
+        if moves and moves[0] in valid_moves:
+            return moves
+        move = cls.parse_move(response, valid_moves)
+        return [move] if move else []
+
+    @staticmethod
+    def parse_move(response, valid_moves):
+        """The valid move named in an LLM response, or None."""
         # Extract move from response
         response = response.strip().upper()
-        
+
         # If response is exactly one of the valid moves, return it
         if response in valid_moves:
             return response
-        
+
         # Otherwise, try to extract a valid move from the response
         for move in valid_moves:
             if move in response:
                 return move
-        
-        # If we can't determine a valid move from the response, use the first valid move
-        # This ensures we never make an invalid move
-        first_valid_move = valid_moves[0]
-        raise ValueError(f"LLM response '{response}' did not contain a valid move. Defaulting to {first_valid_move} would be necessary.") 
\ No newline at end of file
+        return None
+
+def _add_counts(extras, counts):
+    """Adds each of a call's counters to the same key in extras."""
+    for key, value in counts.items():
+        extras[key] = extras.get(key, 0) + value
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _call_executor():
+    """Threads running deadline-bounded model calls, one per pooled connection."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=transport_config()["pool_size"],
+                                                              thread_name_prefix="llm-deadline")
+        return _executor
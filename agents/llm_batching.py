@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+
+class PromptBatcher:
+    """
+    Collects the positions that concurrent games on one event loop want answered
+    by the same model and sends them as one multi-board prompt.
+
+    The first position to arrive opens a window of `window_s` seconds, and the
+    batch is sent when the window closes or `max_batch` positions are waiting.
+    The call goes through the first agent of the batch, with its rate limiter
+    and retries, and is counted in that move's stats. Each game gets back the
+    move parsed for its board as a response string. It gets None if the batch
+    had a single position, the answer for its board was missing or invalid, or
+    the call failed; the agent then makes its usual single-board call.
+
+    A batch is bounded by the earliest move deadline of its positions: the call
+    doesn't retry past it and is abandoned when it passes, every board getting
+    None. Each agent then falls back on its own, with a single call if its own
+    deadline leaves time for one, else with its fallback move.
+    """
+    def __init__(self, window_s=0.05, max_batch=16):
+        self.window_s = float(window_s)
+        self.max_batch = max(1, int(max_batch))
+        self.batches_sent = 0
+        self.boards_answered = 0
+        self._pending = []  # (agent, grid, valid moves, call stats, future, deadline)
+        self._timer = None
+
+    def submit(self, agent, valid_moves, call_stats, deadline=None):
+        """
+        Future resolving to the answer for agent's current board (a move string)
+        or None. The batch's counters are added to call_stats before it resolves.
+        deadline is the move's time.perf_counter() deadline, if it has one.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        grid = [row[:] for row in agent.game.grid]
+        self._pending.append((agent, grid, valid_moves, call_stats, future, deadline))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if len(batch) == 1:
+            batch[0][4].set_result(None)  # nothing to batch with: plain single call
+        elif batch:
+            asyncio.get_running_loop().create_task(self._send(batch))
+
+    async def _send(self, batch):
+        agent, _, _, call_stats, _, _ = batch[0]
+        valid_moves = [entry[2] for entry in batch]
+        deadlines = [entry[5] for entry in batch if entry[5] is not None]
+        deadline = min(deadlines) if deadlines else None
+        try:
+            prompt = agent.create_batch_prompt([(entry[1], entry[2]) for entry in batch])
+            call = agent._call_with_retries_async(prompt, call_stats, deadline)
+            if deadline is not None:
+                call = asyncio.wait_for(call, max(0.0, deadline - time.perf_counter()))
+            response = await call
+            answers = agent.parse_batch_response(response, valid_moves)
+        except asyncio.TimeoutError:
+            answers = [None] * len(batch)  # the earliest deadline passed: each board falls back on its own
+        except Exception as e:
+            print(f"Batched LLM call for {len(batch)} boards failed ({e}); falling back to single calls.")
+            answers = [None] * len(batch)
+        self.batches_sent += 1
+        for (_, _, _, board_stats, future, _), answer in zip(batch, answers):
+            if answer:
+                self.boards_answered += 1
+                board_stats["llm_batched_moves"] = 1
+            if not future.done():
+                future.set_result(answer)
+
+# (event loop, batch key) -> PromptBatcher
+_batchers = {}
+
+def get_prompt_batcher(agent, window_s, max_batch):
+    """
+    The batcher shared on the running loop by agents of the same class, model,
+    sampling parameters and board_format (one prompt writes every board alike).
+    """
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _batchers if key[0].is_closed()]:
+        del _batchers[key]
+    key = (loop, type(agent), agent.model_name, json.dumps(agent.llm_params, sort_keys=True), agent.board_format)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = _batchers[key] = PromptBatcher(window_s, max_batch)
+    return batcher
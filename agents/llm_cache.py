@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from simulation.game_utils import encode_grid
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses in a local SQLite file.
+
+    An entry is keyed by the model name, its sampling parameters (canonical JSON),
+    the board (packed with encode_grid, as hex) and a digest of the full prompt, so
+    a changed prompt template never returns answers given to the old one. Entries
+    older than `ttl_s` seconds count as misses and are deleted (0 = never expire).
+    Beyond `max_entries` the least recently used tenth of the entries is evicted
+    (0 = unbounded). The file is opened in WAL mode, so several processes can share
+    it; within a process one connection is shared under a lock.
+    """
+    def __init__(self, path, ttl_s=0, max_entries=100000):
+        self.path = path
+        self.ttl_s = float(ttl_s or 0)
+        self.max_entries = int(max_entries or 0)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                model TEXT NOT NULL,
+                params TEXT NOT NULL,
+                board TEXT NOT NULL,
+                prompt_sha TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, params, board, prompt_sha)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._entries = self._count()
+
+    @staticmethod
+    def make_key(model, params, grid, prompt):
+        """ (model, params, board, prompt digest) key of one request. """
+        return (model, json.dumps(params or {}, sort_keys=True), f"{encode_grid(grid):016x}",
+                hashlib.sha1(prompt.encode('utf-8')).hexdigest())
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """ The cached response for `key`, or None. """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE model=? AND params=? AND board=? AND prompt_sha=?",
+                key).fetchone()
+            if row is not None and self.ttl_s and now - row[1] > self.ttl_s:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE model=? AND params=? AND board=? AND prompt_sha=?", key)
+                self._entries -= 1
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_used=? WHERE model=? AND params=? AND board=? AND prompt_sha=?",
+                (now,) + tuple(key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        """ Stores `response` for `key`, evicting old entries beyond max_entries. """
+        now = time.time()
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE responses SET response=?, created=?, last_used=? "
+                "WHERE model=? AND params=? AND board=? AND prompt_sha=?",
+                (response, now, now) + tuple(key)).rowcount
+            if not updated:
+                # only a new key adds an entry (another process may have inserted it meanwhile)
+                self._entries += self._conn.execute(
+                    "INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    tuple(key) + (response, now, now)).rowcount
+            if self.max_entries and self._entries > self.max_entries:
+                # other processes may have written too; recount before evicting
+                self._entries = self._count()
+                excess = self._entries - self.max_entries
+                if excess > 0:
+                    excess += self.max_entries // 10
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE rowid IN "
+                        "(SELECT rowid FROM responses ORDER BY last_used LIMIT ?)", (excess,))
+                    self.evicted += excess
+                    self._entries = self._count()
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "hit_ratio": self.hit_ratio,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._entries = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# path -> LLMResponseCache shared by every LLM agent in the process
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_llm_cache(path=None, ttl_s=None, max_entries=None):
+    """
+    The shared cache for `path`, created on first use. `path` defaults to the
+    LLM_CACHE_FILE environment variable; returns None when neither is set
+    (caching disabled). ttl_s / max_entries, when given, update the shared
+    cache's limits (defaults: LLM_CACHE_TTL_S, LLM_CACHE_MAX_ENTRIES).
+    """
+    path = path or os.getenv("LLM_CACHE_FILE")
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = LLMResponseCache(
+                path,
+                ttl_s if ttl_s is not None else float(os.getenv("LLM_CACHE_TTL_S", "0") or 0),
+                max_entries if max_entries is not None else int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000") or 0))
+            _caches[path] = cache
+        else:
+            if ttl_s is not None:
+                cache.ttl_s = float(ttl_s)
+            if max_entries is not None:
+                cache.max_entries = int(max_entries)
+    return cache
@@ -0,0 +1,160 @@
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+
+class TokenBucketLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one provider, shared by
+    every agent, game and thread in the process.
+
+    Each limit is a token bucket refilled continuously at rate/60 per second and
+    holding at most one minute of budget. acquire() takes its share at once, even
+    if that drives a bucket negative, and returns how long the caller must wait
+    for the debt to refill. Callers therefore queue in arrival order and the
+    provider sees a smooth stream at the configured rate. A limit of 0 is
+    unlimited.
+    """
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self._lock = threading.Lock()
+        self.configure(requests_per_minute, tokens_per_minute)
+        self.waited_s = 0.0 # total time callers were told to wait
+
+    def configure(self, requests_per_minute=0, tokens_per_minute=0):
+        with self._lock:
+            self.requests_per_minute = float(requests_per_minute or 0)
+            self.tokens_per_minute = float(tokens_per_minute or 0)
+            self._requests = self.requests_per_minute
+            self._tokens = self.tokens_per_minute
+            self._updated = time.monotonic()
+
+    @property
+    def limited(self):
+        return bool(self.requests_per_minute or self.tokens_per_minute)
+
+    def reserve(self, tokens=0):
+        """ Takes one request and `tokens` tokens; returns the seconds to wait before sending. """
+        if not self.limited:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            if self.requests_per_minute:
+                self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+                self._requests -= 1
+                if self._requests < 0:
+                    wait = -self._requests * 60 / self.requests_per_minute
+            if self.tokens_per_minute:
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+                self._tokens -= tokens
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens * 60 / self.tokens_per_minute)
+            self.waited_s += wait
+            return wait
+
+    def acquire(self, tokens=0):
+        """ Blocks until a request of `tokens` tokens may be sent; returns the time waited. """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=0):
+        """ acquire() for coroutines: waits with asyncio.sleep. """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider):
+    """
+    The shared limiter of `provider` ('openai', 'deepseek', 'google', ...),
+    created on first use from LLM_RPM_<PROVIDER> / LLM_TPM_<PROVIDER> (unset or
+    0 = unlimited).
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            name = provider.upper()
+            limiter = TokenBucketLimiter(float(os.getenv(f"LLM_RPM_{name}", "0") or 0),
+                                         float(os.getenv(f"LLM_TPM_{name}", "0") or 0))
+            _limiters[provider] = limiter
+        return limiter
+
+def configure_rate_limit(provider, requests_per_minute=0, tokens_per_minute=0):
+    """ Sets the limits of `provider`'s shared limiter; returns it. """
+    limiter = get_rate_limiter(provider)
+    limiter.configure(requests_per_minute, tokens_per_minute)
+    return limiter
+
+# --- Retries --- #
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# exception class names of transient SDK / transport errors that carry no status code
+RETRYABLE_ERRORS = {"ConnectionError", "Timeout", "ConnectTimeout", "ReadTimeout", "TimeoutError",
+                    "APIConnectionError", "APITimeoutError", "ServiceUnavailable", "DeadlineExceeded",
+                    "ResourceExhausted", "InternalServerError", "TooManyRequests"}
+
+def status_code(error):
+    """ HTTP status of a provider error (requests, openai and google exceptions), or None. """
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code"):
+            code = getattr(source, attr, None)
+            if isinstance(code, int):
+                return code
+    return None
+
+def is_retryable(error):
+    """ True for rate limiting, server errors, timeouts and dropped connections. """
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+def retry_after(error):
+    """ Seconds requested by the error's Retry-After (or retry-after-ms) header, or None. """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt k (from 0) waits a uniform
+    random time in [0, min(max_delay_s, base_delay_s * 2**k)], or the server's
+    Retry-After when it sent one (capped at max_delay_s). Only errors that
+    is_retryable accepts are retried, at most `max_retries` times.
+    """
+    def __init__(self, max_retries=4, base_delay_s=1.0, max_delay_s=60.0):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay_s = float(base_delay_s)
+        self.max_delay_s = float(max_delay_s)
+
+    def delay(self, attempt, error):
+        """ Seconds to wait before retrying after `error` on `attempt`, or None to give up. """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay_s)
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** attempt))
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Process-wide connections for the LLM agents. Every agent instance, game and
+# thread shares one keep-alive connection pool per provider, so a move pays for
+# the model's latency, not for a new TCP/TLS handshake. The pool should hold at
+# least as many connections as games play concurrently; set it (and the
+# timeouts) with configure_llm_transport or the LLM_POOL_SIZE,
+# LLM_CONNECT_TIMEOUT_S and LLM_READ_TIMEOUT_S environment variables.
+
+_config = {
+    "pool_size": int(os.getenv("LLM_POOL_SIZE", "32") or 32),
+    "connect_timeout_s": float(os.getenv("LLM_CONNECT_TIMEOUT_S", "5") or 5),
+    "read_timeout_s": float(os.getenv("LLM_READ_TIMEOUT_S", "60") or 60),
+}
+_lock = threading.Lock()
+_session = None
+_openai_clients = {}  # api key -> openai.OpenAI
+_gemini_key = None
+_gemini_models = {}  # (model name, generation config) -> GenerativeModel
+
+def configure_llm_transport(pool_size=None, connect_timeout_s=None, read_timeout_s=None):
+    """
+    Update the pool size / timeouts. If anything changed the shared clients are
+    rebuilt on next use; agents fetch them per call, so they pick them up.
+    """
+    global _session
+    updates = {"pool_size": pool_size, "connect_timeout_s": connect_timeout_s, "read_timeout_s": read_timeout_s}
+    with _lock:
+        changed = False
+        for key, value in updates.items():
+            if value is not None and value != _config[key]:
+                _config[key] = type(_config[key])(value)
+                changed = True
+        if changed:
+            # calls in flight keep their old client; it is closed once unreferenced
+            _session = None
+            _openai_clients.clear()
+    return dict(_config)
+
+def transport_config():
+    return dict(_config)
+
+def http_timeout():
+    """ (connect, read) timeout for requests calls. """
+    return (_config["connect_timeout_s"], _config["read_timeout_s"])
+
+def get_http_session():
+    """ The shared requests.Session, with a keep-alive pool of `pool_size` connections per host. """
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_config["pool_size"], pool_block=False)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+def get_openai_client(api_key):
+    """ One openai.OpenAI client per API key, sharing an httpx connection pool. """
+    with _lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            import httpx
+            import openai
+            pool = _config["pool_size"]
+            client = openai.OpenAI(
+                api_key=api_key,
+                max_retries=0, # retried by LLMBaseAgent with the shared rate limiter (agents/llm_rate_limit.py)
+                timeout=httpx.Timeout(_config["read_timeout_s"], connect=_config["connect_timeout_s"]),
+                http_client=httpx.Client(limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool)),
+            )
+            _openai_clients[api_key] = client
+        return client
+
+def get_gemini_model(api_key, model_name, generation_config):
+    """
+    A shared GenerativeModel for `model_name` / `generation_config`. genai.configure
+    is global, so it runs once per API key rather than once per agent.
+    """
+    global _gemini_key
+    import google.generativeai as genai
+    key = (model_name, json.dumps(generation_config, sort_keys=True))
+    with _lock:
+        if _gemini_key != api_key:
+            genai.configure(api_key=api_key)
+            _gemini_key = api_key
+            _gemini_models.clear()
+        model = _gemini_models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, generation_config=dict(generation_config))
+            _gemini_models[key] = model
+        return model
+
+def gemini_request_options():
+    """ request_options for GenerativeModel.generate_content. """
+    return {"timeout": _config["connect_timeout_s"] + _config["read_timeout_s"]}
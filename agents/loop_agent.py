@@ -14,17 +14,28 @@ class LoopAgent(Agent):
         self.current_index = 0 # Use instance variable for index
         self.last_valid_move = None
 
+    def reset(self):
+        """Restart the move cycle for a new game."""
+        super().reset()
+        self.current_index = 0
+        self.last_valid_move = None
+
     def get_move(self):
         """ 
         Cycles through moves UP, RIGHT, DOWN, LEFT but only returns valid moves.
         If the next move in the sequence is invalid, it will try the next one,
         and so on until a valid move is found.
         """
+        stats = self.begin_stats()
         valid_moves = self.get_valid_moves()
         
         # If there are no valid moves, the game should be over
         if not valid_moves:
             raise ValueError("No valid moves available - game should be over")
+
+        stats.nodes_expanded = 1
+        stats.children_generated = len(valid_moves)
+        stats.max_depth = 1
         
         # Try up to 4 moves (the full cycle) to find a valid one
         for _ in range(len(self._moves)):
@@ -1,6 +1,7 @@
 from agents.agent import Agent
 from agents.registry import register_agent
-from simulation.game_utils import simulate_move_on_grid, calculate_heuristic, get_empty_cells, is_terminal, empty_score
+from agents.search_budget import SearchBudget, BudgetExceeded, default_max_time_s
+from simulation.game_utils import simulate_move_on_grid, cached_heuristic, get_empty_cells, is_terminal, empty_score
 import random
 import math
 import time
@@ -77,31 +78,43 @@ class _MCTSNode:
 
 class RolloutPolicy:
     @staticmethod
-    def select_move(grid):
+    def select_move(grid, stats=None):
         """
         Greedy heuristic rollout: pick the move whose resulting grid
-        scores highest under calculate_heuristic.
+        scores highest under calculate_heuristic (via the shared cache when enabled).
         """
         best_move, best_score = None, -float("inf")
         for move in ("UP", "DOWN", "LEFT", "RIGHT"):
             new_grid, _, changed = simulate_move_on_grid(grid, move)
             if not changed:
                 continue
-            h = calculate_heuristic(new_grid)
+            if stats is not None:
+                stats.nodes_evaluated += 1
+            h = cached_heuristic(new_grid)
             if h > best_score:
                 best_score, best_move = h, move
         return best_move
 
 @register_agent('mcts')
 class MCTSAgent(Agent):
-    """Agent using Monte Carlo Tree Search."""
-    def __init__(self, game, iterations=1000, rollout_depth=15):
+    """
+    Agent using Monte Carlo Tree Search.
+    max_nodes / max_bytes / max_time_s bound each move (see SearchBudget); every
+    tree step and rollout step is charged, and running out stops the iterations
+    early and plays the most visited root child so far. max_time_s defaults to
+    default_max_time_s(); pass 0 for an unbounded search.
+    """
+    def __init__(self, game, iterations=1000, rollout_depth=15, max_nodes=0, max_bytes=0, max_time_s=None):
         super().__init__(game)
         self.iterations = iterations
         self.rollout_depth = rollout_depth
         self.c = math.sqrt(2)
+        if max_time_s is None:
+            max_time_s = default_max_time_s()
+        self.budget = SearchBudget(max_nodes, max_bytes, max_time_s)
 
     def get_move(self):
+        stats = self.begin_stats()
         root = _MCTSNode(self.game.grid)
 
         valid_moves = self.get_valid_moves()
@@ -111,28 +124,53 @@ class MCTSAgent(Agent):
         start_time = time.time()
 
         # Run the MCTS iterations
-        for _ in range(self.iterations):
-            node = root
-
-            while True:
-                if is_terminal(node.grid):
-                    break
-                if not node.is_fully_expanded():
-                    node = node.expand() or node
-                    break            
-                else:
-                    if node.is_chance:
-                        # At chance nodes, sample an outcome
-                        node = node.expand() or node
+        budget = self.budget.start()
+        try:
+            for _ in range(self.iterations):
+                budget.charge()
+                node = root
+                edges = 0  # tree edges from the root, alternating move / tile spawn
+
+                while True:
+                    if is_terminal(node.grid):
                         break
+                    if not node.is_fully_expanded():
+                        child = node.expand()
+                        if child:
+                            stats.children_generated += 1
+                            if len(node.children) == 1:
+                                stats.nodes_expanded += 1
+                            node = child
+                            edges += 1
+                        break            
                     else:
-                        # At decision nodes, pick UCT child
-                        node = node.best_uct_child(self.c)
-                        
-            reward = self._rollout(node.grid)
-            node.backpropagate(reward)            
-        
+                        if node.is_chance:
+                            # At chance nodes, sample an outcome
+                            child = node.expand()
+                            if child:
+                                stats.children_generated += 1
+                                if len(node.children) == 1:
+                                    stats.nodes_expanded += 1
+                                node = child
+                                edges += 1
+                            break
+                        else:
+                            # At decision nodes, pick UCT child
+                            node = node.best_uct_child(self.c)
+                            edges += 1
+
+                ply = (edges + 1) // 2  # player moves made to reach this node
+                if ply > stats.max_depth:
+                    stats.max_depth = ply
+                stats.rollouts += 1
+                reward = self._rollout(node.grid)
+                node.backpropagate(reward)
+        except BudgetExceeded:
+            budget.record(stats)
+
         if not root.children:
+            if budget.exhausted:
+                return random.choice(valid_moves)
             raise RuntimeError("MCTS failed to expand any root children — check your iteration count or terminal logic")
 
         best_child = max(root.children, key=lambda n: n.visits)
@@ -143,9 +181,10 @@ class MCTSAgent(Agent):
         sim_grid = [row[:] for row in grid]
         max_tile = max(cell for row in sim_grid for cell in row)
         for _ in range(self.rollout_depth):
+            self.budget.charge()
             if is_terminal(sim_grid):
                 break
-            move = RolloutPolicy.select_move(sim_grid)
+            move = RolloutPolicy.select_move(sim_grid, self.stats)
             if move is None:
                 break
             sim_grid, _, _ = simulate_move_on_grid(sim_grid, move)
@@ -11,10 +11,14 @@ class RandomAgent(Agent):
         Return a random valid move.
         Only considers moves that would change the grid.
         """
+        stats = self.begin_stats()
         valid_moves = self.get_valid_moves()
         
         # If there are no valid moves, the game should be over
         if not valid_moves:
             raise ValueError("No valid moves available - game should be over")
-            
+
+        stats.nodes_expanded = 1
+        stats.children_generated = len(valid_moves)
+        stats.max_depth = 1
         return random.choice(valid_moves)
\ No newline at end of file
@@ -1,16 +1,45 @@
 import importlib
 import pkgutil
+import threading
 import agents
 
 # Removed old AGENTS dictionary
 
 AGENT_REGISTRY = {}
+
+# Static manifest: registered agent name -> module in the agents package. Lets
+# agents be listed without importing anything, and get_agent import only the one
+# module it needs, so e.g. the LLM SDKs load only when an LLM agent is used.
+# Agents missing here are still found by a full discover_agents() on first lookup.
+AGENT_MANIFEST = {
+    'a_star': 'a_star_agent',
+    'alpha_beta_expectimax': 'alpha_beta_expectimax_agent',
+    'deepseekv3': 'deepseekv3_agent',
+    'expectimax': 'expectimax_agent',
+    'gemini': 'gemini_agent',
+    'gemma3': 'gemma3_agent',
+    'gpt4o_mini': 'gpt4o_mini_agent',
+    'greedy_bfs': 'greedy_bfs_agent',
+    'hybrid_llm': 'hybrid_llm_agent',
+    'ida_star': 'ida_star_agent',
+    'loop': 'loop_agent',
+    'mcts': 'mcts_agent',
+    'random': 'random_agent',
+    'td_learning': 'td_learning_agent',
+}
+
+_discovered = False
+_unavailable = set() # manifest names whose module failed to import
+_discovery_lock = threading.RLock()
 DEFAULT_PARAMS = {
     'a_star': {
-        'depth_limit': 5
+        'depth_limit': 5,
+        'max_open': 4096,
+        'beam_width': 0
     },
     'ida_star': {
         'depth_limit': 5,
+        'tt_size': 100000,
     },
     'expectimax': {
         'depth': 3
@@ -25,7 +54,9 @@ DEFAULT_PARAMS = {
     'td_learning': {
         'learning_rate': 0.001,
         'discount_factor': 0.99,
-        'epsilon': 0.2
+        'epsilon': 0.2,
+        'value_function': 'linear',
+        'ntuple_preset': '5x4'
     }
 }
 
@@ -35,8 +66,19 @@ def register_agent(name):
         return cls
     return decorator
 
-def discover_agents():
-    """Automatically discover agents in the agents package."""
+def discover_agents(force=False):
+    """
+    Automatically discover agents in the agents package.
+    Scans once per process; later calls are no-ops unless force=True.
+    """
+    global _discovered
+    with _discovery_lock:
+        if _discovered and not force:
+            return
+        _import_agent_modules()
+        _discovered = True
+
+def _import_agent_modules():
     import agents # Ensure the package is imported
     # Add path check for robustness
     if not hasattr(agents, '__path__'):
@@ -53,10 +95,33 @@ def discover_agents():
             except Exception as e:
                 print(f"Error importing agent {name}: {e}")
 
+def _import_manifest_module(name):
+    """Import the manifest module of agent `name`. False if it is unknown or fails to import."""
+    module = AGENT_MANIFEST.get(name)
+    if module is None or name in _unavailable:
+        return False
+    try:
+        importlib.import_module(f'agents.{module}')
+    except ModuleNotFoundError:
+        print(f"Warning: Could not import module agents.{module}. Skipping.")
+    except Exception as e:
+        print(f"Error importing agent {name}: {e}")
+    else:
+        return True
+    _unavailable.add(name)
+    return False
+
 def get_agent(name):
-    """Get an agent class by name."""
-    discover_agents() # Ensure agents are loaded
-    return AGENT_REGISTRY.get(name)
+    """Get an agent class by name, importing only its module on first use."""
+    agent_class = AGENT_REGISTRY.get(name)
+    if agent_class is None:
+        with _discovery_lock:
+            if name not in AGENT_REGISTRY and name not in AGENT_MANIFEST:
+                discover_agents() # not in the manifest: scan the package once
+            elif name not in AGENT_REGISTRY:
+                _import_manifest_module(name)
+            agent_class = AGENT_REGISTRY.get(name)
+    return agent_class
 
 def get_default_params(name):
     """Get default parameters for an agent."""
@@ -82,10 +147,12 @@ def get_agent_with_params(name, game, params=None):
     return agent_class(game, **final_params)
 
 def list_agents():
-    """List available agent names."""
-    discover_agents() # Ensure agents are loaded
-    # print(f"Available agents in registry: {list(AGENT_REGISTRY.keys())}") # Optional: Debug print
-    return list(AGENT_REGISTRY.keys())
-
-# Initial discovery
-discover_agents()
+    """
+    List available agent names: the manifest plus agents registered outside it.
+    Nothing is imported, so an agent whose dependencies are missing is still
+    listed; get_agent returns None for it.
+    """
+    names = list(AGENT_MANIFEST)
+    names.extend(name for name in AGENT_REGISTRY if name not in AGENT_MANIFEST)
+    # print(f"Available agents in registry: {names}") # Optional: Debug print
+    return names
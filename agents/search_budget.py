@@ -0,0 +1,83 @@
+import os
+import time
+
+class BudgetExceeded(Exception):
+    """Raised from SearchBudget.charge when a per-move limit runs out."""
+    def __init__(self, reason):
+        super().__init__(f"Search budget exhausted ({reason})")
+        self.reason = reason
+
+def default_max_time_s():
+    """
+    Per-move time limit of the search agents (A*, IDA*, MCTS and the
+    expectimax agents) when no max_time_s is passed: the SEARCH_MAX_TIME_S
+    environment variable, 5 seconds if unset (0 = unlimited).
+    """
+    return float(os.getenv("SEARCH_MAX_TIME_S", "5") or 0)
+
+class SearchBudget:
+    """
+    Per-move limits shared by the search agents: max nodes, max memory growth
+    (bytes of process RSS above the level at the start of the move) and max wall
+    time. A limit of 0/None means unlimited.
+
+    Agents call start() at the top of get_move and charge() once per search node.
+    charge() is a counter bump and one comparison; the clock and RSS are only read
+    every `check_every` nodes. When a limit is hit it raises BudgetExceeded, which
+    the agent catches to fall back to the best move found so far.
+    """
+    def __init__(self, max_nodes=0, max_bytes=0, max_time_s=0, check_every=32):
+        self.max_nodes = int(max_nodes or 0)
+        self.max_bytes = int(max_bytes or 0)
+        self.max_time_s = float(max_time_s or 0)
+        self.check_every = max(1, int(check_every))
+        self.limited = bool(self.max_nodes or self.max_bytes or self.max_time_s)
+        self._process = None
+        if self.max_bytes:
+            import psutil  # only memory limits read the process RSS
+            self._process = psutil.Process()
+        self.start()
+
+    def start(self):
+        """Reset the budget for a new move; returns self for chaining."""
+        self.nodes = 0
+        self.exhausted = None  # reason string once a limit was hit
+        self._deadline = time.perf_counter() + self.max_time_s if self.max_time_s else None
+        self._start_rss = self._process.memory_info().rss if self._process else 0
+        self._next_check = self._next_checkpoint() if self.limited else float('inf')
+        return self
+
+    def charge(self, nodes=1):
+        """Account for `nodes` search nodes; raises BudgetExceeded when out of budget."""
+        self.nodes += nodes
+        if self.nodes >= self._next_check:
+            self._check()
+
+    def _next_checkpoint(self):
+        checkpoint = self.nodes + self.check_every
+        if self.max_nodes:
+            checkpoint = min(checkpoint, self.max_nodes)
+        return checkpoint
+
+    def _check(self):
+        if self.exhausted:
+            raise BudgetExceeded(self.exhausted)
+        if self.max_nodes and self.nodes >= self.max_nodes:
+            self._exhaust("nodes")
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            self._exhaust("time")
+        if self._process and self._process.memory_info().rss - self._start_rss >= self.max_bytes:
+            self._exhaust("memory")
+        self._next_check = self._next_checkpoint()
+
+    def _exhaust(self, reason):
+        self.exhausted = reason
+        # keep raising on every further charge so nested searches unwind quickly
+        self._next_check = self.nodes
+        raise BudgetExceeded(reason)
+
+    def record(self, stats):
+        """Note an overrun of this move in the agent's SearchStats extras."""
+        if self.exhausted:
+            stats.extras["budget_exhausted"] = 1
+            stats.extras[f"budget_{self.exhausted}"] = 1
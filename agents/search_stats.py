@@ -0,0 +1,69 @@
+class SearchStats:
+    """
+    Counters describing the search behind one get_move call.
+
+    Every agent owns one instance (`agent.stats`) that it resets at the start of
+    get_move and bumps while searching. The counters are plain slot attributes, so
+    counting costs a few integer increments per node, and nothing is copied or
+    aggregated unless a caller (e.g. the simulation worker) asks for it via add().
+    Agent-specific counters (IDA* iterations, LLM calls, ...) go in `extras`.
+    """
+    __slots__ = ("decisions", "nodes_expanded", "nodes_evaluated", "children_generated",
+                 "cache_hits", "rollouts", "max_depth", "extras")
+
+    def __init__(self, decisions=0):
+        self.decisions = decisions
+        self.reset()
+
+    def reset(self):
+        """Clear all counters for a new decision; returns self for chaining."""
+        self.nodes_expanded = 0      # nodes whose successors were generated
+        self.nodes_evaluated = 0     # heuristic / value function evaluations
+        self.children_generated = 0  # successors produced by expansions
+        self.cache_hits = 0          # evaluations or expansions answered from a cache
+        self.rollouts = 0            # Monte Carlo playouts
+        self.max_depth = 0           # deepest ply reached
+        self.extras = {}
+        return self
+
+    @property
+    def branching_factor(self):
+        return self.children_generated / self.nodes_expanded if self.nodes_expanded else 0.0
+
+    def add(self, other):
+        """Accumulate another decision's (or game's) counters into this one."""
+        self.decisions += other.decisions
+        self.nodes_expanded += other.nodes_expanded
+        self.nodes_evaluated += other.nodes_evaluated
+        self.children_generated += other.children_generated
+        self.cache_hits += other.cache_hits
+        self.rollouts += other.rollouts
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for key, value in other.extras.items():
+            self.extras[key] = self.extras.get(key, 0) + value
+        return self
+
+    def as_dict(self):
+        """Raw counters, e.g. for the last decision of an agent."""
+        data = {name: getattr(self, name) for name in self.__slots__ if name != "extras"}
+        data["branching_factor"] = self.branching_factor
+        data.update(self.extras)
+        return data
+
+    def summary(self):
+        """Per-decision means and totals suitable for simulation results / WandB logs."""
+        n = self.decisions or 1
+        lookups = self.cache_hits + self.nodes_evaluated
+        data = {
+            "decisions": self.decisions,
+            "mean_nodes_expanded": self.nodes_expanded / n,
+            "mean_nodes_evaluated": self.nodes_evaluated / n,
+            "mean_rollouts": self.rollouts / n,
+            "mean_branching_factor": self.branching_factor,
+            "cache_hits": self.cache_hits,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "max_search_depth": self.max_depth,
+        }
+        for key, value in self.extras.items():
+            data[f"total_{key}"] = value
+        return data
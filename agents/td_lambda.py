@@ -0,0 +1,70 @@
+import math
+import numpy as np
+
+class AfterstateTDLambda:
+    """
+    Afterstate TD(lambda) with truncated sparse eligibility traces.
+
+    V is learned on afterstates (the board right after the agent's move, before
+    the random tile). When the next move is chosen from the next state, the
+    previous afterstate a_t gets the target r_{t+1} + gamma * V(a_{t+1}), or 0
+    once the game is over. The error of that target is applied to a_t and to the
+    afterstates before it with weights (gamma * lambda)^k.
+
+    Traces are sparse: instead of a dense eligibility vector the learner keeps
+    the features of the last few afterstates (for the n-tuple network, just their
+    active table indices) and stops once (gamma * lambda)^k < trace_cutoff. It
+    works for `slots` episodes at a time (one per batch row, see _play_batched in
+    simulation/training_td_worker.py); single-episode training uses slot 0.
+    """
+    def __init__(self, value_fn, learning_rate, discount_factor=1.0, trace_lambda=0.5,
+                 trace_cutoff=0.01, slots=1, max_trace=32):
+        self.value_fn = value_fn
+        self.learning_rate = learning_rate
+        decay = discount_factor * trace_lambda
+        if decay <= 0:
+            length = 1
+        elif decay >= 1:
+            length = max_trace
+        else:
+            length = min(max_trace, max(1, math.ceil(math.log(trace_cutoff) / math.log(decay))))
+        self.decays = decay ** np.arange(length)
+        self.slots = slots
+        self._trace = None  # (slots, length, *feature shape), newest afterstate first
+        self._count = np.zeros(slots, dtype=np.int64)
+
+    @property
+    def trace_length(self):
+        return len(self.decays)
+
+    def reset(self, slots):
+        """ Forget the traces of the given slots (new episodes). """
+        self._count[slots] = 0
+
+    def step(self, slots, features, targets):
+        """
+        Pushes the afterstate `features` (one row per slot) onto their traces and
+        applies the TD(lambda) update for their `targets`. Returns the TD errors.
+        """
+        slots = np.asarray(slots)
+        features = np.asarray(features)
+        if self._trace is None:
+            self._trace = np.zeros((self.slots, self.trace_length) + features.shape[1:], dtype=features.dtype)
+
+        trace = self._trace
+        trace[slots, 1:] = trace[slots, :-1]
+        trace[slots, 0] = features
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.trace_length)
+
+        value_fn = self.value_fn
+        td_err = np.asarray(targets, dtype=np.float64) - value_fn.batch_values(features)
+        steps = self.learning_rate * td_err
+        count = self._count[slots]
+        for k, decay in enumerate(self.decays):
+            live = count > k
+            if not live.any():
+                break
+            value_fn.batch_update(trace[slots[live], k], steps[live] * decay)
+        if value_fn.sanitize(trace[slots, 0]):
+            print("Warning: NaN or Inf detected in weights. Resetting problematic weights?")
+        return td_err
@@ -1,126 +1,133 @@
 from agents.agent import Agent
 from agents.registry import register_agent
-from simulation.game_utils import simulate_move_on_grid, empty_score, calculate_heuristic, smoothness_score, monotonicity_score
+from agents.td_value_functions import LinearValueFunction, NTupleNetwork
+from agents import weight_store
+from simulation import vector_board
 import numpy as np
 import random
-import math
 import json
 import os
 
 @register_agent('td_learning')
 class TDLearningAgent(Agent):
-    """Agent using Temporal Difference Learning (TD(0)) with a linear value function."""
-    def __init__(self, game, learning_rate=0.001, discount_factor=0.99, epsilon=0.2, weights_file='td_weights.json'):
+    """
+    Agent using Temporal Difference Learning (TD(0)).
+
+    value_function='linear' (default) is the original 20-feature linear model.
+    value_function='ntuple' uses an n-tuple network (see NTupleNetwork, layout
+    chosen by `ntuple_preset`) and ranks moves by reward + V(afterstate). The
+    default '5x4' preset is a ~1.3 MB table; '4x6' (~268 MB of float32) is the
+    stronger layout, opt in to it explicitly.
+
+    Weight files ending in .json are read/written as JSON lists (the original
+    format, still the linear default). Anything else uses the binary weight store
+    (see agents/weight_store.py): the table is memory-mapped read-only and shared
+    by every agent and process playing from the same file, so constructing an
+    agent per game costs no parsing or copying. The first training update takes a
+    private copy of the table.
+    """
+    def __init__(self, game, learning_rate=0.001, discount_factor=0.99, epsilon=0.2, weights_file=None,
+                 value_function='linear', ntuple_preset='5x4'):
         super().__init__(game)
         self.learning_rate = learning_rate       # alpha
         self.discount_factor = discount_factor   # gamma
         self.epsilon = epsilon                   # For epsilon-greedy exploration during training
-        self.weights_file = weights_file
 
-        # Initialize weights (e.g., based on number of features)
-        # self.num_features = (4*4) + 1
-        # self.num_features = 1
-        self.num_features = 20
+        if value_function == 'ntuple':
+            self.value_fn = NTupleNetwork(ntuple_preset)
+            self.weights_file = weights_file or f'td_ntuple_{ntuple_preset}.weights'
+        elif value_function == 'linear':
+            self.value_fn = LinearValueFunction()
+            self.weights_file = weights_file or 'td_weights.json'
+        else:
+            raise ValueError(f"Unknown TD value function '{value_function}'")
+        self.num_features = getattr(self.value_fn, 'num_features', None)
+        self.weights_version = 0
 
-        self.weights = np.zeros(self.num_features)
         is_training = False ################## # Change this to False for evaluation
         if not is_training:
-            self.load_weights()            
-    
+            self.load_weights()
+
+        self.last_state_features = None
+        self.last_state_value = 0.0
+        self.last_reward = 0.0
+        self.last_afterstate_features = None
+
+    def reset(self):
+        """ Forget the previous game's transition; the loaded weights are kept. """
+        super().reset()
         self.last_state_features = None
         self.last_state_value = 0.0
         self.last_reward = 0.0
+        self.last_afterstate_features = None
+
+    @property
+    def weights(self):
+        return self.value_fn.weights
+
+    @weights.setter
+    def weights(self, value):
+        self.value_fn.weights = value
 
     def _extract_features(self, grid):
-        """ Extracts features from the grid state. Normalize or scale features appropriately. """
-        def potential_merge_bonus(g, weight=2.0):
-            """Bonus for adjacent tiles with same value (potential merges)"""
-            bonus = 0
-            for i in range(4):
-                for j in range(4):
-                    if g[i][j] == 0:
-                        continue
-                    # Check right neighbor
-                    if j < 3 and g[i][j] == g[i][j+1]:
-                        bonus += g[i][j]
-                    # Check bottom neighbor
-                    if i < 3 and g[i][j] == g[i+1][j]:
-                        bonus += g[i][j]
-            return weight * bonus
-        
-        features = np.zeros(self.num_features)
-        idx = 0
-        
-        W = [
-            [2**15, 2**14, 2**13, 2**12],
-            [2**8,  2**9,  2**10, 2**11],
-            [2**7,  2**6,   2**5,  2**4],
-            [2**0,  2**1,   2**2,  2**3]
-        ]
-        for i in range(4):
-            for j in range(4):
-                features[idx] = grid[i][j] * W[i][j]
-                idx += 1
-        
-        features[idx] = empty_score(grid)  # Empty cell bonus
-        idx += 1
-
-        features[idx] = smoothness_score(grid)  # Smoothness score
-        idx += 1
-
-        features[idx] = monotonicity_score(grid)
-        idx += 1
-
-        features[idx] = potential_merge_bonus(grid)
-        idx += 1
-
-        return features
+        """ Features of the grid for the configured value function. """
+        return self.value_fn.features(grid)
 
     def _get_value(self, grid):
-        """ Estimates the value of a state using the linear function approximator. """
-        features = self._extract_features(grid)
-        return np.dot(self.weights, features)
+        """ Estimates the value of a state using the configured function approximator. """
+        return self.value_fn.value(self.value_fn.features(grid))
 
     def get_move(self, training=False):
-        """ Chooses the best move based on the estimated value of the next state. """
-        valid_moves = self.get_valid_moves()
-        
+        """
+        Chooses the best move based on the estimated value of the next state.
+        All four afterstates are built and scored in one batched pass (see
+        simulation/vector_board.py); the reward of the chosen move is taken from
+        the same features instead of being recomputed.
+        """
+        stats = self.begin_stats()
+        board = vector_board.from_grids([self.game.grid])
+        after, gained, changed = vector_board.afterstates(board)
+        after, gained, changed = after[0], gained[0], changed[0]
+
         # If there are no valid moves, the game should be over
-        if not valid_moves:
+        if not changed.any():
             raise ValueError("No valid moves available - game should be over")
-            
-        best_move = None
-        best_value = -float('inf')
-        current_grid = self.game.grid
-        
+
+        valid = np.flatnonzero(changed)
+        stats.nodes_expanded = 1
+        stats.children_generated = len(valid)
+        stats.max_depth = 1
+
+        value_fn = self.value_fn
+        features = value_fn.batch_features(after[valid])
+
         # Epsilon-greedy policy for training
         if training and random.random() < self.epsilon:
-            choice = random.choice(valid_moves)
-            sim_grid, score, _ = simulate_move_on_grid(current_grid, choice)
-            max_tile = max(max(row) for row in sim_grid)
-            self.last_reward = math.log2(max_tile) + (0.01 * calculate_heuristic(sim_grid))
-            return choice
-        
-        # Greedy action selection: choose the move that leads to the highest value state
-        for move in valid_moves:
-            sim_grid, score, _ = simulate_move_on_grid(current_grid, move)
-            value = self._get_value(sim_grid)
-            if value > best_value:
-                best_value = value
-                best_move = move
-                max_tile = max(max(row) for row in sim_grid)
-                best_reward = math.log2(max_tile) + (0.01 * calculate_heuristic(sim_grid))
-            
-        self.last_reward = best_reward
-        return best_move
+            pick = random.randrange(len(valid))
+        else:
+            # Greedy action selection: choose the move that leads to the highest value state
+            values = value_fn.batch_values(features)
+            stats.nodes_evaluated = len(valid)
+            if value_fn.greedy_adds_reward:
+                values = values + gained[valid]
+            pick = int(values.argmax())
+            if np.isnan(values[pick]):
+                # diverged weights: skip NaN estimates, or play the first valid move if all are NaN
+                pick = 0 if np.isnan(values).all() else int(np.nanargmax(values))
+
+        self.last_reward = float(value_fn.batch_reward(after[valid[pick:pick + 1]], features[pick:pick + 1],
+                                                       gained[valid[pick:pick + 1]])[0])
+        # features of the chosen afterstate, for afterstate learners (see agents/td_lambda.py)
+        self.last_afterstate_features = features[pick]
+        return vector_board.MOVES[valid[pick]]
 
     def update_weights(self, current_grid_features):
         """
         Perform the TD(0) update after a move has been made and the next state is observed.
         Requires the features of the state *before* the move (`current_grid_features`),
-        the reward received (`self.last_reward`), and the estimated value of the 
+        the reward received (`self.last_reward`), and the estimated value of the
         state *after* the move (`self.last_state_value`).
-        
+
         NOTE: This needs to be called externally during a training loop.
         The value `self.last_state_value` is the V(s') part.
         The value V(s) needs to be calculated from `current_grid_features`.
@@ -129,25 +136,30 @@ class TDLearningAgent(Agent):
             print("Skipping TD update: Missing state features.") # Debug print
             return # Not enough info for update
 
-        v_s = np.dot(self.weights, current_grid_features) 
-        v_s_prime = np.dot(self.weights, self.last_state_features) 
+        v_s = self.value_fn.value(current_grid_features)
+        v_s_prime = self.value_fn.value(self.last_state_features)
         td_err   = self.last_reward + self.discount_factor*v_s_prime - v_s
-        
+
+        if not self.weights.flags.writeable:
+            # weights are still the shared read-only mapping; train on a private copy
+            self.weights = np.array(self.weights)
+
         # Update weights: w = w + alpha * delta * grad(V(s))
-        # For linear function, grad(V(s)) is just the feature vector s
-        self.weights += self.learning_rate * td_err * current_grid_features
-        
+        # For linear function, grad(V(s)) is just the feature vector s;
+        # for the n-tuple network it is 1 at each active table entry
+        self.value_fn.update(current_grid_features, self.learning_rate * td_err)
+
         # Optional: Clip weights or check for NaN/Inf
-        if np.isnan(self.weights).any() or np.isinf(self.weights).any():
+        if self.value_fn.sanitize(current_grid_features): # Replaces NaN/Inf with finite values
             print("Warning: NaN or Inf detected in weights. Resetting problematic weights?")
-            # Handle reset or stop training
-            self.weights = np.nan_to_num(self.weights) # Example: Replace NaN/Inf with zero
 
     def save_weights(self):
-        """Saves the learned weights to a file."""
+        """Saves the learned weights to a file (atomically, see agents/weight_store.py)."""
         try:
-            with open(self.weights_file, 'w') as f:
-                json.dump(self.weights.tolist(), f)
+            if self._uses_json():
+                weight_store.save_json_weights(self.weights_file, self.weights)
+            else:
+                self.weights_version = weight_store.save_weights(self.weights_file, self.weights, **self.weights_meta())
             # print(f"Weights saved to {self.weights_file}") # Less frequent print
         except Exception as e:
             print(f"Error saving weights: {e}")
@@ -156,19 +168,33 @@ class TDLearningAgent(Agent):
         """Loads weights from a file if it exists."""
         if os.path.exists(self.weights_file):
             try:
-                with open(self.weights_file, 'r') as f:
-                    loaded_weights = np.array(json.load(f))
-                    if loaded_weights.shape == self.weights.shape:
-                        self.weights = loaded_weights
-                        print(f"Weights loaded from {self.weights_file}")
-                    else:
-                         print(f"Warning: Loaded weights shape mismatch ({loaded_weights.shape} vs {self.weights.shape}). Ignoring file.")
+                if self._uses_json():
+                    with open(self.weights_file, 'r') as f:
+                        loaded_weights = np.array(json.load(f))
+                else:
+                    loaded_weights, header = weight_store.load_weights(self.weights_file)
+                    self.weights_version = header.get('version', 0)
+                if loaded_weights.shape == self.weights.shape:
+                    self.weights = loaded_weights
+                    print(f"Weights loaded from {self.weights_file}")
+                else:
+                     print(f"Warning: Loaded weights shape mismatch ({loaded_weights.shape} vs {self.weights.shape}). Ignoring file.")
             except Exception as e:
                 print(f"Error loading weights: {e}. Using zeros.")
+        elif not self._uses_json():
+            # binary tables can be large; only written once there is something learned
+            print("Weights file not found. Using zero weights.")
         else:
-            print("Weights file not found. Using zero weights.") 
+            print("Weights file not found. Using zero weights.")
             try:
                 with open(self.weights_file, 'w') as f:
                     json.dump(self.weights.tolist(), f)
             except Exception as e:
-                print(f"Error creating new weights file: {e}")
\ No newline at end of file
+                print(f"Error creating new weights file: {e}")
+
+    def weights_meta(self):
+        """ Header metadata stored with binary weight files. """
+        return {'kind': self.value_fn.kind, 'tuples': [list(t) for t in getattr(self.value_fn, 'tuples', [])]}
+
+    def _uses_json(self):
+        return self.weights_file.endswith('.json')
@@ -0,0 +1,220 @@
+import math
+import numpy as np
+from simulation.game_utils import empty_score, calculate_heuristic, smoothness_score, monotonicity_score
+from simulation import vector_board
+
+class LinearValueFunction:
+    """
+    The original 20-feature linear model: snake-weighted tiles, empty cells,
+    smoothness, monotonicity and a merge bonus. Value = weights . features.
+    """
+    kind = 'linear'
+    num_features = 20
+    # Move selection ranks afterstates by value alone (reward is only used for learning)
+    greedy_adds_reward = False
+
+    def __init__(self):
+        self.weights = np.zeros(self.num_features)
+
+    def features(self, grid):
+        """ Extracts features from the grid state. Normalize or scale features appropriately. """
+        def potential_merge_bonus(g, weight=2.0):
+            """Bonus for adjacent tiles with same value (potential merges)"""
+            bonus = 0
+            for i in range(4):
+                for j in range(4):
+                    if g[i][j] == 0:
+                        continue
+                    # Check right neighbor
+                    if j < 3 and g[i][j] == g[i][j+1]:
+                        bonus += g[i][j]
+                    # Check bottom neighbor
+                    if i < 3 and g[i][j] == g[i+1][j]:
+                        bonus += g[i][j]
+            return weight * bonus
+
+        features = np.zeros(self.num_features)
+        idx = 0
+
+        W = [
+            [2**15, 2**14, 2**13, 2**12],
+            [2**8,  2**9,  2**10, 2**11],
+            [2**7,  2**6,   2**5,  2**4],
+            [2**0,  2**1,   2**2,  2**3]
+        ]
+        for i in range(4):
+            for j in range(4):
+                features[idx] = grid[i][j] * W[i][j]
+                idx += 1
+
+        features[idx] = empty_score(grid)  # Empty cell bonus
+        idx += 1
+
+        features[idx] = smoothness_score(grid)  # Smoothness score
+        idx += 1
+
+        features[idx] = monotonicity_score(grid)
+        idx += 1
+
+        features[idx] = potential_merge_bonus(grid)
+        idx += 1
+
+        return features
+
+    def value(self, features):
+        return np.dot(self.weights, features)
+
+    def update(self, features, step):
+        """ w += step * grad(V) = step * features """
+        self.weights += step * features
+
+    def sanitize(self, features):
+        """ Replaces NaN/Inf weights with finite values; returns True if any were found. """
+        if np.isnan(self.weights).any() or np.isinf(self.weights).any():
+            np.nan_to_num(self.weights, copy=False)
+            return True
+        return False
+
+    def reward(self, grid, score_increase):
+        """ Shaped reward used by the original TD agent. """
+        max_tile = max(max(row) for row in grid)
+        return math.log2(max_tile) + (0.01 * calculate_heuristic(grid))
+
+    # --- Batched versions over (B, 16) exponent boards (see simulation/vector_board.py) ---
+
+    def batch_features(self, boards):
+        return vector_board.linear_features(boards)
+
+    def batch_values(self, features):
+        return features @ self.weights
+
+    def batch_update(self, features, steps):
+        """ Sum of the per-row updates, all computed with the current weights. """
+        self.weights += steps @ features
+
+    def batch_reward(self, boards, features, score_increase):
+        # log2 of the max tile is its exponent; the heuristic is the sum of features 0-18
+        return boards.max(axis=1) + 0.01 * vector_board.heuristics(boards, features)
+
+
+# Tuple layouts as flat cell indices (row * 4 + col)
+NTUPLE_PRESETS = {
+    # Four 6-tuples (two straight 2x3 blocks, two bent), ~67M weights in total
+    '4x6': [
+        (0, 1, 2, 3, 4, 5),
+        (4, 5, 6, 7, 8, 9),
+        (0, 1, 2, 4, 5, 6),
+        (4, 5, 6, 8, 9, 10),
+    ],
+    # Two rows and three 2x2 squares, ~330K weights; quick to train and load
+    '5x4': [
+        (0, 1, 2, 3),
+        (4, 5, 6, 7),
+        (0, 1, 4, 5),
+        (1, 2, 5, 6),
+        (5, 6, 9, 10),
+    ],
+}
+
+def _board_symmetries():
+    """ The 8 rotations/reflections of the board as cell-index permutations. """
+    cells = np.arange(16).reshape(4, 4)
+    syms = []
+    for k in range(4):
+        rotated = np.rot90(cells, k)
+        syms.append(rotated.ravel())
+        syms.append(np.fliplr(rotated).ravel())
+    return syms
+
+class NTupleNetwork:
+    """
+    N-tuple network value function. Each tuple of 4-6 cells owns a dense
+    lookup table with one weight per combination of tile exponents, indexed by
+    the packed exponents (4 bits per cell). Every tuple is sampled under all 8
+    board symmetries with shared weights, so V(board) is the sum of
+    len(tuples) * 8 table reads. All tables live in one flat float32 array.
+    """
+    kind = 'ntuple'
+    # Afterstate learning: moves are ranked by reward + V(afterstate)
+    greedy_adds_reward = True
+
+    def __init__(self, tuples='5x4', weights=None):
+        if isinstance(tuples, str):
+            tuples = NTUPLE_PRESETS[tuples]
+        self.tuples = [tuple(t) for t in tuples]
+        width = max(len(t) for t in self.tuples)
+
+        sizes = [16 ** len(t) for t in self.tuples]
+        table_offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        self.num_weights = int(sum(sizes))
+
+        # One row per (tuple, symmetry): the cells to read and their place values.
+        # Shorter tuples are padded with cell 0 at place value 0, which adds nothing.
+        cells, places, offsets = [], [], []
+        for t, offset in zip(self.tuples, table_offsets):
+            pad = width - len(t)
+            for sym in _board_symmetries():
+                cells.append([int(sym[c]) for c in t] + [0] * pad)
+                places.append([16 ** j for j in range(len(t))] + [0] * pad)
+                offsets.append(offset)
+        self._cells = np.array(cells, dtype=np.intp)
+        self._places = np.array(places, dtype=np.int64)
+        self._offsets = np.array(offsets, dtype=np.int64)
+
+        if weights is None:
+            weights = np.zeros(self.num_weights, dtype=np.float32)
+        self.weights = weights
+
+    @staticmethod
+    def exponents(grid):
+        """ Tile exponents of a grid, row-major. """
+        exps = np.zeros(16, dtype=np.int64)
+        idx = 0
+        for row in grid:
+            for cell in row:
+                if cell:
+                    exps[idx] = min(cell.bit_length() - 1, 15)
+                idx += 1
+        return exps
+
+    def indices(self, exps):
+        """ Flat weight indices for exponent array(s) of shape (..., 16). """
+        return (exps[..., self._cells] * self._places).sum(axis=-1) + self._offsets
+
+    def features(self, grid):
+        """ The active weight indices of a grid: the n-tuple network's sparse features. """
+        return self.indices(self.exponents(grid))
+
+    def value(self, features):
+        return float(self.weights[features].sum())
+
+    def update(self, features, step):
+        """ Every active weight moves by `step`; repeated indices (symmetric boards) accumulate. """
+        np.add.at(self.weights, features, step)
+
+    def sanitize(self, features):
+        """ Like LinearValueFunction.sanitize, but only the entries just updated are checked. """
+        touched = self.weights[features]
+        if not np.isfinite(touched).all():
+            self.weights[features] = np.nan_to_num(touched)
+            return True
+        return False
+
+    def reward(self, grid, score_increase):
+        """ Afterstate learning uses the game score gained by the move. """
+        return score_increase
+
+    # --- Batched versions over (B, 16) exponent boards (see simulation/vector_board.py) ---
+
+    def batch_features(self, boards):
+        return self.indices(boards)
+
+    def batch_values(self, features):
+        return self.weights[features].sum(axis=-1, dtype=np.float64)
+
+    def batch_update(self, features, steps):
+        """ Sum of the per-row updates, as one update() per row with the current weights. """
+        np.add.at(self.weights, features, np.asarray(steps, dtype=self.weights.dtype)[:, None])
+
+    def batch_reward(self, boards, features, score_increase):
+        return score_increase
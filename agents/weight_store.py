@@ -0,0 +1,251 @@
+"""
+Binary weight files for the TD agents.
+
+Layout: an 8-byte magic, a little-endian uint32 header length, a JSON header
+(dtype, shape, version and free-form metadata), zero padding up to a 64-byte
+boundary, then the raw C-order array data. Files are opened with np.memmap in
+read-only mode, so loading costs a stat and an mmap regardless of table size,
+and every process reading the same file shares its pages through the OS page
+cache. Writes go to a temporary file in the same directory and are moved into
+place with os.replace, so readers only ever see a complete old or new version;
+mappings taken before a replace keep reading the old data.
+"""
+import json
+import os
+import struct
+import threading
+import numpy as np
+
+MAGIC = b'W2048TD\x00'
+ALIGNMENT = 64
+_LEN = struct.Struct('<I')
+
+# path -> (file identity, array, header); identity changes on every atomic replace
+_mapped = {}
+_mapped_lock = threading.Lock()
+
+def _identity(path):
+    st = os.stat(path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def is_weight_file(path):
+    """True if `path` exists and starts with the weight store magic."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def read_header(path):
+    """Returns (header dict, data offset) of a weight file."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a weight store file")
+        (length,) = _LEN.unpack(f.read(_LEN.size))
+        header = json.loads(f.read(length).decode('utf-8'))
+    offset = len(MAGIC) + _LEN.size + length
+    offset += -offset % ALIGNMENT
+    return header, offset
+
+def load_weights(path, mmap=True):
+    """
+    Returns (weights, header). With mmap=True (default) weights is a read-only
+    memory map, cached per process until the file is replaced; copy it (np.array)
+    before modifying. With mmap=False the data is read into a private array.
+    """
+    identity = _identity(path)
+    if mmap:
+        with _mapped_lock:
+            cached = _mapped.get(path)
+            if cached is not None and cached[0] == identity:
+                return cached[1], cached[2]
+
+    header, offset = read_header(path)
+    dtype = np.dtype(header['dtype'])
+    shape = tuple(header['shape'])
+    if mmap:
+        weights = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        with _mapped_lock:
+            _mapped[path] = (identity, weights, header)
+    else:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            weights = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    return weights, header
+
+def release(path):
+    """ Drops the cached mapping of `path` (e.g. before deleting a file this process loaded). """
+    with _mapped_lock:
+        _mapped.pop(path, None)
+
+def save_weights(path, weights, version=None, **meta):
+    """
+    Atomically writes `weights` to `path`. The version defaults to the version of
+    the file being replaced plus one (1 for a new file). Extra keyword arguments
+    are stored in the header. Returns the version written.
+    """
+    weights = np.ascontiguousarray(weights)
+    if version is None:
+        version = 1
+        if is_weight_file(path):
+            version = int(read_header(path)[0].get('version', 0)) + 1
+
+    header = dict(meta, dtype=weights.dtype.str, shape=list(weights.shape), version=int(version))
+    header_bytes = json.dumps(header).encode('utf-8')
+    offset = len(MAGIC) + _LEN.size + len(header_bytes)
+    padding = -offset % ALIGNMENT
+
+    def write(f):
+        f.write(MAGIC)
+        f.write(_LEN.pack(len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\x00' * padding)
+        weights.tofile(f)
+
+    _atomic_write(path, write, 'wb')
+    return version
+
+def save_json_weights(path, weights):
+    """ Atomically writes `weights` as a JSON list (the original TD weight format). """
+    _atomic_write(path, lambda f: json.dump(np.asarray(weights).tolist(), f), 'w')
+
+def _tmp_path(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    return os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def _atomic_write(path, write, mode):
+    """ write(f) into a temporary file next to `path`, fsync, then rename over `path`. """
+    tmp_path = _tmp_path(path)
+    try:
+        with open(tmp_path, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def checkpoint_path(path, number):
+    """ td_ntuple_5x4.weights, 12 -> td_ntuple_5x4.ckpt-000012.weights """
+    root, ext = os.path.splitext(path)
+    return f"{root}.ckpt-{number:06d}{ext}"
+
+def list_checkpoints(path):
+    """ [(number, checkpoint path)] of `path`'s checkpoints, oldest first. """
+    root, ext = os.path.splitext(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    prefix = os.path.basename(root) + ".ckpt-"
+    found = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(ext):
+            number = name[len(prefix):len(name) - len(ext)]
+            if number.isdigit():
+                found.append((int(number), os.path.join(directory, name)))
+    return sorted(found)
+
+class AsyncCheckpointer:
+    """
+    Writes weight checkpoints on a background thread so training never waits on disk.
+
+    submit() copies the weights in the calling thread (a memory copy, so later
+    training updates don't leak into the snapshot) and returns. The writer thread
+    saves the snapshot as a numbered checkpoint next to `path` (see
+    checkpoint_path), then points `path` itself at it with a hard link and
+    os.replace, falling back to a second atomic write where links aren't
+    supported. Every file appears atomically, so a crash never leaves a torn
+    file. Only the newest `keep` checkpoints are kept. If snapshots arrive faster
+    than they can be written, the pending one is replaced by the newer one rather
+    than queued. Files ending in .json use the JSON format, anything else the
+    binary format. on_written(checkpoint path, number), if given, is called from
+    the writer thread after each checkpoint.
+    """
+    def __init__(self, path, keep=3, meta=None, on_written=None):
+        self.path = path
+        self.on_written = on_written
+        self.keep = max(1, int(keep))
+        self.meta = dict(meta or {})
+        self.written = 0 # checkpoints written by this checkpointer
+        self.last_checkpoint = None
+        self.dropped = 0 # snapshots replaced before they were written
+        self.last_error = None
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="weight-checkpointer", daemon=True)
+        self._thread.start()
+
+    def submit(self, weights, number):
+        """ Snapshot `weights` as checkpoint `number` (e.g. the episode count). """
+        snapshot = np.array(weights, copy=True)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Checkpointer is closed")
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (snapshot, int(number))
+            self._cond.notify_all()
+
+    def wait(self):
+        """ Blocks until every submitted snapshot has been written. """
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+
+    def close(self):
+        """ Writes the pending snapshot, then stops the thread. """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                snapshot, number = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                self._write(snapshot, number)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error saving weights: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, weights, number):
+        target = checkpoint_path(self.path, number)
+        if self.path.endswith('.json'):
+            save_json_weights(target, weights)
+        else:
+            save_weights(target, weights, version=number, **self.meta)
+
+        # the main file becomes the latest checkpoint
+        tmp_path = _tmp_path(self.path)
+        try:
+            os.link(target, tmp_path)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if self.path.endswith('.json'):
+                save_json_weights(self.path, weights)
+            else:
+                save_weights(self.path, weights, version=number, **self.meta)
+
+        self.written += 1
+        self.last_checkpoint = target
+        if self.on_written:
+            self.on_written(target, number)
+        for _, old in list_checkpoints(self.path)[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
@@ -11,14 +11,13 @@ import os
 import numpy as np
 from dotenv import load_dotenv
 from simulation.simulation_worker import run_simulation_worker, simulation_status, simulation_thread
+from simulation.async_simulation_worker import run_async_simulation_worker
 from simulation.training_td_worker import train_td_worker, training_status, training_thread
 import argparse
 
-load_dotenv()
-# Ensure WANDB_API_KEY is set as an environment variable
-wandb.login(key=os.getenv("WANDB_API_KEY"))
-
-game_instance = Game()
+# Process setup (.env, wandb login, the browser game) runs under __main__ below:
+# training and evaluation workers are spawned and re-import this module as __mp_main__.
+game_instance = None
 
 @app.route('/')
 def index():
@@ -106,7 +105,7 @@ def run_simulation_endpoint():
     agent_params = {}
     for key, value in data.items():
         # Skip non-parameter fields
-        if key not in ['agent_name', 'num_games', 'wandb_project', 'wandb_entity']:
+        if key not in ['agent_name', 'num_games', 'wandb_project', 'wandb_entity', 'heuristic_cache_size', 'concurrency']:
             try:
                 # Try to convert string values to appropriate types
                 if isinstance(value, str):
@@ -131,12 +130,44 @@ def run_simulation_endpoint():
     except (TypeError, ValueError):
         return jsonify(status="error", message="Invalid number of games provided."), 400
 
+    # Optional size of the shared heuristic cache (0 disables it)
+    heuristic_cache_size = data.get('heuristic_cache_size')
+    if heuristic_cache_size is not None:
+        try:
+            heuristic_cache_size = int(heuristic_cache_size)
+            if heuristic_cache_size < 0:
+                raise ValueError()
+        except (TypeError, ValueError):
+            return jsonify(status="error", message="Invalid heuristic cache size provided."), 400
+
+    # Optional per-move search counters in the results (on by default)
+    collect_search_stats = data.get('collect_search_stats', True)
+    if not isinstance(collect_search_stats, bool):
+        return jsonify(status="error", message="Invalid collect_search_stats provided."), 400
+
+    # Optional number of games played concurrently (asyncio runner, for LLM agents)
+    try:
+        concurrency = int(data.get('concurrency', 1))
+        if concurrency <= 0:
+            raise ValueError()
+    except (TypeError, ValueError):
+        return jsonify(status="error", message="Invalid concurrency provided."), 400
+
     # Pass the agent parameters to the simulation worker
-    simulation_thread = threading.Thread(
-        target=run_simulation_worker, 
-        args=(agent_name, num_games, wandb_project, wandb_entity),
-        kwargs={'agent_params': agent_params}
-    )
+    if concurrency > 1:
+        simulation_thread = threading.Thread(
+            target=run_async_simulation_worker,
+            args=(agent_name, num_games, wandb_project, wandb_entity),
+            kwargs={'agent_params': agent_params, 'concurrency': concurrency,
+                    'collect_search_stats': collect_search_stats, 'heuristic_cache_size': heuristic_cache_size}
+        )
+    else:
+        simulation_thread = threading.Thread(
+            target=run_simulation_worker, 
+            args=(agent_name, num_games, wandb_project, wandb_entity),
+            kwargs={'agent_params': agent_params, 'collect_search_stats': collect_search_stats,
+                    'heuristic_cache_size': heuristic_cache_size}
+        )
     simulation_thread.start()
 
     return jsonify(status="ok", message="Simulation started.")
@@ -174,15 +205,48 @@ def train_td_agent_endpoint():
     try:
         num_episodes = int(data.get('num_episodes', 1000))
         save_interval = int(data.get('save_interval', 100))
-        if num_episodes <= 0 or save_interval <= 0:
+        num_workers = int(data.get('num_workers', 1))
+        batch_size = int(data.get('batch_size', 1))
+        algorithm = data.get('algorithm', 'td0')
+        trace_lambda = float(data.get('trace_lambda', 0.5))
+        replay_size = int(data.get('replay_size', 0))
+        replay_batch = int(data.get('replay_batch', 256))
+        replay_updates = int(data.get('replay_updates', 1))
+        keep_checkpoints = int(data.get('keep_checkpoints', 3))
+        if replay_size < 0 or replay_batch <= 0 or replay_updates <= 0 or keep_checkpoints <= 0:
+             raise ValueError()
+        eval_games = int(data.get('eval_games', 0))
+        eval_workers = int(data.get('eval_workers', 1))
+        eval_seed = int(data.get('eval_seed', 0))
+        if eval_games < 0 or eval_workers <= 0:
+             raise ValueError()
+        if num_episodes <= 0 or save_interval <= 0 or num_workers <= 0 or batch_size <= 0:
              raise ValueError()
+        if algorithm not in ('td0', 'td_lambda') or not 0 <= trace_lambda <= 1:
+             raise ValueError()
+        if replay_size and algorithm != 'td0':
+             raise ValueError()
+        # spill files of the replay buffer: a relative path that stays inside the working directory
+        replay_file = data.get('replay_file') or None
+        if replay_file is not None:
+            if not isinstance(replay_file, str) or os.path.isabs(replay_file) or not replay_size:
+                raise ValueError()
+            if os.path.normpath(replay_file).split(os.sep)[0] == os.pardir:
+                raise ValueError()
     except (TypeError, ValueError):
-        return jsonify(status="error", message="Invalid number of episodes or save interval."), 400
+        return jsonify(status="error", message="Invalid number of episodes, save interval, worker count, batch size, TD algorithm, replay, checkpoint or evaluation settings."), 400
 
-    training_thread = threading.Thread(target=train_td_worker, args=(num_episodes, save_interval))
+    # Optional TD agent settings, e.g. value_function='ntuple', ntuple_preset, learning_rate
+    agent_params = {key: data[key] for key in ('value_function', 'ntuple_preset', 'learning_rate', 'discount_factor', 'epsilon', 'weights_file') if key in data}
+
+    training_thread = threading.Thread(target=train_td_worker, args=(num_episodes, save_interval), kwargs={'agent_params': agent_params, 'num_workers': num_workers, 'batch_size': batch_size,
+                                              'algorithm': algorithm, 'trace_lambda': trace_lambda,
+                                              'replay_size': replay_size, 'replay_batch': replay_batch,
+                                              'replay_updates': replay_updates, 'replay_file': replay_file, 'keep_checkpoints': keep_checkpoints,
+                                              'eval_games': eval_games, 'eval_workers': eval_workers, 'eval_seed': eval_seed})
     training_thread.start()
 
-    return jsonify(status="ok", message=f"TD Training started for {num_episodes} episodes.")
+    return jsonify(status="ok", message=f"TD Training started for {num_episodes} episodes on {num_workers} worker(s).")
 
 @app.route('/training_status')
 def get_training_status():
@@ -190,6 +254,11 @@ def get_training_status():
     return jsonify(training_status)
 
 if __name__ == '__main__':
+    load_dotenv()
+    # Ensure WANDB_API_KEY is set as an environment variable
+    wandb.login(key=os.getenv("WANDB_API_KEY"))
+
+    game_instance = Game()
 
     parser = argparse.ArgumentParser(description="Run your Flask simulation app")
     parser.add_argument(
@@ -0,0 +1,204 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from simulation.game import Game
+from simulation.game_utils import configure_heuristic_cache, get_heuristic_cache
+from agents.search_stats import SearchStats
+from agents.llm_transport import configure_llm_transport, transport_config
+from simulation.simulation_worker import simulation_status, init_wandb_run, decision_time_percentiles, llm_results
+
+WIN_TILE = 2048
+MAX_MOVES = 5000
+
+async def _play_games(agent_name, agent_params, num_games, concurrency, on_game, collect_search_stats=True):
+    """
+    Plays num_games with up to `concurrency` games in flight on the running loop.
+    Each of the `concurrency` players owns a Game (and so one long-lived agent)
+    and keeps claiming the next game number until all are taken, so at most
+    `concurrency` model calls are outstanding at any time.
+    """
+    next_game = iter(range(num_games))
+
+    def make_game():
+        game = Game()
+        if not game.set_agent(agent_name, agent_params):
+            raise ValueError(f"Agent '{agent_name}' not found for simulation.")
+        return game
+
+    async def player():
+        game = make_game()
+        for index in next_game:
+            if simulation_status["terminated"]:
+                return
+            game.reset_grid()
+            start = time.perf_counter()
+            moves = 0
+            decision_times = []
+            search_stats = SearchStats()
+            budget_overruns = 0
+            game_over = False
+            while not game_over and not simulation_status["terminated"]:
+                decision_start = time.perf_counter()
+                move, moved, game_over, _ = await game.simulate_move_async()
+                decision_times.append(time.perf_counter() - decision_start)
+                if move is None:
+                    print(f"Agent error in game {index + 1}: {game.last_move}")
+                    break
+                if collect_search_stats:
+                    search_stats.add(game.agent.stats)
+                if game.agent.budget.exhausted:
+                    budget_overruns += 1
+                if moved:
+                    moves += 1
+                if moves > MAX_MOVES:
+                    print(f"Warning: Game {index + 1} exceeded {MAX_MOVES} moves. Terminating.")
+                    break
+            if simulation_status["terminated"]:
+                return
+            on_game({
+                "game_index": index,
+                "final_score": game.score,
+                "max_tile": game.get_max_tile(),
+                "moves": moves,
+                "game_time_s": time.perf_counter() - start,
+                "decision_times": decision_times,
+                "search_stats": search_stats,
+                "budget_overruns": budget_overruns,
+                "agent": game.agent,
+            })
+
+    await asyncio.gather(*(player() for _ in range(min(concurrency, num_games))))
+
+def run_async_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, agent_params=None, concurrency=8,
+                                collect_search_stats=True, heuristic_cache_size=None):
+    """
+    run_simulation_worker for agents that wait on the network (the LLM agents):
+    games are interleaved on an asyncio loop, `concurrency` at a time, each
+    awaiting its own model call (see LLMBaseAgent.get_move_async), so throughput
+    grows with concurrency instead of being bound by per-call latency. Blocking
+    provider calls run on a thread pool sized from `concurrency`, and the shared
+    HTTP pool (agents/llm_transport.py) is grown to match. collect_search_stats
+    and heuristic_cache_size work as in run_simulation_worker. Results use the
+    keys of run_simulation_worker plus concurrency and throughput; per-game CPU
+    and memory figures are omitted since games overlap.
+    """
+    run = None
+    try:
+        concurrency = max(1, int(concurrency))
+        simulation_status["running"] = True
+        simulation_status["progress"] = 0
+        simulation_status["total_games"] = num_games
+        simulation_status["results"] = None
+        simulation_status["error"] = None
+        simulation_status["terminated"] = False
+
+        run = init_wandb_run(agent_name, num_games, wandb_project, wandb_entity, agent_params,
+                             extra_config={"concurrency": concurrency})
+        if transport_config()["pool_size"] < concurrency:
+            configure_llm_transport(pool_size=concurrency)
+
+        # Optionally (re)size the process-wide heuristic cache shared with the web game
+        if heuristic_cache_size is not None:
+            configure_heuristic_cache(heuristic_cache_size)
+        heuristic_cache = get_heuristic_cache()
+        if heuristic_cache:
+            cache_start = heuristic_cache.stats()
+
+        games = []
+        def on_game(game):
+            games.append(game)
+            simulation_status["progress"] = len(games)
+            if run:
+                log_data = {
+                    "game_index": game["game_index"],
+                    "final_score": game["final_score"],
+                    "max_tile": game["max_tile"],
+                    "moves": game["moves"],
+                    "win": game["max_tile"] >= WIN_TILE,
+                    "game_time_s": game["game_time_s"],
+                    "avg_decision_time_s": sum(game["decision_times"]) / len(game["decision_times"]) if game["decision_times"] else 0,
+                    "budget_overruns": game["budget_overruns"],
+                }
+                if collect_search_stats:
+                    log_data.update(llm_results(game["search_stats"], 1))
+                run.log(log_data)
+
+        async def main():
+            # headroom for calls still running after their move deadline passed
+            executor = ThreadPoolExecutor(max_workers=4 * concurrency, thread_name_prefix="llm-call")
+            asyncio.get_running_loop().set_default_executor(executor)
+            await _play_games(agent_name, agent_params, num_games, concurrency, on_game, collect_search_stats)
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        wall_time = time.perf_counter() - start
+
+        if games:
+            games.sort(key=lambda g: g["game_index"])
+            scores = [g["final_score"] for g in games]
+            max_tiles = [g["max_tile"] for g in games]
+            decision_times = [t for g in games for t in g["decision_times"]]
+            mean_score = sum(scores) / len(scores)
+            search_stats = SearchStats()
+            for g in games:
+                search_stats.add(g["search_stats"])
+
+            results = {
+                "agent": agent_name,
+                "num_games": len(games),
+                "mean_score": mean_score,
+                "max_score": max(scores),
+                "min_score": min(scores),
+                "score_variance": sum((s - mean_score) ** 2 for s in scores) / len(scores),
+                "mean_max_tile": sum(max_tiles) / len(games),
+                "max_max_tile": max(max_tiles),
+                "win_rate": sum(t >= WIN_TILE for t in max_tiles) / len(games),
+                "mean_moves_to_game_over": sum(g["moves"] for g in games) / len(games),
+                "mean_decision_time_s": sum(decision_times) / len(decision_times) if decision_times else 0,
+                "mean_game_time_s": sum(g["game_time_s"] for g in games) / len(games),
+                "budget_overruns": sum(g["budget_overruns"] for g in games),
+                "budget_overrun_rate": sum(g["budget_overruns"] for g in games) / len(decision_times) if decision_times else 0,
+                "concurrency": concurrency,
+                "wall_time_s": wall_time,
+                "games_per_hour": len(games) / wall_time * 3600 if wall_time else 0,
+                "moves_per_s": len(decision_times) / wall_time if wall_time else 0,
+            }
+            results.update(decision_time_percentiles(decision_times))
+            if collect_search_stats:
+                results["search_stats"] = search_stats.summary()
+                results.update(llm_results(search_stats, len(games)))
+            llm_cache = getattr(games[-1]["agent"], "response_cache", None)
+            if llm_cache:
+                results["llm_cache"] = llm_cache.stats()
+            if heuristic_cache:
+                cache_stats = heuristic_cache.stats()
+                hits = cache_stats["hits"] - cache_start["hits"]
+                misses = cache_stats["misses"] - cache_start["misses"]
+                cache_stats["run_hit_ratio"] = hits / (hits + misses) if hits + misses else 0.0
+                results["heuristic_cache"] = cache_stats
+            if simulation_status["terminated"]:
+                results["terminated_early"] = True
+                results["completed_games"] = len(games)
+                results["total_games"] = num_games
+            simulation_status["results"] = results
+
+            if run:
+                try:
+                    run.summary.update(results)
+                    run.finish()
+                except Exception as e:
+                    print(f"Error updating WandB summary: {e}")
+        elif simulation_status["terminated"]:
+            simulation_status["results"] = {
+                "terminated_early": True,
+                "completed_games": 0,
+                "total_games": num_games
+            }
+
+    except Exception as e:
+        print(f"Simulation failed: {e}")
+        simulation_status["error"] = str(e)
+        if run: run.finish(exit_code=1)
+    finally:
+        simulation_status["running"] = False
+        simulation_status["terminated"] = False
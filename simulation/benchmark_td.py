@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Benchmark TD training: greedy score versus wall-clock training time for the
+TD(0) state-value path and afterstate TD(lambda).
+
+Each algorithm trains a fresh value function in chunks of episodes; after each
+chunk the training time so far is recorded and the weights are evaluated
+greedily (no exploration, no updates). Evaluation time is not counted.
+TD(lambda) trains greedily (epsilon 0), as afterstate learners usually do in
+2048 since tile placement already explores; TD(0) keeps the agent's default.
+
+Example:
+    python -m simulation.benchmark_td --value-function ntuple --preset 5x4 --seconds 120 --batch-size 256
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import training_td_worker
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare TD(0) and TD(lambda) training speed")
+    parser.add_argument('--algorithms', nargs='+', default=['td0', 'td_lambda'], choices=['td0', 'td_lambda'])
+    parser.add_argument('--value-function', default='ntuple', choices=['linear', 'ntuple'])
+    parser.add_argument('--preset', default='5x4', help="n-tuple preset (see NTUPLE_PRESETS)")
+    # batched steps are summed (see _play_batched), so 256 boards need a small rate
+    parser.add_argument('--learning-rate', type=float, default=0.0003)
+    parser.add_argument('--trace-lambda', type=float, default=0.5)
+    parser.add_argument('--seconds', type=float, default=60, help="training time budget per algorithm")
+    parser.add_argument('--chunk', type=int, default=200, help="training episodes between evaluations")
+    parser.add_argument('--eval-episodes', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=256)
+    return parser.parse_args()
+
+def benchmark(algorithm, args, workdir):
+    """Returns [(training seconds, episodes trained, mean greedy score)] for one algorithm."""
+    agent_params = {
+        'value_function': args.value_function,
+        'ntuple_preset': args.preset,
+        'learning_rate': args.learning_rate,
+        'epsilon': 0.0 if algorithm == 'td_lambda' else 0.2,
+        'weights_file': os.path.join(workdir, f"{algorithm}.weights"),
+    }
+    status = training_td_worker.training_status
+    points = []
+    trained_s = 0.0
+    episodes = 0
+    while trained_s < args.seconds:
+        start = time.perf_counter()
+        training_td_worker.train_td_worker(args.chunk, save_interval=args.chunk, agent_params=agent_params,
+                                           batch_size=args.batch_size, algorithm=algorithm,
+                                           trace_lambda=args.trace_lambda)
+        trained_s += time.perf_counter() - start
+        if status["error"]:
+            raise RuntimeError(status["error"])
+        episodes += args.chunk
+
+        training_td_worker.train_td_worker(args.eval_episodes, training=False, agent_params=agent_params,
+                                           batch_size=args.batch_size)
+        points.append((trained_s, episodes, status["current_avg_score"]))
+        print(f"[{algorithm}] {trained_s:7.1f}s  {episodes:7d} episodes  greedy score {status['current_avg_score']:9.1f}")
+    return points
+
+def main():
+    args = parse_args()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for algorithm in args.algorithms:
+            results[algorithm] = benchmark(algorithm, args, workdir)
+
+    print("\nalgorithm,train_seconds,episodes,greedy_score")
+    for algorithm, points in results.items():
+        for trained_s, episodes, score in points:
+            print(f"{algorithm},{trained_s:.1f},{episodes},{score:.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -23,10 +23,15 @@ class Game:
         self.agent_name = default_agent_name
         self.agent_params = None
         self.agent = None
+        self._agent_built_for = None # (name, params, instance) of the agent reset_grid last built
         self.reset_grid()
 
     def reset_grid(self):
-        """Reset the grid, clear last move, and instantiate the current agent."""
+        """
+        Reset the grid, clear last move and start the current agent on the new game.
+        The agent instance is built once and reused (agent.reset()) until the agent
+        or its params change, so weights and API clients aren't rebuilt per game.
+        """
         self.grid = [[0 for _ in range(4)] for _ in range(4)]
         self.last_move = ""
         self.score = 0
@@ -34,10 +39,16 @@ class Game:
         self.add_random_tile()
         # Ensure agent is instantiated *after* the grid is initialized
         if self.agent_class:
+            spec = (self.agent_name, dict(self.agent_params or {}))
+            # an instance assigned from outside (e.g. the TD trainer's) is replaced as before
+            if self._agent_built_for == spec + (self.agent,):
+                self.agent.reset()
+                return
             # Use centralized parameter handling
             self.agent = get_agent_with_params(self.agent_name, self, self.agent_params)
             if not self.agent:
                 raise Exception(f"Failed to instantiate agent '{self.agent_name}' with params {self.agent_params}")
+            self._agent_built_for = spec + (self.agent,)
         else:
              # This indicates a problem during __init__
              raise Exception("Agent class not set during Game initialization.")
@@ -81,6 +92,34 @@ class Game:
 
     def simulate_move(self):
         """Get a move from the agent, execute it, add tile if moved, check game over."""
+        finished = self._check_can_move()
+        if finished:
+            return finished
+
+        try:
+            move = self.agent.get_move()
+            return self._play_agent_move(move)
+        except Exception as e:
+            return self._agent_error(e)
+
+    async def simulate_move_async(self):
+        """
+        simulate_move for the asyncio runner: awaits agent.get_move_async when the
+        agent has one (LLM agents), otherwise calls get_move directly.
+        """
+        finished = self._check_can_move()
+        if finished:
+            return finished
+
+        try:
+            get_move_async = getattr(self.agent, "get_move_async", None)
+            move = await get_move_async() if get_move_async else self.agent.get_move()
+            return self._play_agent_move(move)
+        except Exception as e:
+            return self._agent_error(e)
+
+    def _check_can_move(self):
+        """The game-over result of simulate_move if no move can be made, else None."""
         if not self.agent:
              # This might happen if agent fails to instantiate in reset_grid
              raise Exception("Agent not initialized! Cannot simulate move.")
@@ -89,49 +128,49 @@ class Game:
         if self.is_game_over():
             self.last_move = "GAME OVER - No valid moves"
             return None, False, True, self.score
+        return None
 
-        try:
-            move = self.agent.get_move()
-            
-            # Ensure move is valid
-            if move not in ["UP", "DOWN", "LEFT", "RIGHT"]:
-                error_msg = f"Invalid move '{move}' returned by agent"
-                self.last_move = f"ERROR: {error_msg}"
-                game_over = self.is_game_over()
-                return None, False, game_over, self.score
-                
-            moved = self.move_grid(move)
-
-            if moved:
-                self.add_random_tile()
-                self.last_move = move
-            else:
-                # This should not happen anymore with our improved logic,
-                # but we keep it as a safeguard
-                self.last_move = f"{move} (invalid - no change in grid)"
-
-            game_over = self.is_game_over()
-            return move, moved, game_over, self.score
-            
-        except Exception as e:
-            # Log the error
-            error_msg = str(e)
-            traceback_str = traceback.format_exc()
-            print(f"Agent error: {error_msg}")
-            print(traceback_str)
-            
-            # Set error as last move for UI display
-            self.last_move = f"ERROR: {error_msg[:50]}..."
-            
-            # Return error state without moving
+    def _play_agent_move(self, move):
+        # Ensure move is valid
+        if move not in ["UP", "DOWN", "LEFT", "RIGHT"]:
+            error_msg = f"Invalid move '{move}' returned by agent"
+            self.last_move = f"ERROR: {error_msg}"
             game_over = self.is_game_over()
             return None, False, game_over, self.score
+            
+        moved = self.move_grid(move)
+
+        if moved:
+            self.add_random_tile()
+            self.last_move = move
+        else:
+            # This should not happen anymore with our improved logic,
+            # but we keep it as a safeguard
+            self.last_move = f"{move} (invalid - no change in grid)"
+
+        game_over = self.is_game_over()
+        return move, moved, game_over, self.score
+
+    def _agent_error(self, e):
+        # Log the error
+        error_msg = str(e)
+        traceback_str = traceback.format_exc()
+        print(f"Agent error: {error_msg}")
+        print(traceback_str)
+        
+        # Set error as last move for UI display
+        self.last_move = f"ERROR: {error_msg[:50]}..."
+        
+        # Return error state without moving
+        game_over = self.is_game_over()
+        return None, False, game_over, self.score
 
     def set_agent(self, agent_name, agent_params=None):
         """Set the agent class by name using the registry."""
         self.agent_name = agent_name
         self.agent_params = agent_params
         self.agent_class = get_agent(agent_name)
+        self._agent_built_for = None # rebuild on the next reset_grid, e.g. to pick up new weights
         
         if self.agent_class:
             print(f"Agent class set to: {agent_name} with params: {agent_params}")
@@ -1,6 +1,9 @@
 import math
 import random
 import copy 
+import os
+import threading
+from collections import OrderedDict
 # --- Static Game Logic Helpers ---
 
 def merge_row_left_static(row):
@@ -166,6 +169,113 @@ def smoothness_score(grid, weight=0.3):
                     penalty += abs(val - grid[i+1][j])
     return -weight * penalty
 
+# Keys of boards with a tile above 2**15 carry this bit above 16 5-bit fields,
+# so they never collide with the 64-bit keys of ordinary boards.
+_WIDE_KEY = 1 << 80
+
+def encode_grid(grid):
+    """
+    Pack a 4x4 grid into a single int, one 4-bit tile exponent per cell
+    (row-major, top-left cell in the most significant nibble). Empty cells are 0.
+    Boards up to tile 2**15 give a 64-bit key; a board with a larger tile
+    (65536 and up) is packed with 5 bits per cell and marked with _WIDE_KEY.
+    """
+    exps = [cell.bit_length() - 1 if cell else 0 for row in grid for cell in row]
+    bits = 5 if max(exps) > 15 else 4
+    key = 0
+    for exp in exps:
+        key = (key << bits) | exp
+    return key | _WIDE_KEY if bits == 5 else key
+
+def decode_grid(key):
+    """ Inverse of encode_grid: rebuild the list-of-lists grid from a packed key. """
+    bits, mask = (5, 0x1F) if key >= _WIDE_KEY else (4, 0xF)
+    grid = [[0] * 4 for _ in range(4)]
+    for idx in range(15, -1, -1):
+        exp = key & mask
+        if exp:
+            grid[idx // 4][idx % 4] = 1 << exp
+        key >>= bits
+    return grid
+
+class HeuristicCache:
+    """
+    Bounded, thread-safe LRU cache of calculate_heuristic values keyed by the
+    packed board (encode_grid). The heuristic is a pure function of the board,
+    so one cache can be shared by every agent, game and thread in the process.
+    Values are computed outside the lock; a racing duplicate computation is harmless.
+    """
+    def __init__(self, capacity=262144):
+        self.capacity = max(1, int(capacity))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, grid, key=None):
+        """Heuristic of `grid` (or of the packed `key` when grid is None)."""
+        if key is None:
+            key = encode_grid(grid)
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = calculate_heuristic(grid if grid is not None else decode_grid(key))
+        with self._lock:
+            self._data[key] = value
+            if len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+        return value
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hit_ratio,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+# Process-wide heuristic cache; disabled (None) unless configured, e.g. via HEURISTIC_CACHE_SIZE
+_heuristic_cache = None
+
+def configure_heuristic_cache(capacity):
+    """Enable the shared heuristic cache with `capacity` entries, or disable it with 0/None."""
+    global _heuristic_cache
+    _heuristic_cache = HeuristicCache(capacity) if capacity else None
+    return _heuristic_cache
+
+def get_heuristic_cache():
+    """The shared HeuristicCache, or None when caching is disabled."""
+    return _heuristic_cache
+
+def cached_heuristic(grid, score=None, key=None):
+    """
+    calculate_heuristic routed through the shared cache when it is enabled.
+    Pass the packed `key` if the caller already has it (grid may then be None).
+    """
+    cache = _heuristic_cache
+    if cache is None:
+        return calculate_heuristic(grid if grid is not None else decode_grid(key), score)
+    return cache.lookup(grid, key)
+
+configure_heuristic_cache(int(os.getenv("HEURISTIC_CACHE_SIZE", "0") or 0))
+
 def get_empty_cells(grid):
     """ Returns a list of (row, col) tuples for empty cells. """
     return [(r, c) for r in range(4) for c in range(4) if grid[r][c] == 0]
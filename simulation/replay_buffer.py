@@ -0,0 +1,63 @@
+import numpy as np
+from simulation import vector_board
+
+class ReplayBuffer:
+    """
+    Fixed-size ring buffer of TD transitions (state, reward, next state).
+
+    Boards are stored packed into one uint64 each (see vector_board.pack), so a
+    transition takes 20 bytes in three preallocated arrays. Adding overwrites the
+    oldest entries in O(1) per transition; sampling draws uniform indices and
+    unpacks the whole minibatch with array operations. With `path` the arrays
+    are memory-mapped .npy files (<path>.states.npy etc.) instead of RAM, for
+    buffers larger than memory or to keep them after the run.
+    """
+    def __init__(self, capacity, path=None):
+        self.capacity = int(capacity)
+        if self.capacity <= 0:
+            raise ValueError("Replay buffer capacity must be positive")
+        self.path = path
+        self.states = self._allocate('states', np.uint64)
+        self.next_states = self._allocate('next_states', np.uint64)
+        self.rewards = self._allocate('rewards', np.float32)
+        self.position = 0 # next slot to write
+        self.size = 0
+        self.added = 0 # transitions ever added
+
+    def _allocate(self, name, dtype):
+        if self.path is None:
+            return np.zeros(self.capacity, dtype=dtype)
+        return np.lib.format.open_memmap(f"{self.path}.{name}.npy", mode='w+', dtype=dtype, shape=(self.capacity,))
+
+    def __len__(self):
+        return self.size
+
+    def add(self, states, rewards, next_states):
+        """ Appends a batch of transitions given as (n, 16) exponent boards and (n,) rewards. """
+        n = len(states)
+        if n == 0:
+            return
+        if n > self.capacity:
+            states, rewards, next_states = states[-self.capacity:], rewards[-self.capacity:], next_states[-self.capacity:]
+            n = self.capacity
+        slots = (self.position + np.arange(n)) % self.capacity
+        self.states[slots] = vector_board.pack(states)
+        self.next_states[slots] = vector_board.pack(next_states)
+        self.rewards[slots] = rewards
+        self.position = int((self.position + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+        self.added += n
+
+    def sample(self, batch_size, rng):
+        """ Uniform minibatch: (states (b, 16), rewards (b,), next states (b, 16)). """
+        if self.size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        idx = rng.integers(0, self.size, size=batch_size)
+        return (vector_board.unpack(self.states[idx]), self.rewards[idx].astype(np.float64),
+                vector_board.unpack(self.next_states[idx]))
+
+    def flush(self):
+        """ Writes memory-mapped arrays to disk (no-op in memory). """
+        for array in (self.states, self.next_states, self.rewards):
+            if isinstance(array, np.memmap):
+                array.flush()
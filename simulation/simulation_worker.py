@@ -1,4 +1,6 @@
 from simulation.game import Game
+from agents.search_stats import SearchStats
+from simulation.game_utils import configure_heuristic_cache, get_heuristic_cache
 import time
 import psutil
 import wandb
@@ -14,7 +16,90 @@ simulation_status = {
 }
 simulation_thread = None
 
-def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, agent_params=None):
+def decision_time_percentiles(decision_times):
+    """p50 / p90 / p99 / max of the per-move decision times (nearest rank)."""
+    if not decision_times:
+        return {}
+    ordered = sorted(decision_times)
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+    return {
+        "p50_decision_time_s": rank(50),
+        "p90_decision_time_s": rank(90),
+        "p99_decision_time_s": rank(99),
+        "max_decision_time_s": ordered[-1],
+    }
+
+def llm_results(search_stats, num_games):
+    """
+    LLM figures from summed search stats: API calls, retries and prompt / cached /
+    completion tokens per game, mean call latency, and the share of moves played
+    from the deadline fallback / a multi-move plan / delegated to the model by
+    the hybrid_llm agent. Pass one game's stats and
+    num_games=1 for per-game figures. Empty for agents that don't call a model.
+    """
+    extras = search_stats.extras
+    if not any(key in extras for key in ("llm_calls", "llm_fallbacks", "llm_plan_moves", "llm_cache_hits", "llm_delegated_moves")):
+        return {}
+    decisions = search_stats.decisions or 1
+    def per_game(key):
+        return extras.get(key, 0) / num_games if num_games else 0.0
+    prompt_tokens = extras.get("llm_prompt_tokens", 0)
+    calls = extras.get("llm_calls", 0)
+    return {
+        "llm_calls_per_game": per_game("llm_calls"),
+        "llm_retries_per_game": per_game("llm_retries"),
+        "llm_retry_wait_s_per_game": per_game("llm_retry_wait_s"),
+        "llm_prompt_tokens_per_game": per_game("llm_prompt_tokens"),
+        "llm_cached_tokens_per_game": per_game("llm_cached_tokens"),
+        "llm_completion_tokens_per_game": per_game("llm_completion_tokens"),
+        "llm_cached_token_rate": extras.get("llm_cached_tokens", 0) / prompt_tokens if prompt_tokens else 0.0,
+        "mean_llm_latency_s": extras.get("llm_latency_s", 0) / calls if calls else 0.0,
+        "llm_fallback_rate": extras.get("llm_fallbacks", 0) / decisions,
+        "llm_plan_move_rate": extras.get("llm_plan_moves", 0) / decisions,
+        "llm_delegation_rate": extras.get("llm_delegated_moves", 0) / decisions,
+    }
+
+def init_wandb_run(agent_name, num_games, wandb_project, wandb_entity, agent_params=None, extra_config=None):
+    """The WandB run for a simulation, or None when logging is disabled or fails."""
+    run = None
+    # Validate WandB entity if project is specified
+    if wandb_project and not wandb_entity:
+         # Attempt to get entity from environment variable
+         wandb_entity = os.getenv("WANDB_ENTITY")
+         if not wandb_entity:
+              print("Warning: WandB project specified but no entity provided or found in WANDB_ENTITY env var. Disabling WandB logging.")
+              wandb_project = None # Disable logging if entity missing
+
+    # Initialize WandB run if project and entity are valid
+    if wandb_project and wandb_entity:
+        try:
+            # Include agent parameters in WandB config
+            config = {
+                "agent": agent_name,
+                "num_games": num_games,
+            }
+            if agent_params:
+                for key, value in agent_params.items():
+                    config[key] = value
+            if extra_config:
+                config.update(extra_config)
+            
+            run = wandb.init(
+                        project=wandb_project,
+                        entity=wandb_entity,
+                        reinit="create_new",
+                        config=config,
+                        )
+            print(f"WandB logging initialized for project '{wandb_project}', entity '{wandb_entity}'. Run: {run.name}")
+        except Exception as e:
+            print(f"Error initializing WandB: {e}. Disabling logging.")
+            run = None # Ensure run is None if init fails
+    else:
+         print("WandB project or entity not provided. Skipping WandB logging.")
+    return run
+
+def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, agent_params=None, collect_search_stats=True, heuristic_cache_size=None):
     global simulation_status
     run = None # Initialize wandb run object
     try:
@@ -25,38 +110,14 @@ def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, ag
         simulation_status["error"] = None
         simulation_status["terminated"] = False
 
-        # Validate WandB entity if project is specified
-        if wandb_project and not wandb_entity:
-             # Attempt to get entity from environment variable
-             wandb_entity = os.getenv("WANDB_ENTITY")
-             if not wandb_entity:
-                  print("Warning: WandB project specified but no entity provided or found in WANDB_ENTITY env var. Disabling WandB logging.")
-                  wandb_project = None # Disable logging if entity missing
-
-        # Initialize WandB run if project and entity are valid
-        if wandb_project and wandb_entity:
-            try:
-                # Include agent parameters in WandB config
-                config = {
-                    "agent": agent_name,
-                    "num_games": num_games,
-                }
-                if agent_params:
-                    for key, value in agent_params.items():
-                        config[key] = value
-                
-                run = wandb.init(
-                            project=wandb_project,
-                            entity=wandb_entity,
-                            reinit="create_new",
-                            config=config,
-                            )
-                print(f"WandB logging initialized for project '{wandb_project}', entity '{wandb_entity}'. Run: {run.name}")
-            except Exception as e:
-                print(f"Error initializing WandB: {e}. Disabling logging.")
-                run = None # Ensure run is None if init fails
-        else:
-             print("WandB project or entity not provided. Skipping WandB logging.")
+        run = init_wandb_run(agent_name, num_games, wandb_project, wandb_entity, agent_params)
+
+        # Optionally (re)size the process-wide heuristic cache shared with the web game
+        if heuristic_cache_size is not None:
+            configure_heuristic_cache(heuristic_cache_size)
+        heuristic_cache = get_heuristic_cache()
+        if heuristic_cache:
+            cache_start = heuristic_cache.stats()
 
         sim_game = Game()
         if not sim_game.set_agent(agent_name):
@@ -78,6 +139,8 @@ def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, ag
         all_game_times = []
         all_memory_usages = []  # Track memory usage across games
         peak_memory_usage = 0   # Track peak memory usage
+        run_search_stats = SearchStats()  # Agent search counters across all games
+        total_budget_overruns = 0  # Moves cut short by the agent's search budget
 
         WIN_TILE = 2048
 
@@ -99,6 +162,8 @@ def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, ag
             moves_count = 0
             decision_times_this_game = []
             memory_samples = []
+            game_search_stats = SearchStats()
+            budget_overruns = 0
 
             while not game_over:
                 # Also check for termination during a game
@@ -116,6 +181,11 @@ def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, ag
                     game_over = True
                     continue
 
+                if collect_search_stats:
+                    game_search_stats.add(sim_game.agent.stats)
+                if sim_game.agent.budget.exhausted:
+                    budget_overruns += 1
+
                 # Sample memory usage periodically during the game
                 if moves_count % 10 == 0:
                     current_memory = process.memory_info().rss
@@ -156,6 +226,8 @@ def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, ag
             all_decision_times.extend(decision_times_this_game)
             all_game_times.append(game_time)
             all_memory_usages.append(avg_mem_used)
+            run_search_stats.add(game_search_stats)
+            total_budget_overruns += budget_overruns
 
             simulation_status["progress"] = i + 1
 
@@ -172,8 +244,13 @@ def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, ag
                     "avg_memory_bytes": avg_mem_used,
                     "avg_memory_mb": avg_mem_used / (1024 * 1024),
                     "memory_percent": mem_used_percent,
-                    "avg_decision_time_s": sum(decision_times_this_game) / len(decision_times_this_game) if decision_times_this_game else 0
+                    "avg_decision_time_s": sum(decision_times_this_game) / len(decision_times_this_game) if decision_times_this_game else 0,
+                    "budget_overruns": budget_overruns,
                 }
+                if collect_search_stats:
+                    for key, value in game_search_stats.summary().items():
+                        log_data[f"search_{key}"] = value
+                    log_data.update(llm_results(game_search_stats, 1))
                 run.log(log_data)
 
         # Only calculate results if we have at least one completed game
@@ -204,7 +281,22 @@ def run_simulation_worker(agent_name, num_games, wandb_project, wandb_entity, ag
                 "mean_game_time_s": mean_game_time,
                 "mean_memory_usage_mb": mean_memory_usage / (1024 * 1024),
                 "peak_memory_usage_mb": peak_memory_mb,
+                "budget_overruns": total_budget_overruns,
+                "budget_overrun_rate": total_budget_overruns / len(all_decision_times) if all_decision_times else 0,
             }
+            results.update(decision_time_percentiles(all_decision_times))
+            if collect_search_stats:
+                results["search_stats"] = run_search_stats.summary()
+                results.update(llm_results(run_search_stats, len(all_scores)))
+            llm_cache = getattr(sim_game.agent, "response_cache", None)
+            if llm_cache:
+                results["llm_cache"] = llm_cache.stats()
+            if heuristic_cache:
+                cache_stats = heuristic_cache.stats()
+                hits = cache_stats["hits"] - cache_start["hits"]
+                misses = cache_stats["misses"] - cache_start["misses"]
+                cache_stats["run_hit_ratio"] = hits / (hits + misses) if hits + misses else 0.0
+                results["heuristic_cache"] = cache_stats
 
             # If terminated early, note this in the results
             if simulation_status["terminated"]:
@@ -1,25 +1,481 @@
 from simulation.game import Game
 from agents.registry import get_agent
 from agents.td_learning_agent import TDLearningAgent
+from agents.td_lambda import AfterstateTDLambda
+from agents.weight_store import AsyncCheckpointer, list_checkpoints, release
+from simulation.replay_buffer import ReplayBuffer
+from simulation import vector_board
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import threading
+import time
+import numpy as np
 
 training_status = {
     "running": False,
     "progress": 0,
     "total_episodes": 0,
     "current_avg_score": 0,
+    "num_workers": 1,
+    "batch_size": 1,
+    "algorithm": "td0",
+    "replay_size": 0,
+    "checkpoints": 0,
+    "last_checkpoint": None,
+    "evaluations": [],
+    "eval_score": None,
+    "eval_pending": 0,
+    "updates": 0,
+    "episodes_per_s": 0,
+    "updates_per_s": 0,
     "error": None
 }
 training_thread = None
 
+# Training runs inside the Flask server, which by then has live threads (the
+# simulation thread, AsyncCheckpointer, HTTP pools); forking a threaded process
+# can deadlock, so worker processes are always spawned. They only need the
+# shared-memory name and plain parameters.
+_START_METHOD = "spawn"
+
 # --- Helper function for TD training ---
-def train_td_worker(num_episodes, save_interval=100, training=True):
+def _play_episode(train_game, td_agent, training=True):
+    """ Plays one episode with td_agent, doing TD(0) updates when training. Returns (score, updates). """
+    train_game.reset_grid()
+    train_game.agent = td_agent
+    game_over = False
+    updates = 0
+
+    features_s = td_agent._extract_features(train_game.grid)
+
+    while not game_over:
+        # 1. Choose action using epsilon-greedy (get_move handles this)
+        #    get_move also stores expected next state features/value for update
+        # move = td_agent.get_move(is_training=True)
+        move = td_agent.get_move(training=training)
+
+        # 2. Take action in the environment (game)
+        #    The game state is updated internally by move_grid
+        moved = train_game.move_grid(move)
+        reward = td_agent.last_reward # Get reward stored by get_move
+
+        if moved:
+            train_game.add_random_tile()
+
+        if training:
+            # 3. Perform TD Update
+            features_s_prime = td_agent._extract_features(train_game.grid)
+            td_agent.last_state_features = features_s_prime
+            td_agent.last_state_value    = td_agent._get_value(train_game.grid)
+            # td_agent.last_reward         = reward
+
+            # 4. Update current state features for the next iteration
+            td_agent.update_weights(features_s)
+            features_s = features_s_prime
+            updates += 1
+
+        game_over = train_game.is_game_over()
+
+    return train_game.score, updates
+
+def _play_episode_lambda(train_game, td_agent, learner, training=True):
+    """ Plays one episode with td_agent, doing afterstate TD(lambda) updates when training. Returns (score, updates). """
+    train_game.reset_grid()
+    train_game.agent = td_agent
+    learner.reset([0])
+    value_fn = td_agent.value_fn
+    previous = None # features of the previous afterstate
+    updates = 0
+
+    while not train_game.is_game_over():
+        move = td_agent.get_move(training=training)
+        afterstate = td_agent.last_afterstate_features
+        if training:
+            if previous is not None:
+                target = td_agent.last_reward + td_agent.discount_factor * value_fn.batch_values(afterstate[None])[0]
+                learner.step([0], previous[None], [target])
+                updates += 1
+            previous = afterstate
+        if train_game.move_grid(move):
+            train_game.add_random_tile()
+
+    if training and previous is not None:
+        # the last afterstate led to a terminal state: target 0
+        learner.step([0], previous[None], [0.0])
+        updates += 1
+    return train_game.score, updates
+
+def _make_learner(td_agent, algorithm, trace_lambda, slots=1):
+    """ None for the TD(0) state-value path, an AfterstateTDLambda for 'td_lambda'. """
+    if algorithm == 'td0':
+        return None
+    if algorithm == 'td_lambda':
+        return AfterstateTDLambda(td_agent.value_fn, td_agent.learning_rate, td_agent.discount_factor,
+                                  trace_lambda=trace_lambda, slots=slots)
+    raise ValueError(f"Unknown TD training algorithm '{algorithm}'")
+
+def _td0_update(td_agent, states, rewards, next_states):
+    """ Batched TD(0): w += alpha * (r + gamma * V(s') - V(s)) * grad V(s) for (n, 16) boards. """
+    value_fn = td_agent.value_fn
+    features_s = value_fn.batch_features(states)
+    td_err = rewards + td_agent.discount_factor * value_fn.batch_values(value_fn.batch_features(next_states)) \
+        - value_fn.batch_values(features_s)
+    value_fn.batch_update(features_s, td_agent.learning_rate * td_err)
+    if value_fn.sanitize(features_s):
+        print("Warning: NaN or Inf detected in weights. Resetting problematic weights?")
+
+def _play_batched(td_agent, batch_size, claim_episode, on_episode, training=True, learner=None,
+                  replay=None, replay_batch=256, replay_updates=1, rng=None):
+    """
+    Plays episodes `batch_size` at a time in lockstep on exponent arrays (see
+    simulation/vector_board.py): one array pass scores all afterstates of all
+    boards, picks the epsilon-greedy moves and applies the TD(0) updates of the
+    whole batch. Same transitions and update rule as _play_episode, except that
+    the updates of one step are computed with the same weights and summed.
+    An entry shared by many boards of a step (n-tuple entries of similar opening
+    boards) takes all their steps at once, so large batches need a smaller
+    learning_rate than one episode at a time (benchmark_td uses 0.0003 for 256).
+    Finished slots are refilled while claim_episode() returns True;
+    on_episode(score, updates) is called for every finished episode.
+    With an AfterstateTDLambda `learner` (one slot per batch row) the afterstate
+    TD(lambda) updates of _play_episode_lambda are applied instead.
+    With a ReplayBuffer `replay`, TD(0) transitions are stored rather than learned
+    from directly; each step then applies `replay_updates` TD(0) updates on
+    minibatches of `replay_batch` transitions sampled from the buffer.
+    `rng` (a numpy Generator) drives tile placement and exploration.
+    """
+    value_fn = td_agent.value_fn
+    if training and not td_agent.weights.flags.writeable:
+        td_agent.weights = np.array(td_agent.weights)
+    rng = rng if rng is not None else np.random.default_rng()
+
+    boards = np.zeros((batch_size, 16), dtype=np.int64)
+    scores = np.zeros(batch_size, dtype=np.int64)
+    updates = np.zeros(batch_size, dtype=np.int64)
+    active = np.zeros(batch_size, dtype=bool)
+    # TD(lambda): features of each slot's previous afterstate
+    previous = None
+    has_previous = np.zeros(batch_size, dtype=bool)
+
+    def start(slots):
+        slots = [i for i in slots if claim_episode()]
+        boards[slots] = vector_board.new_boards(len(slots), rng)
+        scores[slots] = 0
+        updates[slots] = 0
+        active[slots] = True
+
+    start(range(batch_size))
+    while active.any():
+        idx = np.flatnonzero(active)
+        after, gained, changed = vector_board.afterstates(boards[idx])
+
+        # episodes with no valid move are over; their slots restart next step
+        over = ~changed.any(axis=1)
+        if over.any():
+            finished = idx[over]
+            active[finished] = False
+            if training and learner is not None:
+                ended = finished[has_previous[finished]]
+                if len(ended):
+                    learner.step(ended, previous[ended], np.zeros(len(ended)))
+                    updates[ended] += 1
+                learner.reset(finished)
+                has_previous[finished] = False
+            for i in finished:
+                on_episode(int(scores[i]), int(updates[i]))
+            start(finished)
+            idx, after, gained, changed = idx[~over], after[~over], gained[~over], changed[~over]
+            if len(idx) == 0:
+                continue
+
+        n = len(idx)
+        rows = np.arange(n)
+        flat_after = after.reshape(n * 4, 16)
+        after_features = value_fn.batch_features(flat_after)
+        after_values = value_fn.batch_values(after_features).reshape(n, 4)
+        values = after_values
+        if value_fn.greedy_adds_reward:
+            values = values + gained
+        choice = np.where(changed, values, -np.inf).argmax(axis=1)
+
+        # Epsilon-greedy policy for training
+        if training and td_agent.epsilon > 0:
+            explore = rng.random(n) < td_agent.epsilon
+            random_choice = np.where(changed, rng.random((n, 4)), -1.0).argmax(axis=1)
+            choice = np.where(explore, random_choice, choice)
+
+        rewards = value_fn.batch_reward(flat_after, after_features, gained.ravel()).reshape(n, 4)[rows, choice]
+        next_boards = vector_board.add_random_tiles(after[rows, choice], rng)
+
+        if training and learner is not None:
+            chosen = after_features.reshape((n, 4) + after_features.shape[1:])[rows, choice]
+            if previous is None:
+                previous = np.zeros((batch_size,) + chosen.shape[1:], dtype=chosen.dtype)
+            have = has_previous[idx]
+            if have.any():
+                targets = rewards + td_agent.discount_factor * after_values[rows, choice]
+                learner.step(idx[have], previous[idx[have]], targets[have])
+                updates[idx[have]] += 1
+            previous[idx] = chosen
+            has_previous[idx] = True
+        elif training and replay is not None:
+            replay.add(boards[idx], rewards, next_boards)
+            if len(replay) >= replay_batch:
+                for _ in range(replay_updates):
+                    _td0_update(td_agent, *replay.sample(replay_batch, rng))
+                # sampled updates are credited to the episodes that are running
+                updates[idx] += replay_updates * replay_batch // n
+        elif training:
+            _td0_update(td_agent, boards[idx], rewards, next_boards)
+            updates[idx] += 1
+
+        boards[idx] = next_boards
+        scores[idx] += gained[rows, choice]
+
+    if replay is not None:
+        replay.flush()
+
+def _evaluate_checkpoint(path, agent_params, num_games, seed):
+    """
+    Process pool task: plays `num_games` greedy games (no exploration, no updates)
+    with the weights in `path`, tile placement seeded with `seed` so every
+    checkpoint is scored on the same games. Deletes `path` afterwards; it is a
+    private link to the checkpoint (see CheckpointEvaluator.submit).
+    """
+    start = time.perf_counter()
+    try:
+        td_agent = TDLearningAgent(Game(), **dict(agent_params, weights_file=path))
+        scores = []
+        started = [0]
+        def claim_episode():
+            if started[0] >= num_games:
+                return False
+            started[0] += 1
+            return True
+        _play_batched(td_agent, num_games, claim_episode, lambda score, updates: scores.append(score),
+                      training=False, rng=np.random.default_rng(seed))
+    finally:
+        td_agent = None
+        release(path)
+        if os.path.exists(path):
+            os.remove(path)
+    return {
+        "games": len(scores),
+        "mean_score": sum(scores) / len(scores),
+        "max_score": max(scores),
+        "min_score": min(scores),
+        "eval_seconds": time.perf_counter() - start,
+    }
+
+class CheckpointEvaluator:
+    """
+    Scores checkpoints in a process pool while training continues: each submitted
+    checkpoint gets `num_games` greedy games with a fixed seed (see
+    _evaluate_checkpoint). Results, or errors, are passed to on_result(dict) from
+    the pool's callback thread. Since older checkpoints are pruned, the checkpoint
+    is hard-linked (or copied) to a private file at submit time.
+    """
+    def __init__(self, agent_params, num_games=50, workers=1, seed=0, on_result=None):
+        self.agent_params = dict(agent_params or {})
+        self.num_games = int(num_games)
+        self.seed = seed
+        self.on_result = on_result
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._pool = ProcessPoolExecutor(max_workers=max(1, int(workers)), mp_context=mp.get_context(_START_METHOD))
+
+    def submit(self, checkpoint, number):
+        root, ext = os.path.splitext(checkpoint)
+        private = f"{root}.eval-{os.getpid()}{ext}"
+        try:
+            os.link(checkpoint, private)
+        except OSError:
+            shutil.copyfile(checkpoint, private)
+        with self._lock:
+            self.pending += 1
+        future = self._pool.submit(_evaluate_checkpoint, private, self.agent_params, self.num_games, self.seed)
+        future.add_done_callback(lambda f: self._done(f, checkpoint, number))
+
+    def _done(self, future, checkpoint, number):
+        with self._lock:
+            self.pending -= 1
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"error": str(e)}
+        result.update({"episodes": number, "checkpoint": checkpoint})
+        if self.on_result:
+            self.on_result(result)
+
+    def close(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+def _hogwild_worker(shm_name, shape, dtype, agent_params, num_episodes, episodes_claimed, results, training,
+                    batch_size=1, algorithm='td0', trace_lambda=0.5, replay_options=None):
+    """
+    Training process for parallel mode: plays episodes until `num_episodes` have been
+    claimed in total, updating the weight table in shared memory in place, without
+    locks (Hogwild). Reports ('episode', score, updates) per episode, then ('done',).
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    td_agent = None
+    try:
+        train_game = Game()
+        td_agent = TDLearningAgent(train_game, **agent_params)
+        td_agent.weights = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+        def claim_episode():
+            with episodes_claimed.get_lock():
+                if episodes_claimed.value >= num_episodes:
+                    return False
+                episodes_claimed.value += 1
+                return True
+
+        def on_episode(score, updates):
+            results.put(('episode', score, updates))
+
+        learner = _make_learner(td_agent, algorithm, trace_lambda, batch_size)
+        replay_kwargs = _replay_kwargs(replay_options, suffix=str(os.getpid()))
+        if batch_size > 1 or replay_kwargs:
+            _play_batched(td_agent, batch_size, claim_episode, on_episode, training, learner, **replay_kwargs)
+        elif learner is not None:
+            while claim_episode():
+                on_episode(*_play_episode_lambda(train_game, td_agent, learner, training))
+        else:
+            while claim_episode():
+                on_episode(*_play_episode(train_game, td_agent, training))
+        results.put(('done',))
+    except Exception as e:
+        results.put(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        if td_agent is not None:
+            td_agent.weights = None # drop the view so the segment can be closed
+        shm.close()
+
+def _replay_kwargs(replay_options, suffix=None):
+    """
+    _play_batched keyword arguments for replay_options (a dict of replay_size,
+    replay_batch, replay_updates and replay_file), or {} when replay is off. Each
+    process gets its own buffer; `suffix` keeps their spill files apart.
+    """
+    if not replay_options or not replay_options.get('replay_size'):
+        return {}
+    path = replay_options.get('replay_file')
+    if path and suffix:
+        path = f"{path}.{suffix}"
+    return {
+        'replay': ReplayBuffer(replay_options['replay_size'], path),
+        'replay_batch': int(replay_options.get('replay_batch', 256)),
+        'replay_updates': int(replay_options.get('replay_updates', 1)),
+    }
+
+def _run_parallel(td_agent, num_episodes, num_workers, training, agent_params, on_episode, batch_size=1,
+                  algorithm='td0', trace_lambda=0.5, replay_options=None):
+    """
+    Runs `num_workers` processes on a shared-memory copy of td_agent's weights and
+    calls on_episode(score, updates) as their episodes finish. While running,
+    td_agent.weights is the live shared table (so periodic saves see current
+    weights); afterwards it holds a private copy of the final table.
+    """
+    weights = np.ascontiguousarray(td_agent.weights)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, weights.nbytes))
+    shared = None
+    processes = []
+    try:
+        shared = np.ndarray(weights.shape, dtype=weights.dtype, buffer=shm.buf)
+        shared[...] = weights
+        td_agent.weights = shared
+
+        ctx = mp.get_context(_START_METHOD)
+        episodes_claimed = ctx.Value('l', 0)
+        results = ctx.Queue()
+        for _ in range(num_workers):
+            p = ctx.Process(target=_hogwild_worker,
+                            args=(shm.name, weights.shape, weights.dtype.str, agent_params or {},
+                                  num_episodes, episodes_claimed, results, training, batch_size,
+                                  algorithm, trace_lambda, replay_options),
+                            daemon=True)
+            p.start()
+            processes.append(p)
+
+        running = num_workers
+        while running:
+            try:
+                msg = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in processes):
+                    raise RuntimeError("TD training workers exited unexpectedly.")
+                continue
+            if msg[0] == 'episode':
+                on_episode(msg[1], msg[2])
+            elif msg[0] == 'done':
+                running -= 1
+            else:
+                raise RuntimeError(f"TD training worker failed: {msg[1]}")
+    finally:
+        for p in processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        if shared is not None:
+            td_agent.weights = np.array(shared)
+            shared = None
+        shm.close()
+        shm.unlink()
+
+def train_td_worker(num_episodes, save_interval=100, training=True, agent_params=None, num_workers=1, batch_size=1,
+                    algorithm='td0', trace_lambda=0.5, replay_size=0, replay_batch=256, replay_updates=1,
+                    replay_file=None, keep_checkpoints=3, eval_games=0, eval_workers=1, eval_seed=0):
+    """
+    Trains (or, with training=False, evaluates) the TD agent for `num_episodes`.
+    num_workers > 1 plays episodes in that many processes sharing one weight table
+    (see _run_parallel); batch_size > 1 has each worker advance that many episodes
+    in lockstep with vectorized updates (see _play_batched). algorithm='td_lambda'
+    switches from the TD(0) state-value updates to afterstate TD(lambda) with
+    sparse eligibility traces (see agents/td_lambda.py). replay_size > 0 (TD(0)
+    only) trains from minibatches sampled out of a replay buffer of that many
+    transitions (see simulation/replay_buffer.py), memory-mapped to replay_file
+    if given. Every save_interval episodes the weights are snapshotted and written
+    in the background as a numbered checkpoint, keeping the newest
+    keep_checkpoints (see AsyncCheckpointer). With eval_games > 0 each checkpoint
+    is also scored greedily on eval_games fixed-seed games in a pool of
+    eval_workers processes (see CheckpointEvaluator); results stream into
+    training_status["evaluations"] and eval_score. Throughput is reported
+    in training_status as episodes_per_s and updates_per_s.
+    """
     global training_status
+    checkpointer = None
+    evaluator = None
     try:
+        num_workers = max(1, int(num_workers))
+        batch_size = max(1, int(batch_size))
+        replay_options = None
+        if replay_size and training:
+            if algorithm != 'td0':
+                raise ValueError("Replay training is only supported for the TD(0) algorithm.")
+            replay_options = {'replay_size': int(replay_size), 'replay_batch': int(replay_batch),
+                              'replay_updates': int(replay_updates), 'replay_file': replay_file}
         training_status.update({
             "running": True,
             "progress": 0,
             "total_episodes": num_episodes,
             "current_avg_score": 0,
+            "num_workers": num_workers,
+            "batch_size": batch_size,
+            "algorithm": algorithm,
+            "replay_size": replay_options['replay_size'] if replay_options else 0,
+            "checkpoints": 0,
+            "last_checkpoint": None,
+            "evaluations": [],
+            "eval_score": None,
+            "eval_pending": 0,
+            "updates": 0,
+            "episodes_per_s": 0,
+            "updates_per_s": 0,
             "error": None
         })
 
@@ -29,63 +485,93 @@ def train_td_worker(num_episodes, save_interval=100, training=True):
             raise ValueError("TD Learning Agent not found or invalid.")
         
         # Instantiate agent - loads existing weights if available
-        td_agent = td_agent_class(train_game)
+        td_agent = td_agent_class(train_game, **(agent_params or {}))
         train_game.agent = td_agent # Assign agent instance to game
 
+        if training:
+            # number checkpoints after any left by earlier runs
+            existing = list_checkpoints(td_agent.weights_file)
+            first_checkpoint = existing[-1][0] if existing else 0
+            on_written = None
+            if eval_games > 0:
+                def on_eval_result(result):
+                    evaluations = sorted(training_status["evaluations"] + [result], key=lambda r: r["episodes"])
+                    training_status["evaluations"] = evaluations
+                    scored = [r for r in evaluations if "mean_score" in r]
+                    training_status["eval_score"] = scored[-1]["mean_score"] if scored else None
+                    training_status["eval_pending"] = evaluator.pending
+                    if "error" in result:
+                        print(f"Checkpoint evaluation failed: {result['error']}")
+                    else:
+                        print(f"Checkpoint {result['episodes']} | Greedy eval score: {result['mean_score']:.2f} over {result['games']} games")
+
+                evaluator = CheckpointEvaluator(dict(agent_params or {}, weights_file=td_agent.weights_file),
+                                                eval_games, eval_workers, eval_seed, on_eval_result)
+                def on_written(path, number):
+                    evaluator.submit(path, number)
+                    training_status["eval_pending"] = evaluator.pending
+            checkpointer = AsyncCheckpointer(td_agent.weights_file, keep=keep_checkpoints, meta=td_agent.weights_meta(),
+                                             on_written=on_written)
+
         scores = []
-        print(f"Starting TD Learning training for {num_episodes} episodes...")
-
-        for ep in range(num_episodes):
-            train_game.reset_grid()
-            game_over = False
-            
-            features_s = td_agent._extract_features(train_game.grid)
-
-            while not game_over:
-                # 1. Choose action using epsilon-greedy (get_move handles this)
-                #    get_move also stores expected next state features/value for update
-                # move = td_agent.get_move(is_training=True)
-                move = td_agent.get_move(is_training=training)
-                
-                # 2. Take action in the environment (game)
-                #    The game state is updated internally by move_grid
-                moved = train_game.move_grid(move)
-                reward = td_agent.last_reward # Get reward stored by get_move
-
-                if moved:
-                    train_game.add_random_tile()
-                
-                if training:
-                    # 3. Perform TD Update
-                    features_s_prime = td_agent._extract_features(train_game.grid)
-                    td_agent.last_state_features = features_s_prime
-                    td_agent.last_state_value    = td_agent._get_value(train_game.grid)
-                    # td_agent.last_reward         = reward
-
-                    # 4. Update current state features for the next iteration
-                    td_agent.update_weights(features_s)
-                    features_s = features_s_prime
-
-                game_over = train_game.is_game_over()
+        start_time = time.perf_counter()
+        print(f"Starting TD Learning training for {num_episodes} episodes with {num_workers} worker(s)...")
 
+        def on_episode(final_score, updates):
             # --- End of Episode --- #
-            final_score = train_game.score
             scores.append(final_score)
             last_100_scores = scores[-100:]
             avg_score = sum(last_100_scores) / len(last_100_scores)
-            training_status["progress"] = ep + 1
+            elapsed = max(time.perf_counter() - start_time, 1e-9)
+            episodes = len(scores)
+            training_status["progress"] = episodes
             training_status["current_avg_score"] = avg_score
+            training_status["updates"] += updates
+            training_status["episodes_per_s"] = episodes / elapsed
+            training_status["updates_per_s"] = training_status["updates"] / elapsed
+
+            if episodes % 10 == 0:
+                 print(f"Episode {episodes}/{num_episodes} | Score: {final_score} | Avg Score (last 100): {avg_score:.2f} | "
+                       f"{training_status['episodes_per_s']:.2f} episodes/s, {training_status['updates_per_s']:.0f} updates/s")
 
-            if (ep + 1) % 10 == 0:
-                 print(f"Episode {ep+1}/{num_episodes} | Score: {final_score} | Avg Score (last 100): {avg_score:.2f}")
+            # Checkpoint weights periodically, written in the background
+            if training and episodes % save_interval == 0:
+                checkpointer.submit(td_agent.weights, first_checkpoint + episodes)
+            if checkpointer:
+                training_status["checkpoints"] = checkpointer.written
+                training_status["last_checkpoint"] = checkpointer.last_checkpoint
 
-            # Save weights periodically
-            if training and (ep + 1) % save_interval == 0:
-                td_agent.save_weights()
+        if num_workers > 1:
+            _run_parallel(td_agent, num_episodes, num_workers, training, agent_params, on_episode, batch_size,
+                          algorithm, trace_lambda, replay_options)
+        elif batch_size > 1 or replay_options:
+            episodes_started = [0]
+            def claim_episode():
+                if episodes_started[0] >= num_episodes:
+                    return False
+                episodes_started[0] += 1
+                return True
+            _play_batched(td_agent, batch_size, claim_episode, on_episode, training,
+                          _make_learner(td_agent, algorithm, trace_lambda, batch_size),
+                          **_replay_kwargs(replay_options))
+        elif algorithm != 'td0':
+            learner = _make_learner(td_agent, algorithm, trace_lambda)
+            for ep in range(num_episodes):
+                on_episode(*_play_episode_lambda(train_game, td_agent, learner, training))
+        else:
+            for ep in range(num_episodes):
+                on_episode(*_play_episode(train_game, td_agent, training))
 
         if training:
             # Final save after training completes
-            td_agent.save_weights()
+            if len(scores) % save_interval != 0:
+                checkpointer.submit(td_agent.weights, first_checkpoint + len(scores))
+            checkpointer.close()
+            training_status["checkpoints"] = checkpointer.written
+            training_status["last_checkpoint"] = checkpointer.last_checkpoint
+            if evaluator:
+                # let the evaluations of the last checkpoints finish
+                evaluator.close()
             print("TD Learning training finished.")
         else:
             print("Evaluation run complete (no weights updated).")
@@ -94,4 +580,8 @@ def train_td_worker(num_episodes, save_interval=100, training=True):
         print(f"TD Training failed: {e}")
         training_status["error"] = str(e)
     finally:
-        training_status["running"] = False
\ No newline at end of file
+        if checkpointer is not None:
+            checkpointer.close()
+        if evaluator is not None:
+            evaluator.close()
+        training_status["running"] = False
@@ -0,0 +1,140 @@
+import numpy as np
+from simulation.game_utils import merge_row_left_static
+
+# Batched board operations for training and evaluating value functions on many
+# boards at once. A batch of boards is an int64 array of shape (B, 16) holding
+# tile exponents (0 = empty, k = tile 2**k), row-major like encode_grid.
+# Moves go through a 65536-entry table that maps a packed row of four exponents
+# to the row after sliding left and the score gained, built once per process
+# from merge_row_left_static so the rules match simulate_move_on_grid.
+# Exponents are capped at 15 (tile 32768) so a row of four fits the table index.
+
+MOVES = ("UP", "DOWN", "LEFT", "RIGHT")
+
+SNAKE_WEIGHTS = np.array([
+    [2**15, 2**14, 2**13, 2**12],
+    [2**8,  2**9,  2**10, 2**11],
+    [2**7,  2**6,   2**5,  2**4],
+    [2**0,  2**1,   2**2,  2**3]
+], dtype=np.float64)
+_SNAKE_FLAT = SNAKE_WEIGHTS.ravel()
+
+_CELLS = np.arange(16).reshape(4, 4)
+# Per move, the cells read in slide-left order: row r of the (4, 4) view is the
+# r-th line of the board as seen when sliding in that direction.
+_MOVE_ORDER = np.stack([
+    _CELLS.T.ravel(),             # UP: columns, top first
+    _CELLS.T[:, ::-1].ravel(),    # DOWN: columns, bottom first
+    _CELLS.ravel(),               # LEFT: rows, left first
+    _CELLS[:, ::-1].ravel(),      # RIGHT: rows, right first
+])
+_MOVE_RESTORE = np.argsort(_MOVE_ORDER, axis=1)
+_ROW_PLACES = np.array([1, 1 << 4, 1 << 8, 1 << 12], dtype=np.int64)
+
+# Adjacent cell pairs (12 horizontal, 12 vertical) for smoothness and merges
+_PAIR_A = np.concatenate([_CELLS[:, :-1].ravel(), _CELLS[:-1, :].ravel()])
+_PAIR_B = np.concatenate([_CELLS[:, 1:].ravel(), _CELLS[1:, :].ravel()])
+# The same pairs in each of the 4 rotations of the board, for monotonicity
+_ROTATIONS = [np.rot90(_CELLS, -k) for k in range(4)]
+_MONO_A = np.stack([np.concatenate([r[:, :-1].ravel(), r[:-1, :].ravel()]) for r in _ROTATIONS])
+_MONO_B = np.stack([np.concatenate([r[:, 1:].ravel(), r[1:, :].ravel()]) for r in _ROTATIONS])
+
+TILE_VALUES = np.array([0.0] + [float(1 << e) for e in range(1, 16)])
+
+_row_left = None
+_row_score = None
+
+def _row_tables():
+    global _row_left, _row_score
+    if _row_left is None:
+        left = np.zeros((1 << 16, 4), dtype=np.int64)
+        score = np.zeros(1 << 16, dtype=np.int64)
+        for key in range(1 << 16):
+            row = [1 << e if e else 0 for e in ((key >> (4 * c)) & 0xF for c in range(4))]
+            merged, gained = merge_row_left_static(row)
+            left[key] = [min(v.bit_length() - 1, 15) if v else 0 for v in merged]
+            score[key] = gained
+        _row_left, _row_score = left, score
+    return _row_left, _row_score
+
+def from_grids(grids):
+    """ (B, 16) exponent array from a list of list-of-lists grids. """
+    return np.array([[min(cell.bit_length() - 1, 15) if cell else 0 for row in grid for cell in row]
+                     for grid in grids], dtype=np.int64).reshape(-1, 16)
+
+_PACK_SHIFTS = np.arange(60, -1, -4, dtype=np.uint64)
+
+def pack(boards):
+    """ (B,) uint64 keys of a batch, same packing as encode_grid. """
+    return (boards.astype(np.uint64) << _PACK_SHIFTS).sum(axis=1, dtype=np.uint64)
+
+def unpack(keys):
+    """ Inverse of pack: (B, 16) exponent boards. """
+    keys = np.asarray(keys, dtype=np.uint64)
+    return ((keys[:, None] >> _PACK_SHIFTS) & np.uint64(0xF)).astype(np.int64)
+
+def to_grid(board):
+    """ list-of-lists grid of a single (16,) exponent board. """
+    return [[(1 << int(e)) if e else 0 for e in board[r * 4:r * 4 + 4]] for r in range(4)]
+
+def tiles(boards):
+    """ Tile values (float64) of a batch, shape (B, 16). """
+    return TILE_VALUES[boards]
+
+def afterstates(boards):
+    """
+    All four afterstates of every board, in MOVES order.
+    Returns (after (B, 4, 16), score gained (B, 4), changed (B, 4)).
+    """
+    left, score = _row_tables()
+    n = len(boards)
+    # every line of every move, packed into a row-table key
+    lines = boards[:, _MOVE_ORDER].reshape(n, 4, 4, 4)
+    keys = lines @ _ROW_PLACES
+    slid = left[keys].reshape(n, 4, 16)
+    after = np.take_along_axis(slid, np.broadcast_to(_MOVE_RESTORE, slid.shape), axis=2)
+    gained = score[keys].sum(axis=-1)
+    changed = (after != boards[:, None, :]).any(axis=-1)
+    return after, gained, changed
+
+def add_random_tiles(boards, rng):
+    """ Places a 2 (90%) or 4 on a random empty cell of every board, in place; returns boards. """
+    if len(boards) == 0:
+        return boards
+    empty = boards == 0
+    # argmax of uniform noise restricted to empty cells = uniform empty cell
+    cell = np.where(empty, rng.random(boards.shape), -1.0).argmax(axis=1)
+    rows = np.flatnonzero(empty.any(axis=1))
+    boards[rows, cell[rows]] = np.where(rng.random(len(rows)) < 0.9, 1, 2)
+    return boards
+
+def new_boards(count, rng):
+    """ Fresh starting boards with two random tiles. """
+    boards = np.zeros((count, 16), dtype=np.int64)
+    return add_random_tiles(add_random_tiles(boards, rng), rng)
+
+def linear_features(boards):
+    """
+    Batched LinearValueFunction.features: (B, 20) = 16 snake-weighted tiles, empty
+    score, smoothness, monotonicity and merge bonus, with the same default weights.
+    """
+    t = TILE_VALUES[boards]
+    n = t.shape[0]
+    features = np.empty((n, 20), dtype=np.float64)
+    features[:, :16] = t * _SNAKE_FLAT
+
+    empty = (boards == 0).sum(axis=1)
+    features[:, 16] = 50 * empty * 0.9 ** (16 - empty)
+
+    a, b = t[:, _PAIR_A], t[:, _PAIR_B]
+    # |a - b| only where both tiles are present; a == b only counts non-empty tiles
+    features[:, 17] = -0.3 * (np.abs(a - b) * ((a > 0) & (b > 0))).sum(axis=1)
+    features[:, 18] = 1.5 * (t[:, _MONO_A] >= t[:, _MONO_B]).sum(axis=2).max(axis=1)
+    features[:, 19] = 2.0 * (a * (a == b)).sum(axis=1)
+    return features
+
+def heuristics(boards, features=None):
+    """ Batched calculate_heuristic: the sum of the first 19 linear features. """
+    if features is None:
+        features = linear_features(boards)
+    return features[:, :19].sum(axis=1)
@@ -0,0 +1,50 @@
+"""
+Unit tests for agents/a_star_agent.py: the capped open list and beam mode.
+Run with: python -m pytest tests/test_a_star_agent.py
+"""
+
+from types import SimpleNamespace
+import pytest
+from agents.a_star_agent import AStarAgent
+
+GRIDS = [
+    [[2, 4, 8, 16], [0, 2, 4, 32], [2, 0, 64, 128], [4, 8, 2, 256]],
+    [[2, 0, 0, 4], [0, 8, 0, 0], [16, 0, 2, 0], [0, 0, 0, 32]],
+    [[0, 0, 2, 2], [4, 0, 0, 8], [0, 16, 16, 0], [2, 0, 0, 2]],
+]
+
+def make_agent(grid, **params):
+    return AStarAgent(SimpleNamespace(grid=[row[:] for row in grid], score=0), max_time_s=0, **params)
+
+def test_push_keeps_the_open_list_sorted_and_capped():
+    agent = make_agent(GRIDS[0], max_open=3)
+    open_list = []
+    for f in [5, 1, 9, 3, 7]:
+        agent._push(open_list, (f, 0, f, 1, "UP"))
+    # the worst f entries were evicted; the best is popped from the end
+    assert [entry[0] for entry in open_list] == [5, 7, 9]
+
+def test_search_never_holds_more_than_max_open(monkeypatch):
+    sizes = []
+    push = AStarAgent._push
+    def recorded(self, open_list, entry):
+        push(self, open_list, entry)
+        sizes.append(len(open_list))
+    monkeypatch.setattr(AStarAgent, "_push", recorded)
+    agent = make_agent(GRIDS[1], max_open=4)
+    assert agent.get_move() in agent.get_valid_moves()
+    assert max(sizes) == 4 and agent.stats.max_depth == 5
+
+@pytest.mark.parametrize("grid", GRIDS)
+def test_unbounded_beam_finds_the_best_first_moves(grid):
+    # g only depends on the board, so both searches see the same nodes up to the depth limit
+    best_first = make_agent(grid, depth_limit=3, max_open=10 ** 6)
+    beam = make_agent(grid, depth_limit=3, beam_width=10 ** 6)
+    assert set(beam._beam_search(beam.get_valid_moves())) == set(best_first._best_first_search(best_first.get_valid_moves()))
+    assert beam.stats.nodes_evaluated == best_first.stats.nodes_evaluated
+
+def test_beam_of_one_expands_one_node_per_level():
+    agent = make_agent(GRIDS[1], depth_limit=8, beam_width=1)
+    assert agent.get_move() in agent.get_valid_moves()
+    assert agent.stats.nodes_expanded == 8  # the root, then one node on each of depths 1-7
+    assert agent.stats.max_depth == 8
@@ -0,0 +1,61 @@
+"""
+Unit tests for simulation/async_simulation_worker.py: the asyncio runner must
+take the same options as run_simulation_worker and report the same results.
+Run with: python -m pytest tests/test_async_simulation_worker.py
+"""
+
+import pytest
+from agents import registry
+from agents.agent import Agent
+from simulation import game_utils, simulation_worker
+from simulation.async_simulation_worker import run_async_simulation_worker
+from simulation.game_utils import cached_heuristic
+
+class ParamAgent(Agent):
+    """Plays the valid move with the best cached heuristic, recording the params it was built with."""
+    built_with = []
+
+    def __init__(self, game, depth=1):
+        super().__init__(game)
+        ParamAgent.built_with.append(depth)
+
+    def get_move(self):
+        stats = self.begin_stats()
+        stats.nodes_expanded = 1
+        moves = self.get_valid_moves()
+        stats.children_generated = stats.nodes_evaluated = len(moves)
+        return max(moves, key=lambda m: cached_heuristic(game_utils.simulate_move_on_grid(self.game.grid, m)[0]))
+
+# per-process figures the async runner leaves out, and the figures only it reports
+SYNC_ONLY = {"mean_memory_usage_mb", "peak_memory_usage_mb"}
+ASYNC_ONLY = {"concurrency", "wall_time_s", "games_per_hour", "moves_per_s"}
+
+@pytest.fixture(autouse=True)
+def param_agent(monkeypatch):
+    monkeypatch.setitem(registry.AGENT_REGISTRY, 'param_agent', ParamAgent)
+    monkeypatch.setattr(ParamAgent, 'built_with', [])
+    previous = game_utils.get_heuristic_cache()
+    yield
+    game_utils._heuristic_cache = previous
+
+def run(worker, **options):
+    worker('param_agent', 3, None, None, **options)
+    status = simulation_worker.simulation_status
+    assert status["error"] is None and not status["running"]
+    return status["results"]
+
+def test_results_have_the_same_keys():
+    sync = run(simulation_worker.run_simulation_worker)
+    threaded = run(run_async_simulation_worker, concurrency=2)
+    assert set(sync) - SYNC_ONLY == set(threaded) - ASYNC_ONLY
+    assert threaded["num_games"] == 3 and threaded["concurrency"] == 2
+    assert set(sync["search_stats"]) == set(threaded["search_stats"])
+    assert threaded["search_stats"]["decisions"] == threaded["mean_moves_to_game_over"] * 3
+
+@pytest.mark.parametrize("worker", [simulation_worker.run_simulation_worker, run_async_simulation_worker])
+def test_options_are_honoured(worker):
+    results = run(worker, agent_params={'depth': 4}, collect_search_stats=False, heuristic_cache_size=1000)
+    assert set(ParamAgent.built_with) == {4}
+    assert "search_stats" not in results
+    assert results["heuristic_cache"]["capacity"] == 1000
+    assert results["heuristic_cache"]["misses"] > 0
@@ -0,0 +1,70 @@
+"""
+Unit tests for agent reuse in simulation/game.py: reset_grid keeps one agent
+instance per agent name and params, calling agent.reset() between games.
+Run with: python -m pytest tests/test_game_agent_reuse.py
+"""
+
+import pytest
+from agents import registry
+from agents.agent import Agent
+from simulation.game import Game
+
+class CountingAgent(Agent):
+    built = 0
+
+    def __init__(self, game, depth=1):
+        super().__init__(game)
+        CountingAgent.built += 1
+        self.depth = depth
+        self.resets = 0
+
+    def reset(self):
+        super().reset()
+        self.resets += 1
+
+    def get_move(self):
+        return self.get_valid_moves()[0]
+
+@pytest.fixture
+def game(monkeypatch):
+    monkeypatch.setitem(registry.AGENT_REGISTRY, 'counting', CountingAgent)
+    monkeypatch.setattr(CountingAgent, 'built', 0)
+    game = Game()
+    assert game.set_agent('counting', {'depth': 2})
+    return game
+
+def test_reset_grid_reuses_the_agent(game):
+    game.reset_grid()
+    agent = game.agent
+    for _ in range(3):
+        game.simulate_move()
+        game.reset_grid()
+    assert game.agent is agent and CountingAgent.built == 1
+    assert agent.resets == 3 and agent.depth == 2 and agent.game is game
+    assert agent.stats.nodes_expanded == 0  # the base reset clears the last game's counters
+
+def test_new_agent_or_params_build_a_new_instance(game):
+    game.reset_grid()
+    first = game.agent
+    game.set_agent('counting', {'depth': 2})  # set again, e.g. to load new weights
+    game.reset_grid()
+    second = game.agent
+    game.set_agent('counting', {'depth': 3})
+    game.reset_grid()
+    assert len({id(first), id(second), id(game.agent)}) == 3
+    assert game.agent.depth == 3 and CountingAgent.built == 3
+
+def test_an_agent_assigned_from_outside_is_replaced(game):
+    game.reset_grid()
+    game.agent = CountingAgent(game, depth=5)  # e.g. the TD trainer's own instance
+    game.reset_grid()
+    assert game.agent.depth == 2 and game.agent.resets == 0
+
+def test_loop_agent_restarts_its_cycle():
+    game = Game()
+    game.set_agent('loop')
+    game.reset_grid()
+    agent = game.agent
+    game.simulate_move()
+    game.reset_grid()
+    assert game.agent is agent and agent.current_index == 0 and agent.last_valid_move is None
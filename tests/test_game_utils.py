@@ -0,0 +1,36 @@
+"""
+Unit tests for the board packing in simulation/game_utils.py.
+Run with: python -m pytest tests/test_game_utils.py
+"""
+
+import random
+from simulation.game_utils import encode_grid, decode_grid
+
+def random_grid(rng, max_exp=15):
+    return [[(1 << rng.randint(1, max_exp)) if rng.random() < 0.7 else 0 for _ in range(4)] for _ in range(4)]
+
+def test_encode_decode_round_trip():
+    rng = random.Random(0)
+    for _ in range(2000):
+        grid = random_grid(rng)
+        key = encode_grid(grid)
+        assert key < 1 << 64
+        assert decode_grid(key) == grid
+
+def test_empty_grid_is_zero():
+    assert encode_grid([[0] * 4 for _ in range(4)]) == 0
+
+def test_large_tiles_round_trip_without_collisions():
+    rng = random.Random(1)
+    keys = {}
+    for _ in range(2000):
+        grid = random_grid(rng, max_exp=17)
+        key = encode_grid(grid)
+        assert decode_grid(key) == grid
+        assert keys.setdefault(key, grid) == grid
+
+def test_65536_tile_does_not_spill_into_neighbour():
+    grid = [[0, 65536, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+    other = [[2, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4]  # exponent 16 in a 4-bit field carries into the cell before
+    assert encode_grid(grid) != encode_grid(other)
+    assert decode_grid(encode_grid(grid)) == grid
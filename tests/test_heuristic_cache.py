@@ -0,0 +1,54 @@
+"""
+Unit tests for the shared heuristic cache in simulation/game_utils.py.
+Run with: python -m pytest tests/test_heuristic_cache.py
+"""
+
+import random
+import pytest
+from simulation import game_utils
+from simulation.game_utils import HeuristicCache, calculate_heuristic, cached_heuristic, encode_grid
+
+def random_grid(rng):
+    return [[(1 << rng.randint(1, 11)) if rng.random() < 0.6 else 0 for _ in range(4)] for _ in range(4)]
+
+GRIDS = [random_grid(random.Random(seed)) for seed in range(4)]
+
+@pytest.fixture
+def shared_cache():
+    """Restores the process-wide cache after the test."""
+    previous = game_utils.get_heuristic_cache()
+    yield
+    game_utils._heuristic_cache = previous
+
+def test_lookup_returns_the_heuristic_and_counts_hits():
+    cache = HeuristicCache(8)
+    assert cache.lookup(GRIDS[0]) == calculate_heuristic(GRIDS[0])
+    assert cache.lookup(None, key=encode_grid(GRIDS[0])) == calculate_heuristic(GRIDS[0])
+    assert cache.lookup(GRIDS[1]) == calculate_heuristic(GRIDS[1])
+    assert cache.stats() == {"capacity": 8, "size": 2, "hits": 1, "misses": 2, "hit_ratio": pytest.approx(1 / 3)}
+    cache.clear()
+    assert cache.stats()["size"] == 0 and cache.hit_ratio == 0.0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = HeuristicCache(2)
+    cache.lookup(GRIDS[0])
+    cache.lookup(GRIDS[1])
+    cache.lookup(GRIDS[0])  # GRIDS[1] is now the least recently used
+    cache.lookup(GRIDS[2])
+    assert cache.stats()["size"] == 2
+    hits = cache.hits
+    cache.lookup(GRIDS[0])
+    assert cache.hits == hits + 1
+    cache.lookup(GRIDS[1])
+    assert cache.hits == hits + 1 and cache.misses == 4
+
+def test_cached_heuristic_uses_the_configured_cache(shared_cache):
+    game_utils.configure_heuristic_cache(0)
+    assert game_utils.get_heuristic_cache() is None
+    assert cached_heuristic(GRIDS[3]) == calculate_heuristic(GRIDS[3])
+
+    cache = game_utils.configure_heuristic_cache(16)
+    assert game_utils.get_heuristic_cache() is cache
+    for _ in range(3):
+        assert cached_heuristic(None, key=encode_grid(GRIDS[3])) == calculate_heuristic(GRIDS[3])
+    assert (cache.hits, cache.misses) == (2, 1)
@@ -0,0 +1,94 @@
+"""
+Unit tests for agents/hybrid_llm_agent.py with a stub LLM agent (no API calls).
+Run with: python -m pytest tests/test_hybrid_llm_agent.py
+"""
+
+from types import SimpleNamespace
+import pytest
+from agents import registry
+from agents.greedy_bfs_agent import GreedyBFSAgent
+from agents.hybrid_llm_agent import HybridLLMAgent
+from agents.llm_base_agent import LLMBaseAgent
+from agents.search_stats import SearchStats
+from simulation.game_utils import simulate_move_on_grid
+from simulation.simulation_worker import llm_results
+
+class StubLLM(LLMBaseAgent):
+    """Names every move; the agent plays the first valid one."""
+    model_name = "stub"
+    llm_params = {"max_tokens": 4}
+
+    def call_llm(self, prompt):
+        return "UP DOWN LEFT RIGHT"
+
+GRID = [[2, 0, 0, 4],
+        [0, 8, 0, 0],
+        [16, 0, 2, 0],
+        [0, 0, 0, 32]]
+ONE_MOVE = [[2, 4, 2, 4], [0] * 4, [0] * 4, [0] * 4]  # only DOWN changes the board
+
+@pytest.fixture(autouse=True)
+def stub_llm(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_FILE", raising=False)
+    monkeypatch.delenv("LLM_MOVE_DEADLINE_S", raising=False)
+    monkeypatch.setitem(registry.AGENT_REGISTRY, 'stub_llm', StubLLM)
+
+def make_agent(grid=GRID, **params):
+    game = SimpleNamespace(grid=[row[:] for row in grid], score=0)
+    return HybridLLMAgent(game, llm_agent='stub_llm', **params)
+
+def test_clear_positions_play_the_greedy_move_without_the_model():
+    agent = make_agent(margin=0)
+    expected = GreedyBFSAgent(agent.game).get_move()
+    assert agent.get_move() == expected
+    assert agent.stats.extras["llm_delegated_moves"] == 0
+    assert "llm_calls" not in agent.stats.extras
+
+def test_greedy_cheap_agent_is_not_searched_again(monkeypatch):
+    agent = make_agent(margin=0)
+    expected = GreedyBFSAgent(agent.game).get_move()
+    def no_search(self):
+        raise AssertionError("greedy_bfs searched again")
+    monkeypatch.setattr(GreedyBFSAgent, "get_move", no_search)
+    assert agent.get_move() == expected
+
+def test_other_cheap_agents_are_asked(monkeypatch):
+    agent = make_agent(margin=0, cheap_agent='random')
+    assert agent.get_move() in agent.get_valid_moves()
+    assert agent.stats.extras["llm_delegated_moves"] == 0
+
+def test_close_scores_go_to_the_model():
+    agent = make_agent(margin=1.0)  # every gap is within 100% of the best score
+    assert agent.get_move() == agent.get_valid_moves()[0]
+    extras = agent.stats.extras
+    assert extras["llm_delegated_moves"] == 1 and extras["llm_delegated_close"] == 1
+    assert extras["llm_calls"] == 1  # the model's counters are merged
+
+def test_endgame_goes_to_the_model():
+    agent = make_agent(margin=0, endgame_empty_cells=16)
+    agent.get_move()
+    extras = agent.stats.extras
+    assert extras["llm_delegated_moves"] == 1 and extras["llm_delegated_endgame"] == 1
+    assert "llm_delegated_close" not in extras
+
+def test_single_valid_move_never_goes_to_the_model():
+    agent = make_agent(ONE_MOVE, margin=1.0, endgame_empty_cells=16)
+    assert agent.get_move() == "DOWN"
+    assert agent.stats.extras["llm_delegated_moves"] == 0
+    assert "llm_calls" not in agent.stats.extras
+
+def test_delegation_rate_counts_delegated_decisions():
+    agent = make_agent(margin=0, endgame_empty_cells=8)
+    totals = SearchStats()
+    endgame = 0
+    for _ in range(30):
+        endgame += sum(cell == 0 for row in agent.game.grid for cell in row) <= 8
+        move = agent.get_move()
+        totals.add(agent.stats)
+        agent.game.grid = simulate_move_on_grid(agent.game.grid, move)[0]
+        r, c = next((r, c) for r in range(4) for c in range(4) if agent.game.grid[r][c] == 0)
+        agent.game.grid[r][c] = 2
+    delegated = totals.extras["llm_delegated_moves"]
+    assert 0 < delegated < 30 and delegated == endgame
+    assert totals.decisions == 30
+    assert llm_results(totals, 1)["llm_delegation_rate"] == pytest.approx(delegated / 30)
@@ -0,0 +1,56 @@
+"""
+Unit tests for the transposition table of agents/ida_star_agent.py: searching
+with it must find the same moves as searching without it (tt_size=0).
+Run with: python -m pytest tests/test_ida_star_agent.py
+"""
+
+import random
+from types import SimpleNamespace
+import pytest
+from agents.ida_star_agent import IDAStartAgent
+from simulation.game_utils import simulate_move_on_grid
+
+def random_positions(count, moves=30, seed=0):
+    """Boards reached by random play from two opening tiles."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        grid = [[0] * 4 for _ in range(4)]
+        for _ in range(2):
+            grid[rng.randrange(4)][rng.randrange(4)] = 2
+        for _ in range(rng.randrange(moves)):
+            valid = [m for m in ("UP", "DOWN", "LEFT", "RIGHT") if simulate_move_on_grid(grid, m)[2]]
+            if not valid:
+                break
+            grid = simulate_move_on_grid(grid, rng.choice(valid))[0]
+            empty = [(r, c) for r in range(4) for c in range(4) if grid[r][c] == 0]
+            r, c = rng.choice(empty)
+            grid[r][c] = 2 if rng.random() < 0.9 else 4
+        if any(simulate_move_on_grid(grid, m)[2] for m in ("UP", "DOWN", "LEFT", "RIGHT")):
+            positions.append(grid)
+    return positions
+
+def search(grid, tt_size):
+    agent = IDAStartAgent(SimpleNamespace(grid=[row[:] for row in grid], score=0), depth_limit=5,
+                          tt_size=tt_size, max_time_s=0)
+    move = agent.get_move()
+    return agent, move
+
+@pytest.mark.parametrize("tt_size", [100000, 8])  # 8: a full table searches the rest uncached
+@pytest.mark.parametrize("grid", random_positions(12))
+def test_transposition_table_finds_the_same_moves(grid, tt_size):
+    cached, move = search(grid, tt_size)
+    uncached, _ = search(grid, tt_size=0)
+    assert move in uncached.best_moves
+    assert set(cached.best_moves) == set(uncached.best_moves)
+    assert cached.best_f == uncached.best_f
+    assert cached.iteration == uncached.iteration
+    assert uncached.stats.cache_hits == 0 and uncached.stats.extras["tt_cutoffs"] == 0
+    assert cached.stats.nodes_evaluated <= uncached.stats.nodes_evaluated
+
+def test_transposition_table_saves_evaluations():
+    positions = random_positions(12)
+    cached = [search(grid, 100000)[0].stats for grid in positions]
+    uncached = [search(grid, 0)[0].stats for grid in positions]
+    assert sum(s.cache_hits for s in cached) > 0
+    assert sum(s.nodes_evaluated for s in cached) < sum(s.nodes_evaluated for s in uncached)
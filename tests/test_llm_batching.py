@@ -0,0 +1,117 @@
+"""
+Unit tests for multi-board prompts (agents/llm_batching.py and the batch
+helpers of agents/llm_base_agent.py), with a scripted model instead of an API.
+Run with: python -m pytest tests/test_llm_batching.py
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from agents.llm_base_agent import LLMBaseAgent, LLMBatchPrompt
+
+class ScriptedAgent(LLMBaseAgent):
+    """Answers batched prompts with `batch_reply` (after batch_delay_s) and single-board prompts with `single_reply`."""
+    model_name = "scripted-batch"
+    llm_params = {"max_tokens": 10, "temperature": 0}
+
+    def __init__(self, game, batch_reply="", single_reply="DOWN", batch_delay_s=0, **params):
+        super().__init__(game, **params)
+        self.batch_reply = batch_reply
+        self.single_reply = single_reply
+        self.batch_delay_s = batch_delay_s
+        self.prompts = []
+
+    def call_llm(self, prompt):
+        self.prompts.append(prompt)
+        return self.batch_reply if self.batch_size(prompt) else self.single_reply
+
+    async def call_llm_async(self, prompt):
+        if self.batch_size(prompt):
+            await asyncio.sleep(self.batch_delay_s)
+        return self.call_llm(prompt)
+
+GRIDS = [
+    [[2, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4],           # DOWN, RIGHT
+    [[0, 0, 0, 2], [0] * 4, [0] * 4, [0] * 4],           # DOWN, LEFT
+    [[0] * 4, [0] * 4, [0] * 4, [0, 0, 4, 0]],           # UP, LEFT, RIGHT
+]
+
+@pytest.fixture(autouse=True)
+def no_cache_or_deadline(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_FILE", raising=False)
+    monkeypatch.delenv("LLM_MOVE_DEADLINE_S", raising=False)
+
+def make_agent(grid, **params):
+    return ScriptedAgent(SimpleNamespace(grid=[row[:] for row in grid], score=0), **params)
+
+def test_parse_batch_response_skips_missing_and_invalid_lines():
+    valid = [["DOWN", "RIGHT"], ["DOWN", "LEFT"], ["UP", "LEFT", "RIGHT"], ["UP"]]
+    response = "Board 1: right\n3) UP\n2: UP\n1: DOWN\nnonsense"
+    # board 2's answer is not one of its moves, board 4 has none, board 1 keeps its first line
+    assert LLMBaseAgent.parse_batch_response(response, valid) == ["RIGHT", None, "UP", None]
+    assert LLMBaseAgent.parse_batch_response("", valid) == [None] * 4
+
+def test_batch_size_comes_from_the_prompt_object():
+    agent = make_agent(GRIDS[0])
+    prompt = agent.create_batch_prompt([(grid, agent.get_valid_moves()) for grid in GRIDS])
+    assert isinstance(prompt, LLMBatchPrompt) and agent.batch_size(prompt) == 3
+    # text that looks like a batch header doesn't make a prompt a batch
+    assert agent.batch_size(str(prompt)) == 0
+    assert agent.batch_size(agent.create_prompt()) == 0
+
+def test_request_params_and_system_message_follow_the_board_count():
+    agent = make_agent(GRIDS[0])
+    single = agent.create_prompt()
+    batch = agent.create_batch_prompt([(GRIDS[0], ["DOWN"])] * 4)
+    assert agent.request_params(single) == {"max_tokens": 10, "temperature": 0}
+    assert agent.request_params(batch) == {"max_tokens": 32, "temperature": 0}
+    assert "several games" in agent.system_message(batch)
+    assert "several games" not in agent.system_message(single)
+    assert agent.estimate_tokens(batch) == len(batch) // 4 + 32
+
+def play_together(agents):
+    async def main():
+        return await asyncio.gather(*(agent.get_move_async() for agent in agents))
+    return asyncio.run(main())
+
+def test_batch_answers_each_board_and_missing_boards_call_alone():
+    reply = "1: RIGHT\n2: UP"  # board 2 can't move UP, board 3 has no line
+    agents = [make_agent(grid, batch_reply=reply, single_reply=single, batch_window_s=0.05, max_batch=3)
+              for grid, single in zip(GRIDS, ["UP", "LEFT", "RIGHT"])]
+    assert play_together(agents) == ["RIGHT", "LEFT", "RIGHT"]
+
+    first, second, third = agents
+    assert [first.batch_size(prompt) for prompt in first.prompts] == [3]
+    assert [LLMBaseAgent.batch_size(prompt) for prompt in second.prompts + third.prompts] == [0, 0]
+    assert first.stats.extras["llm_batched_moves"] == 1
+    assert first.stats.extras["llm_calls"] == 1  # the batch call is counted once, in the first board's move
+    assert "llm_batched_moves" not in second.stats.extras
+    assert second.stats.extras["llm_calls"] == 1
+
+def test_single_position_is_not_batched():
+    agent = make_agent(GRIDS[0], batch_reply="1: RIGHT", single_reply="DOWN", batch_window_s=0.01)
+    assert play_together([agent]) == ["DOWN"]
+    assert agent.batch_size(agent.prompts[0]) == 0
+
+def test_board_formats_are_not_batched_together():
+    agents = [make_agent(grid, batch_reply="1: DOWN\n2: DOWN", single_reply=single, batch_window_s=0.05, board_format=board_format)
+              for grid, single, board_format in zip(GRIDS[:2], ["RIGHT", "LEFT"], ["tiles", "log2"])]
+    assert play_together(agents) == ["RIGHT", "LEFT"]
+    assert all(agent.batch_size(prompt) == 0 for agent in agents for prompt in agent.prompts)
+
+def test_slow_batch_falls_back_per_board_at_the_earliest_deadline():
+    # the first board's deadline ends the batch; the second still has time for a single call
+    reply = "1: RIGHT\n2: LEFT"
+    agents = [make_agent(grid, batch_reply=reply, single_reply=single, batch_delay_s=1.0, batch_window_s=0.01,
+                         move_deadline_s=deadline)
+              for grid, single, deadline in zip(GRIDS[:2], ["RIGHT", "DOWN"], [0.2, 5])]
+    start = time.perf_counter()
+    moves = play_together(agents)
+    assert time.perf_counter() - start < 0.9
+    first, second = agents
+    assert moves == [first.fallback.get_move(), "DOWN"]
+    assert first.stats.extras["llm_fallbacks"] == 1
+    assert "llm_fallbacks" not in second.stats.extras and second.stats.extras["llm_calls"] == 1
+    assert [LLMBaseAgent.batch_size(prompt) for prompt in second.prompts] == [0]
+    assert first.prompts == []  # the batch call was abandoned before it answered
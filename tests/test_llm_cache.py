@@ -0,0 +1,87 @@
+"""
+Unit tests for agents/llm_cache.py. Cache files go to a temporary directory.
+Run with: python -m pytest tests/test_llm_cache.py
+"""
+
+import pytest
+from agents import llm_cache
+from agents.llm_base_agent import LLMResponse
+from agents.llm_cache import LLMResponseCache
+
+GRID = [[2, 0, 0, 4],
+        [0, 8, 0, 0],
+        [16, 0, 2, 0],
+        [0, 0, 0, 32]]
+
+@pytest.fixture
+def clock(monkeypatch):
+    """The cache's time.time(), set by the test."""
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+def key(n):
+    return LLMResponseCache.make_key("model", {"temperature": 0}, GRID, f"prompt {n}")
+
+def test_keys_follow_model_params_board_and_prompt():
+    assert key(1) == LLMResponseCache.make_key("model", {"temperature": 0}, [row[:] for row in GRID], "prompt 1")
+    assert key(1) != key(2)
+    assert key(1) != LLMResponseCache.make_key("other", {"temperature": 0}, GRID, "prompt 1")
+    assert key(1) != LLMResponseCache.make_key("model", {"temperature": 1}, GRID, "prompt 1")
+    assert key(1) != LLMResponseCache.make_key("model", {"temperature": 0}, GRID[::-1], "prompt 1")
+
+def test_llm_response_round_trip(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get(key(1)) is None
+    cache.put(key(1), LLMResponse("LEFT", prompt_tokens=300, cached_tokens=256))
+    cached = cache.get(key(1))
+    assert cached == "LEFT"
+    assert getattr(cached, "usage", None) is None  # a cache hit bills no tokens
+    assert (cache.hits, cache.misses) == (1, 1) and cache.hit_ratio == 0.5
+
+    # another process opening the same file sees the entry
+    reopened = LLMResponseCache(str(tmp_path / "cache.sqlite"))
+    assert reopened.get(key(1)) == "LEFT" and reopened.stats()["entries"] == 1
+
+def test_put_again_replaces_without_adding_an_entry(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put(key(1), "LEFT")
+    cache.put(key(1), LLMResponse("UP"))
+    cache.put(key(2), "DOWN")
+    cache.put(key(2), "DOWN")
+    assert cache.stats()["entries"] == 2
+    assert cache.get(key(1)) == "UP"
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), ttl_s=5)
+    cache.put(key(1), "LEFT")
+    clock[0] += 3
+    cache.put(key(2), "UP")
+    assert cache.get(key(1)) == "LEFT"  # reading an entry doesn't extend its life
+    clock[0] += 3
+    assert cache.get(key(1)) is None
+    assert cache.get(key(2)) == "UP"
+    stats = cache.stats()
+    assert stats["expired"] == 1 and stats["entries"] == 1 and stats["misses"] == 1
+    cache.put(key(1), "LEFT")  # stored again, with a new lifetime
+    clock[0] += 3
+    assert cache.get(key(1)) == "LEFT" and cache.get(key(2)) is None
+
+def test_eviction_drops_the_least_recently_used_below_the_cap(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    for n in range(10):
+        clock[0] += 1
+        cache.put(key(n), "LEFT")
+    clock[0] += 1
+    assert cache.get(key(0)) == "LEFT"  # key 0 is now the most recently used
+    clock[0] += 1
+    cache.put(key(10), "UP")
+    stats = cache.stats()
+    # one over the cap, plus a tenth of it: the two least recently used go
+    assert stats["entries"] == 9 and stats["evicted"] == 2
+    assert cache.get(key(1)) is None and cache.get(key(2)) is None
+    assert all(cache.get(key(n)) is not None for n in [0] + list(range(3, 11)))
+    for n in range(11, 30):
+        clock[0] += 1
+        cache.put(key(n), "UP")
+        assert cache.stats()["entries"] <= 10
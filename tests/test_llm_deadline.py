@@ -0,0 +1,94 @@
+"""
+Unit tests for the move deadline and retries of agents/llm_base_agent.py, with
+a slow scripted model instead of an API.
+Run with: python -m pytest tests/test_llm_deadline.py
+"""
+
+import time
+from types import SimpleNamespace
+import pytest
+from agents.greedy_bfs_agent import GreedyBFSAgent
+from agents.llm_base_agent import LLMBaseAgent
+
+class SlowAgent(LLMBaseAgent):
+    """Each call sleeps, then returns or raises the next (seconds, reply) of `script`."""
+    model_name = "slow"
+    llm_params = {"max_tokens": 4}
+
+    def __init__(self, game, script, **params):
+        super().__init__(game, **params)
+        self.script = list(script)
+
+    def call_llm(self, prompt):
+        seconds, reply = self.script.pop(0)
+        time.sleep(seconds)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+class RateLimited(Exception):
+    """A 429 asking to retry after `retry_after` seconds."""
+    def __init__(self, retry_after):
+        super().__init__("HTTP 429")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": str(retry_after)})
+
+GRID = [[2, 0, 0, 4],
+        [0, 8, 0, 0],
+        [16, 0, 2, 0],
+        [0, 0, 0, 32]]
+
+@pytest.fixture(autouse=True)
+def no_cache_or_deadline(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_FILE", raising=False)
+    monkeypatch.delenv("LLM_MOVE_DEADLINE_S", raising=False)
+
+def make_agent(script, **params):
+    game = SimpleNamespace(grid=[row[:] for row in GRID], score=0)
+    return SlowAgent(game, script, **params)
+
+# the fallback's move, and another valid move for the model to name
+FALLBACK = GreedyBFSAgent(SimpleNamespace(grid=GRID, score=0)).get_move()
+MODEL = next(move for move in ("UP", "DOWN", "LEFT", "RIGHT") if move != FALLBACK)
+
+def wait_for(condition, timeout=5.0):
+    end = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < end, "timed out"
+        time.sleep(0.01)
+
+def test_model_answer_within_the_deadline_is_played():
+    agent = make_agent([(0, MODEL)], move_deadline_s=2)
+    assert agent.get_move() == MODEL
+    assert "llm_fallbacks" not in agent.stats.extras
+    assert agent.stats.extras["llm_calls"] == 1
+
+def test_late_answer_plays_the_fallback_and_its_counts_go_to_the_next_move():
+    agent = make_agent([(0.3, MODEL), (0, MODEL)], move_deadline_s=0.05)
+    assert agent.get_move() == FALLBACK
+    assert agent.stats.extras["llm_fallbacks"] == 1
+    assert "llm_calls" not in agent.stats.extras  # the call is still running
+
+    wait_for(lambda: agent._late_stats)
+    assert agent.get_move() == MODEL
+    extras = agent.stats.extras
+    assert extras["llm_calls"] == 2  # the late call and this move's own
+    assert extras["llm_latency_s"] >= 0.3
+    assert "llm_fallbacks" not in extras
+    assert agent._late_stats == {}
+
+def test_no_retry_is_scheduled_past_the_deadline():
+    agent = make_agent([(0, RateLimited(1)), (0, MODEL)], move_deadline_s=0.3)
+    assert agent.get_move() == FALLBACK
+    extras = agent.stats.extras
+    assert extras["llm_fallbacks"] == 1 and extras["llm_calls"] == 1
+    assert "llm_retries" not in extras
+    assert len(agent.script) == 1  # the second reply was never asked for
+
+def test_retries_before_the_deadline_are_counted_without_printing(capsys):
+    agent = make_agent([(0, RateLimited(0.05)), (0, MODEL)], move_deadline_s=2)
+    assert agent.get_move() == MODEL
+    extras = agent.stats.extras
+    assert extras["llm_calls"] == 2 and extras["llm_retries"] == 1
+    assert extras["llm_retry_wait_s"] == pytest.approx(0.05)
+    assert "llm_fallbacks" not in extras
+    assert capsys.readouterr().out == ""
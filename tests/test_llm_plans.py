@@ -0,0 +1,98 @@
+"""
+Unit tests for the move plans of agents/llm_base_agent.py (plan_length > 1),
+with a scripted model instead of an API.
+Run with: python -m pytest tests/test_llm_plans.py
+"""
+
+from types import SimpleNamespace
+import pytest
+from agents.llm_base_agent import LLMBaseAgent
+from simulation.game_utils import simulate_move_on_grid
+
+class ScriptedAgent(LLMBaseAgent):
+    """Answers every call with the next reply of `replies`."""
+    model_name = "scripted"
+    llm_params = {"max_tokens": 4}
+
+    def __init__(self, game, replies, **params):
+        super().__init__(game, **params)
+        self.replies = list(replies)
+        self.prompts = []
+
+    def call_llm(self, prompt):
+        self.prompts.append(prompt)
+        return self.replies.pop(0)
+
+START = [[0, 2, 0, 0],
+         [0, 0, 0, 0],
+         [0, 0, 4, 0],
+         [0, 0, 0, 0]]
+
+@pytest.fixture(autouse=True)
+def no_cache_or_deadline(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_FILE", raising=False)
+    monkeypatch.delenv("LLM_MOVE_DEADLINE_S", raising=False)
+
+def make_agent(replies, plan_length=3):
+    game = SimpleNamespace(grid=[row[:] for row in START], score=0)
+    return ScriptedAgent(game, replies, plan_length=plan_length)
+
+def play(agent, move, *spawns):
+    """Applies move to the agent's game, then places the spawned ((row, col), value) tiles (default: a 2 at (3, 3))."""
+    grid = simulate_move_on_grid(agent.game.grid, move)[0]
+    for (r, c), value in spawns or [((3, 3), 2)]:
+        grid[r][c] = value
+    agent.game.grid = grid
+
+def test_plan_is_played_without_further_calls():
+    agent = make_agent(["LEFT, UP, RIGHT"])
+    assert agent.get_move() == "LEFT"
+    play(agent, "LEFT")
+    assert agent.get_move() == "UP"
+    assert agent.stats.extras["llm_plan_moves"] == 1
+    play(agent, "UP", ((3, 3), 4))
+    assert agent.get_move() == "RIGHT"
+    assert len(agent.prompts) == 1
+
+def test_unexpected_board_drops_the_plan():
+    agent = make_agent(["LEFT, UP, RIGHT", "DOWN"])
+    assert agent.get_move() == "LEFT"
+    play(agent, "LEFT", ((3, 3), 2), ((3, 2), 2))  # two new tiles: not the planned afterstate
+    assert agent.get_move() == "DOWN"
+    assert len(agent.prompts) == 2
+    assert "llm_plan_moves" not in agent.stats.extras
+    assert agent._plan == []
+
+def test_invalid_planned_move_drops_the_plan():
+    agent = make_agent(["LEFT, LEFT, UP", "UP"])
+    assert agent.get_move() == "LEFT"
+    play(agent, "LEFT", ((1, 0), 2))  # the planned afterstate, but every tile is packed left
+    assert "LEFT" not in agent.get_valid_moves()
+    assert agent.get_move() == "UP"
+    assert len(agent.prompts) == 2
+
+def test_reset_drops_the_plan():
+    agent = make_agent(["LEFT, UP, RIGHT", "DOWN"])
+    agent.get_move()
+    agent.reset()
+    assert agent._plan == [] and agent._plan_grid is None
+
+def test_spawned_one_tile():
+    expected = [[2, 0, 0, 0], [0] * 4, [4, 0, 0, 0], [0] * 4]
+    spawned = [row[:] for row in expected]
+    spawned[3][3] = 4
+    assert LLMBaseAgent._spawned_one_tile(expected, spawned)
+    assert not LLMBaseAgent._spawned_one_tile(expected, expected)  # nothing spawned
+    assert not LLMBaseAgent._spawned_one_tile(None, spawned)
+    eight = [row[:] for row in expected]
+    eight[3][3] = 8
+    assert not LLMBaseAgent._spawned_one_tile(expected, eight)
+    overwritten = [row[:] for row in expected]
+    overwritten[0][0] = 4
+    assert not LLMBaseAgent._spawned_one_tile(expected, overwritten)
+
+def test_parse_plan():
+    assert LLMBaseAgent.parse_plan("left, up,RIGHT", ["LEFT", "UP"]) == ["LEFT", "UP", "RIGHT"]
+    # a plan that doesn't start with a valid move is just a single move, if any
+    assert LLMBaseAgent.parse_plan("DOWN, LEFT", ["LEFT", "UP"]) == ["LEFT"]
+    assert LLMBaseAgent.parse_plan("no idea", ["LEFT", "UP"]) == []
@@ -0,0 +1,86 @@
+"""
+Unit tests for the prompts and token accounting of agents/llm_base_agent.py,
+with a scripted model instead of an API.
+Run with: python -m pytest tests/test_llm_prompts.py
+"""
+
+from types import SimpleNamespace
+import pytest
+from agents.llm_base_agent import LLMBaseAgent, LLMResponse
+from agents.search_stats import SearchStats
+from simulation.simulation_worker import llm_results
+
+class UsageAgent(LLMBaseAgent):
+    """Answers UP, reporting the usage of `usage` for every call."""
+    model_name = "usage"
+    llm_params = {"max_tokens": 4}
+
+    def __init__(self, game, usage=None, **params):
+        super().__init__(game, **params)
+        self.usage = usage or {}
+        self.prompts = []
+
+    def call_llm(self, prompt):
+        self.prompts.append(prompt)
+        return LLMResponse("UP", **self.usage)
+
+GRIDS = [
+    [[0] * 4, [0] * 4, [0, 2, 0, 0], [0] * 4],
+    [[0] * 4, [0, 0, 0, 0], [4, 0, 0, 0], [2048, 0, 0, 2]],
+]
+
+@pytest.fixture(autouse=True)
+def no_cache_or_deadline(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_FILE", raising=False)
+    monkeypatch.delenv("LLM_MOVE_DEADLINE_S", raising=False)
+
+def make_agent(grid, **params):
+    return UsageAgent(SimpleNamespace(grid=[row[:] for row in grid], score=0), **params)
+
+def test_llm_response_is_a_string_with_usage():
+    response = LLMResponse("LEFT", prompt_tokens=120, cached_tokens=None, completion_tokens="2")
+    assert response == "LEFT" and response.strip() == "LEFT"
+    assert response.usage == {"prompt_tokens": 120, "cached_tokens": 0, "completion_tokens": 2}
+    assert LLMResponse(None) == ""
+
+def test_usage_is_added_to_the_move_stats():
+    agent = make_agent(GRIDS[0], usage={"prompt_tokens": 300, "cached_tokens": 256, "completion_tokens": 1})
+    totals = SearchStats()
+    for _ in range(2):
+        assert agent.get_move() == "UP"
+        extras = agent.stats.extras
+        assert (extras["llm_prompt_tokens"], extras["llm_cached_tokens"], extras["llm_completion_tokens"]) == (300, 256, 1)
+        assert extras["llm_latency_s"] >= 0
+        totals.add(agent.stats)
+    results = llm_results(totals, 1)
+    assert results["llm_prompt_tokens_per_game"] == 600
+    assert results["llm_cached_token_rate"] == pytest.approx(256 / 300)
+
+def test_plain_string_responses_count_no_tokens():
+    class PlainAgent(UsageAgent):
+        def call_llm(self, prompt):
+            return "UP"
+    agent = PlainAgent(SimpleNamespace(grid=[row[:] for row in GRIDS[0]], score=0))
+    agent.get_move()
+    assert agent.stats.extras["llm_calls"] == 1
+    assert "llm_prompt_tokens" not in agent.stats.extras
+
+@pytest.mark.parametrize("board_format", ["tiles", "log2"])
+def test_prompts_share_a_byte_identical_static_prefix(board_format):
+    agents = [make_agent(grid, board_format=board_format) for grid in GRIDS]
+    prompts = [agent.create_prompt() for agent in agents]
+    prefix = agents[0].prompt_prefix()
+    assert all(prompt.startswith(prefix) for prompt in prompts)
+    assert prompts[0] != prompts[1]
+    # everything after the prefix is the board and its moves
+    assert prompts[0][len(prefix):].startswith("\nCurrent board:\n")
+    assert agents[0].system_message(prompts[0]) == agents[1].system_message(prompts[1])
+    batch = agents[0].create_batch_prompt([(grid, ["UP"]) for grid in GRIDS])
+    assert batch.startswith(agents[1].prompt_prefix(batch=True))
+
+def test_log2_boards_write_exponents():
+    agent = make_agent(GRIDS[1], board_format="log2")
+    assert agent.get_grid_representation() == "0 0 0 0\n0 0 0 0\n2 0 0 0\n11 0 0 1\n"
+    assert make_agent(GRIDS[1]).get_grid_representation().splitlines()[3] == "2048 _ _ 2"
+    with pytest.raises(ValueError):
+        make_agent(GRIDS[1], board_format="hex")
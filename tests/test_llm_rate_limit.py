@@ -0,0 +1,80 @@
+"""
+Unit tests for agents/llm_rate_limit.py (no API calls).
+Run with: python -m pytest tests/test_llm_rate_limit.py
+"""
+
+import email.utils
+import time
+import pytest
+from agents.llm_rate_limit import TokenBucketLimiter, RetryPolicy, is_retryable, retry_after, status_code
+
+class FakeResponse:
+    def __init__(self, status_code=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class FakeHTTPError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.response = FakeResponse(status, headers)
+
+class APITimeoutError(Exception):
+    """Named like the openai SDK's timeout, which carries no status code."""
+
+def test_unlimited_limiter_never_waits():
+    limiter = TokenBucketLimiter()
+    assert not limiter.limited
+    assert all(limiter.reserve(10_000) == 0 for _ in range(100))
+
+def test_requests_per_minute_queue_callers():
+    limiter = TokenBucketLimiter(requests_per_minute=60)
+    waits = [limiter.reserve() for _ in range(62)]
+    assert waits[:60] == [0.0] * 60 # a full minute of budget up front
+    assert waits[60] == pytest.approx(1.0, abs=0.05)
+    assert waits[61] == pytest.approx(2.0, abs=0.05)
+
+def test_tokens_per_minute_wait_for_the_debt():
+    limiter = TokenBucketLimiter(tokens_per_minute=6000)
+    assert limiter.reserve(6000) == 0.0
+    assert limiter.reserve(300) == pytest.approx(3.0, abs=0.05)  # 100 tokens/s refill
+
+def test_bucket_refills_over_time():
+    limiter = TokenBucketLimiter(requests_per_minute=600)
+    for _ in range(600):
+        limiter.reserve()
+    time.sleep(0.2)  # ~2 requests refilled
+    assert limiter.reserve() == 0.0
+
+def test_status_codes_decide_retries():
+    assert status_code(FakeHTTPError(429)) == 429
+    for code in (408, 429, 500, 502, 503, 504):
+        assert is_retryable(FakeHTTPError(code))
+    for code in (400, 401, 403, 404):
+        assert not is_retryable(FakeHTTPError(code))
+
+def test_transient_errors_without_status_are_retried():
+    assert is_retryable(APITimeoutError())
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(ValueError("bad response"))
+
+def test_retry_after_seconds_milliseconds_and_date():
+    assert retry_after(FakeHTTPError(429, {"retry-after": "7"})) == 7.0
+    assert retry_after(FakeHTTPError(429, {"retry-after-ms": "250"})) == 0.25
+    when = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert retry_after(FakeHTTPError(503, {"retry-after": when})) == pytest.approx(30, abs=2)
+    assert retry_after(FakeHTTPError(429, {"retry-after": "soon"})) is None
+    assert retry_after(FakeHTTPError(429)) is None
+
+def test_retry_policy_honours_retry_after_capped():
+    policy = RetryPolicy(max_retries=3, base_delay_s=1, max_delay_s=10)
+    assert policy.delay(0, FakeHTTPError(429, {"retry-after": "4"})) == 4.0
+    assert policy.delay(0, FakeHTTPError(429, {"retry-after": "120"})) == 10.0
+
+def test_retry_policy_backoff_and_limits():
+    policy = RetryPolicy(max_retries=3, base_delay_s=1, max_delay_s=3)
+    error = FakeHTTPError(503)
+    for attempt in range(3):
+        delay = policy.delay(attempt, error)
+        assert 0 <= delay <= min(3, 2 ** attempt)
+    assert policy.delay(3, error) is None  # out of retries
+    assert policy.delay(0, FakeHTTPError(400)) is None  # not transient
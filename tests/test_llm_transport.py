@@ -0,0 +1,78 @@
+"""
+Unit tests for the shared LLM connections in agents/llm_transport.py, against
+a local HTTP server standing in for a provider.
+Run with: python -m pytest tests/test_llm_transport.py
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+from agents import llm_transport
+from agents.deepseekv3_agent import DeepSeekV3Agent
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """Answers every chat completion with UP, recording the client's port."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.client_ports.append(self.client_address[1])
+        body = json.dumps({"choices": [{"message": {"content": "UP"}}],
+                           "usage": {"prompt_tokens": 100, "prompt_cache_hit_tokens": 64, "completion_tokens": 1}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatHandler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(autouse=True)
+def fresh_transport(monkeypatch):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.delenv("LLM_CACHE_FILE", raising=False)
+    monkeypatch.delenv("LLM_MOVE_DEADLINE_S", raising=False)
+    config = llm_transport.transport_config()
+    monkeypatch.setattr(llm_transport, "_session", None)
+    yield
+    llm_transport.configure_llm_transport(**config)
+
+def make_agent(server):
+    grid = [[0] * 4, [0] * 4, [0] * 4, [2, 0, 0, 0]]
+    agent = DeepSeekV3Agent(SimpleNamespace(grid=grid, score=0))
+    agent.api_url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    return agent
+
+def test_agents_share_one_keep_alive_connection(server):
+    agents = [make_agent(server) for _ in range(2)]
+    for _ in range(3):
+        for agent in agents:
+            assert agent.get_move() == "UP"
+            assert agent.stats.extras["llm_cached_tokens"] == 64
+    assert len(server.client_ports) == 6
+    assert len(set(server.client_ports)) == 1  # one TCP connection for every call
+
+def test_session_is_shared_until_the_config_changes():
+    session = llm_transport.get_http_session()
+    assert llm_transport.get_http_session() is session
+    assert session.get_adapter("https://api.deepseek.com")._pool_maxsize == llm_transport.transport_config()["pool_size"]
+
+    llm_transport.configure_llm_transport(pool_size=llm_transport.transport_config()["pool_size"])  # unchanged
+    assert llm_transport.get_http_session() is session
+    config = llm_transport.configure_llm_transport(pool_size=7, read_timeout_s=12)
+    assert config["pool_size"] == 7 and llm_transport.http_timeout() == (config["connect_timeout_s"], 12.0)
+    rebuilt = llm_transport.get_http_session()
+    assert rebuilt is not session and rebuilt.get_adapter("http://localhost")._pool_maxsize == 7
@@ -0,0 +1,56 @@
+"""
+Unit tests for the lazy agent registry in agents/registry.py.
+Run with: python -m pytest tests/test_registry.py
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+import pytest
+from agents import registry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def imported_agent_modules(code):
+    """The agents.* modules imported after running `code` in a fresh interpreter."""
+    script = code + "\nimport sys\nprint(' '.join(sorted(m for m in sys.modules if m.startswith('agents.'))))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+def test_listing_agents_imports_no_agent_module():
+    assert imported_agent_modules("from agents.registry import list_agents; assert 'gemini' in list_agents()") == {"agents.registry"}
+
+def test_get_agent_imports_only_its_module():
+    modules = imported_agent_modules("from agents.registry import get_agent; assert get_agent('random')")
+    assert "agents.random_agent" in modules
+    assert not modules & {f"agents.{module}" for name, module in registry.AGENT_MANIFEST.items() if name != 'random'}
+
+@pytest.mark.parametrize("name", sorted(registry.AGENT_MANIFEST))
+def test_manifest_names_the_registering_module(name):
+    agent_class = registry.get_agent(name)
+    if agent_class is None:
+        pytest.skip(f"dependencies of {name} are not installed")
+    assert agent_class.__module__ == f"agents.{registry.AGENT_MANIFEST[name]}"
+
+def test_unimportable_agent_is_tried_once(monkeypatch):
+    monkeypatch.setitem(registry.AGENT_MANIFEST, 'ghost', 'no_such_agent_module')
+    monkeypatch.setattr(registry, '_unavailable', set())
+    calls = []
+    import_module = importlib.import_module
+    def counted(name, *args):
+        calls.append(name)
+        return import_module(name, *args)
+    monkeypatch.setattr(registry.importlib, 'import_module', counted)
+    assert registry.get_agent('ghost') is None
+    assert registry.get_agent('ghost') is None
+    assert calls == ['agents.no_such_agent_module']
+    assert 'ghost' in registry.list_agents()  # still listed, just unavailable
+
+def test_agents_registered_outside_the_manifest_are_listed(monkeypatch):
+    class Custom:
+        pass
+    monkeypatch.setitem(registry.AGENT_REGISTRY, 'custom', Custom)
+    assert registry.get_agent('custom') is Custom
+    assert registry.list_agents()[-1] == 'custom'
+    assert registry.get_agent('no_such_agent') is None
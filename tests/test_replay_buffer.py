@@ -0,0 +1,60 @@
+"""
+Unit tests for simulation/replay_buffer.py. Spill files go to a temporary directory.
+Run with: python -m pytest tests/test_replay_buffer.py
+"""
+
+import numpy as np
+import pytest
+from simulation import vector_board
+from simulation.replay_buffer import ReplayBuffer
+
+def transitions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    states = vector_board.new_boards(n, rng)
+    next_states = vector_board.add_random_tiles(states, rng)
+    return states, np.arange(n, dtype=np.float64), next_states
+
+def stored(buffer):
+    """The buffer's transitions as a set of (state key, reward, next state key)."""
+    return {(int(s), float(r), int(n)) for s, r, n in
+            zip(buffer.states[:buffer.size], buffer.rewards[:buffer.size], buffer.next_states[:buffer.size])}
+
+def keyed(states, rewards, next_states):
+    return set(zip(map(int, vector_board.pack(states)), map(float, rewards), map(int, vector_board.pack(next_states))))
+
+def test_ring_buffer_keeps_the_newest_transitions():
+    buffer = ReplayBuffer(5)
+    states, rewards, next_states = transitions(8)
+    buffer.add(states[:3], rewards[:3], next_states[:3])
+    buffer.add(states[3:], rewards[3:], next_states[3:])
+    assert len(buffer) == 5 and buffer.added == 8 and buffer.position == 3
+    assert stored(buffer) == keyed(states[3:], rewards[3:], next_states[3:])
+
+    states, rewards, next_states = transitions(12, seed=1)
+    buffer.add(states, rewards, next_states)  # more than the capacity at once: the last 5 are kept
+    assert stored(buffer) == keyed(states[-5:], rewards[-5:], next_states[-5:])
+    with pytest.raises(ValueError):
+        ReplayBuffer(0)
+
+def test_samples_are_stored_transitions():
+    buffer = ReplayBuffer(100)
+    states, rewards, next_states = transitions(40)
+    buffer.add(states, rewards, next_states)
+    sample = buffer.sample(256, np.random.default_rng(0))
+    assert [part.shape for part in sample] == [(256, 16), (256,), (256, 16)]
+    drawn = keyed(*sample)
+    assert drawn <= keyed(states, rewards, next_states) and len(drawn) > 30
+    with pytest.raises(ValueError):
+        ReplayBuffer(10).sample(1, np.random.default_rng(0))
+
+def test_memory_mapped_buffer_persists_to_files(tmp_path):
+    path = str(tmp_path / "replay")
+    buffer = ReplayBuffer(16, path)
+    states, rewards, next_states = transitions(10)
+    buffer.add(states, rewards, next_states)
+    buffer.flush()
+    assert isinstance(buffer.states, np.memmap)
+    on_disk = [np.load(f"{path}.{name}.npy") for name in ("states", "rewards", "next_states")]
+    assert np.array_equal(on_disk[0][:10], vector_board.pack(states))
+    assert np.array_equal(on_disk[1][:10], rewards.astype(np.float32))
+    assert np.array_equal(on_disk[2][:10], vector_board.pack(next_states))
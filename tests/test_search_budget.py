@@ -0,0 +1,73 @@
+"""
+Unit tests for agents/search_budget.py and how the search agents use it.
+Run with: python -m pytest tests/test_search_budget.py
+"""
+
+import time
+from types import SimpleNamespace
+import pytest
+from agents.search_budget import SearchBudget, BudgetExceeded
+from agents.search_stats import SearchStats
+from agents.a_star_agent import AStarAgent
+from agents.ida_star_agent import IDAStartAgent
+from agents.mcts_agent import MCTSAgent
+from agents.expectimax_agent import ExpectimaxAgent
+from agents.alpha_beta_expectimax_agent import AlphaBetaExpectimaxAgent
+
+GRID = [[2, 4, 8, 16],
+        [0, 2, 4, 32],
+        [2, 0, 64, 128],
+        [4, 8, 2, 256]]
+
+def game(grid=GRID):
+    return SimpleNamespace(grid=[row[:] for row in grid], score=0)
+
+def test_node_budget_raises_at_the_limit_and_keeps_raising():
+    budget = SearchBudget(max_nodes=100)
+    for _ in range(99):
+        budget.charge()
+    with pytest.raises(BudgetExceeded) as exc:
+        budget.charge()
+    assert exc.value.reason == "nodes" and budget.nodes == 100
+    with pytest.raises(BudgetExceeded):
+        budget.charge()  # nested searches unwind on their next charge
+    stats = SearchStats(decisions=1)
+    budget.record(stats)
+    assert stats.extras == {"budget_exhausted": 1, "budget_nodes": 1}
+    budget.start()
+    budget.charge(50)
+    assert budget.exhausted is None
+
+def test_time_budget_raises_after_the_deadline():
+    budget = SearchBudget(max_time_s=0.02, check_every=1)
+    budget.charge()
+    time.sleep(0.03)
+    with pytest.raises(BudgetExceeded) as exc:
+        budget.charge()
+    assert exc.value.reason == "time"
+
+def test_unlimited_budget_never_raises():
+    budget = SearchBudget()
+    assert not budget.limited
+    budget.charge(10 ** 9)
+
+@pytest.mark.parametrize("agent_class", [AStarAgent, IDAStartAgent, MCTSAgent, ExpectimaxAgent, AlphaBetaExpectimaxAgent])
+def test_search_agents_default_to_the_shared_time_limit(agent_class, monkeypatch):
+    monkeypatch.setenv("SEARCH_MAX_TIME_S", "2.5")
+    assert agent_class(game()).budget.max_time_s == 2.5
+    assert agent_class(game(), max_time_s=0).budget.max_time_s == 0
+    monkeypatch.delenv("SEARCH_MAX_TIME_S")
+    assert agent_class(game()).budget.max_time_s == 5
+
+def test_expectimax_plays_the_deepest_completed_depth():
+    # nodes needed to search depths 1 and 2 one after the other
+    probe = ExpectimaxAgent(game(), depth=2, max_nodes=10 ** 9)
+    probe.get_move()
+    completed = probe.budget.nodes
+
+    depth_two = ExpectimaxAgent(game(), depth=2, max_time_s=0).get_move()
+    assert ExpectimaxAgent(game(), depth=1, max_time_s=0).get_move() != depth_two
+    agent = ExpectimaxAgent(game(), depth=3, max_nodes=completed + 1, max_time_s=0)
+    assert agent.get_move() == depth_two
+    assert agent.stats.extras["budget_nodes"] == 1
+    assert agent.stats.max_depth == 3  # depth 3 was started, then cut off
@@ -0,0 +1,60 @@
+"""
+Unit tests for agents/search_stats.py and the search stats of a simulation run.
+Run with: python -m pytest tests/test_search_stats.py
+"""
+
+from types import SimpleNamespace
+import pytest
+from agents.expectimax_agent import ExpectimaxAgent
+from agents.search_stats import SearchStats
+from simulation import simulation_worker
+
+GRID = [[2, 0, 0, 4],
+        [0, 8, 0, 0],
+        [16, 0, 2, 0],
+        [0, 0, 0, 32]]
+
+def decision(expanded, evaluated, children, hits=0, depth=1, **extras):
+    stats = SearchStats(decisions=1)
+    stats.nodes_expanded, stats.nodes_evaluated, stats.children_generated = expanded, evaluated, children
+    stats.cache_hits, stats.max_depth = hits, depth
+    stats.extras.update(extras)
+    return stats
+
+def test_add_and_summary():
+    totals = SearchStats()
+    totals.add(decision(2, 8, 8, hits=2, depth=3, iterations=2))
+    totals.add(decision(4, 12, 12, hits=8, depth=2, iterations=1))
+    summary = totals.summary()
+    assert summary["decisions"] == 2
+    assert summary["mean_nodes_expanded"] == 3 and summary["mean_nodes_evaluated"] == 10
+    assert summary["mean_branching_factor"] == pytest.approx(20 / 6)
+    assert summary["cache_hit_rate"] == pytest.approx(10 / 30)
+    assert summary["max_search_depth"] == 3
+    assert summary["total_iterations"] == 3
+    assert SearchStats().summary()["mean_branching_factor"] == 0.0
+
+def test_as_dict_and_reset():
+    stats = decision(1, 4, 4, depth=1, llm_calls=1)
+    data = stats.as_dict()
+    assert data["branching_factor"] == 4 and data["llm_calls"] == 1 and "extras" not in data
+    assert stats.reset() is stats
+    assert stats.nodes_expanded == 0 and stats.extras == {} and stats.decisions == 1
+
+def test_agents_count_each_move_afresh():
+    agent = ExpectimaxAgent(SimpleNamespace(grid=[row[:] for row in GRID], score=0), depth=1, max_time_s=0)
+    agent.get_move()
+    first = agent.stats.as_dict()
+    assert first["nodes_expanded"] > 0 and first["children_generated"] >= first["nodes_expanded"]
+    agent.get_move()
+    assert agent.stats.as_dict() == first  # same board, same search: counters were reset, not summed
+
+def test_simulation_reports_search_stats(monkeypatch):
+    monkeypatch.setitem(simulation_worker.simulation_status, "terminated", False)
+    simulation_worker.run_simulation_worker('greedy_bfs', 1, None, None)
+    results = simulation_worker.simulation_status["results"]
+    assert results["search_stats"]["decisions"] == results["mean_moves_to_game_over"]
+    assert results["search_stats"]["mean_nodes_expanded"] > 0
+
+    simulation_worker.run_simulation_worker('greedy_bfs', 1, None, None, collect_search_stats=False)
+    assert "search_stats" not in simulation_worker.simulation_status["results"]
@@ -0,0 +1,43 @@
+"""
+Unit tests for the eligibility traces of agents/td_lambda.py, against a dense
+TD(lambda) written out step by step.
+Run with: python -m pytest tests/test_td_lambda.py
+"""
+
+import numpy as np
+import pytest
+from agents.td_lambda import AfterstateTDLambda
+from agents.td_value_functions import LinearValueFunction
+
+def test_trace_length_follows_the_cutoff():
+    assert AfterstateTDLambda(None, 0.1, 1.0, 0.5, trace_cutoff=0.01).trace_length == 7  # 0.5^7 < 0.01
+    assert AfterstateTDLambda(None, 0.1, 1.0, 0.0).trace_length == 1  # TD(0)
+    assert AfterstateTDLambda(None, 0.1, 1.0, 1.0, max_trace=12).trace_length == 12
+
+def test_step_matches_dense_td_lambda():
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((10, 20))
+    targets = rng.standard_normal(10)
+    alpha, gamma, lam = 0.05, 0.9, 0.6
+    learner = AfterstateTDLambda(LinearValueFunction(), alpha, gamma, lam, trace_cutoff=1e-9, max_trace=32)
+
+    weights = np.zeros(20)
+    trace = np.zeros(20)
+    for f, target in zip(features, targets):
+        td_err = target - weights @ f
+        trace = gamma * lam * trace + f  # accumulating trace
+        weights = weights + alpha * td_err * trace
+        assert learner.step([0], f[None], [target])[0] == pytest.approx(td_err)
+    assert np.allclose(learner.value_fn.weights, weights)
+
+def test_reset_starts_a_new_trace_per_slot():
+    rng = np.random.default_rng(1)
+    features = rng.standard_normal((2, 20))
+    learner = AfterstateTDLambda(LinearValueFunction(), 0.1, 1.0, 0.5, slots=2)
+    learner.step([0, 1], features, [1.0, 1.0])
+    learner.reset([0])
+    before = learner.value_fn.weights.copy()
+    td_err = learner.step([0], features[1:], [2.0])[0]
+    # only the new afterstate of slot 0 is updated; slot 1's trace is left alone
+    assert np.allclose(learner.value_fn.weights - before, 0.1 * td_err * features[1])
+    assert list(learner._count) == [1, 1]
@@ -0,0 +1,73 @@
+"""
+Unit tests for agents/td_learning_agent.py: the batched afterstate get_move must
+pick the move and reward of the one-board-at-a-time rules.
+Run with: python -m pytest tests/test_td_learning_agent.py
+"""
+
+import random
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from agents.td_learning_agent import TDLearningAgent
+from simulation.game_utils import simulate_move_on_grid
+
+def random_grids(count, seed=0, max_exp=10):
+    rng = random.Random(seed)
+    grids = []
+    while len(grids) < count:
+        grid = [[(1 << rng.randint(1, max_exp)) if rng.random() < 0.6 else 0 for _ in range(4)] for _ in range(4)]
+        if any(simulate_move_on_grid(grid, move)[2] for move in ("UP", "DOWN", "LEFT", "RIGHT")):
+            grids.append(grid)
+    return grids
+
+def make_agent(tmp_path, value_function, seed=0):
+    game = SimpleNamespace(grid=None, score=0)
+    agent = TDLearningAgent(game, value_function=value_function, ntuple_preset='5x4', epsilon=0.0,
+                            weights_file=str(tmp_path / f'{value_function}.weights'))
+    rng = np.random.default_rng(seed)
+    # linear features reach ~1e8: keep their values in a comparable range
+    scale = 1e-6 if value_function == 'linear' else 1.0
+    agent.weights = (rng.standard_normal(agent.weights.shape) * scale).astype(agent.weights.dtype)
+    return agent
+
+def reference_move(agent, grid):
+    """(move, reward) by scoring each afterstate on its own."""
+    best = None
+    for move in ("UP", "DOWN", "LEFT", "RIGHT"):
+        after, gained, changed = simulate_move_on_grid(grid, move)
+        if not changed:
+            continue
+        value = agent.value_fn.value(agent.value_fn.features(after))
+        if agent.value_fn.greedy_adds_reward:
+            value += gained
+        if best is None or value > best[0]:
+            best = (value, move, agent.value_fn.reward(after, gained), after)
+    return best[1:]
+
+@pytest.mark.parametrize("value_function", ["linear", "ntuple"])
+def test_batched_get_move_matches_one_afterstate_at_a_time(tmp_path, value_function):
+    agent = make_agent(tmp_path, value_function)
+    for grid in random_grids(200):
+        agent.game.grid = grid
+        move = agent.get_move()
+        expected_move, expected_reward, after = reference_move(agent, grid)
+        assert move == expected_move
+        assert agent.last_reward == pytest.approx(expected_reward)
+        assert np.allclose(agent.last_afterstate_features, agent.value_fn.features(after))
+        valid = sum(simulate_move_on_grid(grid, m)[2] for m in ("UP", "DOWN", "LEFT", "RIGHT"))
+        assert agent.stats.children_generated == agent.stats.nodes_evaluated == valid
+
+def test_exploration_only_picks_valid_moves(tmp_path):
+    agent = make_agent(tmp_path, 'ntuple')
+    agent.epsilon = 1.0
+    for grid in random_grids(100, seed=1):
+        agent.game.grid = grid
+        assert simulate_move_on_grid(grid, agent.get_move(training=True))[2]
+
+def test_nan_estimates_are_skipped(tmp_path):
+    agent = make_agent(tmp_path, 'ntuple')
+    grid = random_grids(1, seed=2)[0]
+    agent.game.grid = grid
+    move = agent.get_move()
+    agent.weights[agent.value_fn.features(simulate_move_on_grid(grid, move)[0])] = np.nan
+    assert agent.get_move() != move
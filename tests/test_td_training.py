@@ -0,0 +1,102 @@
+"""
+Unit tests for simulation/training_td_worker.py: the batched and per-episode
+training paths must learn the same way. Weight files go to a temporary directory.
+Run with: python -m pytest tests/test_td_training.py
+"""
+
+import os
+import shutil
+import numpy as np
+from simulation import training_td_worker, vector_board
+from simulation.game import Game
+from agents.td_learning_agent import TDLearningAgent
+from agents.weight_store import checkpoint_path, save_weights
+
+def make_agent(tmp_path, game=None, **params):
+    params = dict({'value_function': 'ntuple', 'ntuple_preset': '5x4', 'epsilon': 0.0, 'learning_rate': 0.01,
+                   'weights_file': str(tmp_path / 'td.weights')}, **params)
+    return TDLearningAgent(game or Game(), **params)
+
+def one_episode():
+    claimed = [False]
+    def claim_episode():
+        if claimed[0]:
+            return False
+        claimed[0] = True
+        return True
+    return claim_episode
+
+def test_batch_of_one_matches_play_episode(tmp_path, monkeypatch):
+    # a greedy batch-of-one episode, recording every tile it spawns
+    boards = []
+    add_random_tiles = vector_board.add_random_tiles
+    def recorded(boards_in, rng):
+        result = add_random_tiles(boards_in, rng)
+        if len(result):
+            boards.append(result[0].copy())
+        return result
+    monkeypatch.setattr(vector_board, 'add_random_tiles', recorded)
+    batched = make_agent(tmp_path)
+    scores = []
+    training_td_worker._play_batched(batched, 1, one_episode(), lambda score, updates: scores.append(score),
+                                     training=True, rng=np.random.default_rng(0))
+    monkeypatch.undo()
+
+    # _play_episode on the same tile spawns; new_boards placed the two opening tiles
+    boards = boards[1:]
+    game = Game()
+    single = make_agent(tmp_path, game)
+    spawns = iter(boards[1:])
+    def reset_grid():
+        game.grid = vector_board.to_grid(boards[0])
+        game.score = 0
+    def add_random_tile():
+        spawned = vector_board.to_grid(next(spawns))
+        assert sum(a != b for row, new in zip(game.grid, spawned) for a, b in zip(row, new)) == 1
+        game.grid = spawned
+    game.reset_grid, game.add_random_tile = reset_grid, add_random_tile
+    score, updates = training_td_worker._play_episode(game, single)
+
+    assert next(spawns, None) is None
+    assert [score] == scores and updates == len(boards) - 1
+    assert np.abs(batched.weights).max() > 0
+    assert np.allclose(batched.weights, single.weights, atol=1e-4)
+
+def test_two_hogwild_workers_train_and_checkpoint(tmp_path):
+    weights_file = str(tmp_path / 'td.weights')
+    agent_params = {'value_function': 'ntuple', 'ntuple_preset': '5x4', 'weights_file': weights_file}
+    training_td_worker.train_td_worker(6, save_interval=3, agent_params=agent_params, num_workers=2)
+    status = training_td_worker.training_status
+    assert status["error"] is None and not status["running"]
+    assert status["progress"] == 6 and status["num_workers"] == 2 and status["updates"] > 0
+    assert status["checkpoints"] == 2
+    trained = TDLearningAgent(Game(), **agent_params)
+    assert np.abs(trained.weights).max() > 0
+
+def test_checkpoint_evaluator_scores_a_saved_checkpoint(tmp_path):
+    agent = make_agent(tmp_path)
+    started = [0]
+    def four_episodes():
+        started[0] += 1
+        return started[0] <= 4
+    training_td_worker._play_batched(agent, 4, four_episodes, lambda score, updates: None, training=True,
+                                     rng=np.random.default_rng(1))
+    checkpoint = checkpoint_path(agent.weights_file, 4)
+    save_weights(checkpoint, agent.weights, **agent.weights_meta())
+    params = {'value_function': 'ntuple', 'ntuple_preset': '5x4', 'weights_file': agent.weights_file}
+
+    results = []
+    evaluator = training_td_worker.CheckpointEvaluator(params, num_games=3, seed=7, on_result=results.append)
+    evaluator.submit(checkpoint, 4)
+    evaluator.close()
+
+    # the same fixed-seed games played in this process
+    copy = str(tmp_path / 'copy.weights')
+    shutil.copyfile(checkpoint, copy)
+    expected = training_td_worker._evaluate_checkpoint(copy, params, 3, 7)
+    [result] = results
+    assert "error" not in result and evaluator.pending == 0
+    assert result["episodes"] == 4 and result["checkpoint"] == checkpoint and result["games"] == 3
+    assert result["mean_score"] == expected["mean_score"] > 0
+    # the evaluator's private link is removed, the checkpoint is kept
+    assert os.listdir(tmp_path) == [os.path.basename(checkpoint)]
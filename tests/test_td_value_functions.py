@@ -0,0 +1,51 @@
+"""
+Unit tests for agents/td_value_functions.py: the batched TD updates must
+follow the same per-transition rule as update().
+Run with: python -m pytest tests/test_td_value_functions.py
+"""
+
+from types import SimpleNamespace
+import numpy as np
+from simulation import vector_board
+from simulation.training_td_worker import _td0_update
+from agents.td_value_functions import LinearValueFunction
+
+def distinct_boards(count, seed=0):
+    rng = np.random.default_rng(seed)
+    boards = vector_board.new_boards(count, rng)
+    for _ in range(20):
+        after, _, changed = vector_board.afterstates(boards)
+        moves = np.where(changed, rng.random(changed.shape), -1.0).argmax(axis=1)
+        boards = vector_board.add_random_tiles(after[np.arange(count), moves], rng)
+    assert len({tuple(b) for b in boards}) == count
+    return boards
+
+def test_linear_batch_update_sums_the_rows():
+    features = vector_board.linear_features(distinct_boards(8))
+    steps = np.linspace(-1e-6, 1e-6, 8)
+    batched, sequential = LinearValueFunction(), LinearValueFunction()
+    batched.batch_update(features, steps)
+    for row, step in zip(features, steps):
+        sequential.update(row, step)
+    assert np.allclose(batched.weights, sequential.weights)
+
+def test_linear_batched_td0_matches_sequential_updates():
+    # k distinct transitions: one batched TD(0) step against k update() calls,
+    # each with its TD error recomputed from the weights left by the previous one
+    k = 16
+    states, next_states = distinct_boards(k, seed=1), distinct_boards(k, seed=2)
+    rewards = np.arange(k, dtype=np.float64)
+    value_fn = LinearValueFunction()
+    # a step small against the features' scale: sequential errors barely move in between
+    norms = (vector_board.linear_features(states) ** 2).sum(axis=1)
+    agent = SimpleNamespace(value_fn=value_fn, learning_rate=1e-4 / norms.max(), discount_factor=0.9)
+    _td0_update(agent, states, rewards, next_states)
+
+    sequential = LinearValueFunction()
+    for s, r, s_next in zip(states, rewards, next_states):
+        f_s, f_next = vector_board.linear_features(np.array([s, s_next]))
+        td_err = r + agent.discount_factor * sequential.value(f_next) - sequential.value(f_s)
+        sequential.update(f_s, agent.learning_rate * td_err)
+
+    assert np.linalg.norm(value_fn.weights) > 0
+    assert np.linalg.norm(value_fn.weights - sequential.weights) <= 1e-3 * np.linalg.norm(sequential.weights)
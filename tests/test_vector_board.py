@@ -0,0 +1,74 @@
+"""
+Unit tests for simulation/vector_board.py: the batched board operations must
+match the list-of-lists rules in simulation/game_utils.py.
+Run with: python -m pytest tests/test_vector_board.py
+"""
+
+import random
+import numpy as np
+from simulation import vector_board
+from simulation.game_utils import simulate_move_on_grid, calculate_heuristic, encode_grid
+from agents.td_value_functions import LinearValueFunction, NTupleNetwork
+
+def random_grids(count, seed=0, max_exp=11):
+    rng = random.Random(seed)
+    return [[[(1 << rng.randint(1, max_exp)) if rng.random() < 0.6 else 0 for _ in range(4)] for _ in range(4)]
+            for _ in range(count)]
+
+def test_afterstates_match_simulate_move_on_grid():
+    grids = random_grids(3000)
+    after, gained, changed = vector_board.afterstates(vector_board.from_grids(grids))
+    for i, grid in enumerate(grids):
+        for m, move in enumerate(vector_board.MOVES):
+            new_grid, score, moved = simulate_move_on_grid(grid, move)
+            assert vector_board.to_grid(after[i, m]) == new_grid
+            assert gained[i, m] == score
+            assert changed[i, m] == moved
+
+def test_pack_matches_encode_grid():
+    grids = random_grids(500, seed=1, max_exp=15)
+    boards = vector_board.from_grids(grids)
+    keys = vector_board.pack(boards)
+    assert [int(k) for k in keys] == [encode_grid(g) for g in grids]
+    assert (vector_board.unpack(keys) == boards).all()
+
+def test_heuristics_match_calculate_heuristic():
+    grids = random_grids(500, seed=2)
+    values = vector_board.heuristics(vector_board.from_grids(grids))
+    expected = [calculate_heuristic(g) for g in grids]
+    assert np.allclose(values, expected)
+
+def test_linear_features_match_value_function():
+    grids = random_grids(200, seed=3)
+    value_fn = LinearValueFunction()
+    features = vector_board.linear_features(vector_board.from_grids(grids))
+    for row, grid in zip(features, grids):
+        assert np.allclose(row, value_fn.features(grid))
+
+def test_add_random_tiles_fills_one_empty_cell():
+    rng = np.random.default_rng(0)
+    boards = vector_board.from_grids(random_grids(200, seed=4))
+    before = boards.copy()
+    vector_board.add_random_tiles(boards, rng)
+    for old, new in zip(before, boards):
+        diff = np.flatnonzero(old != new)
+        if (old == 0).any():
+            assert len(diff) == 1 and old[diff[0]] == 0 and new[diff[0]] in (1, 2)
+        else:
+            assert len(diff) == 0
+
+def test_batch_update_of_one_row_matches_update():
+    grid = random_grids(1, seed=5)[0]
+    boards = vector_board.from_grids([grid])
+    for value_fn, batched in ((LinearValueFunction(), LinearValueFunction()), (NTupleNetwork('5x4'), NTupleNetwork('5x4'))):
+        value_fn.update(value_fn.features(grid), 0.5)
+        batched.batch_update(batched.batch_features(boards), np.array([0.5]))
+        assert np.allclose(value_fn.weights, batched.weights)
+
+def test_batch_update_sums_shared_entries():
+    grid = random_grids(1, seed=6)[0]
+    boards = vector_board.from_grids([grid, grid])
+    for value_fn, single in ((LinearValueFunction(), LinearValueFunction()), (NTupleNetwork('5x4'), NTupleNetwork('5x4'))):
+        value_fn.batch_update(value_fn.batch_features(boards), np.array([0.2, 0.6]))
+        single.update(single.features(grid), 0.8)  # two identical boards move by the sum of their steps
+        assert np.allclose(value_fn.weights, single.weights)
@@ -0,0 +1,90 @@
+"""
+Unit tests for agents/weight_store.py. Weight files go to a temporary directory.
+Run with: python -m pytest tests/test_weight_store.py
+"""
+
+import numpy as np
+import pytest
+from agents import weight_store
+from agents.td_learning_agent import TDLearningAgent
+from simulation.game import Game
+
+def table(seed=0, size=1000):
+    return np.random.default_rng(seed).standard_normal(size).astype(np.float32)
+
+def test_memmap_round_trip(tmp_path):
+    path = str(tmp_path / "td.weights")
+    assert weight_store.save_weights(path, table(), kind="ntuple") == 1
+    weights, header = weight_store.load_weights(path)
+    assert isinstance(weights, np.memmap) and not weights.flags.writeable
+    assert np.array_equal(weights, table())
+    assert header["kind"] == "ntuple" and header["shape"] == [1000] and header["version"] == 1
+    assert weight_store.read_header(path)[1] % weight_store.ALIGNMENT == 0
+
+    # the mapping is shared until the file is replaced
+    assert weight_store.load_weights(path)[0] is weights
+    private, _ = weight_store.load_weights(path, mmap=False)
+    assert private.flags.writeable and np.array_equal(private, weights)
+
+def test_replacing_a_file_leaves_old_mappings_intact(tmp_path):
+    path = str(tmp_path / "td.weights")
+    weight_store.save_weights(path, table(0))
+    old, _ = weight_store.load_weights(path)
+    assert weight_store.save_weights(path, table(1)) == 2
+    new, header = weight_store.load_weights(path)
+    assert new is not old and header["version"] == 2
+    assert np.array_equal(old, table(0)) and np.array_equal(new, table(1))
+    assert not weight_store.is_weight_file(str(tmp_path / "missing.weights"))
+    (tmp_path / "plain.weights").write_bytes(b"not a weight file")
+    with pytest.raises(ValueError):
+        weight_store.read_header(str(tmp_path / "plain.weights"))
+
+def test_agents_share_the_mapping_until_they_train(tmp_path):
+    path = str(tmp_path / "td.weights")
+    params = {"value_function": "ntuple", "ntuple_preset": "5x4", "weights_file": path}
+    trained = TDLearningAgent(Game(), **params)
+    trained.weights = table(size=trained.weights.size).reshape(trained.weights.shape)
+    trained.save_weights()
+
+    first, second = TDLearningAgent(Game(), **params), TDLearningAgent(Game(), **params)
+    assert first.weights is second.weights and not first.weights.flags.writeable
+
+    game = first.game
+    first.last_state_features = first._extract_features(game.grid)
+    first.last_reward = 4.0
+    first.update_weights(first._extract_features(game.grid))
+    assert first.weights.flags.writeable and first.weights is not second.weights
+    assert not np.array_equal(first.weights, second.weights)
+    assert np.array_equal(weight_store.load_weights(path)[0], second.weights)  # the file is untouched
+
+def test_checkpointer_keeps_the_newest_checkpoints(tmp_path):
+    path = str(tmp_path / "td.weights")
+    written = []
+    checkpointer = weight_store.AsyncCheckpointer(path, keep=2, meta={"kind": "ntuple"},
+                                                  on_written=lambda target, number: written.append(number))
+    for number in range(1, 6):
+        checkpointer.submit(table(number), number * 10)
+        checkpointer.wait()
+    checkpointer.close()
+
+    assert written == [10, 20, 30, 40, 50] and checkpointer.written == 5
+    assert weight_store.list_checkpoints(path) == [(40, weight_store.checkpoint_path(path, 40)),
+                                                   (50, weight_store.checkpoint_path(path, 50))]
+    assert checkpointer.last_checkpoint == weight_store.checkpoint_path(path, 50)
+    # the main file is the newest checkpoint
+    weights, header = weight_store.load_weights(path)
+    assert np.array_equal(weights, table(5)) and header["version"] == 50 and header["kind"] == "ntuple"
+    assert np.array_equal(weight_store.load_weights(weight_store.checkpoint_path(path, 40))[0], table(4))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["td.ckpt-000040.weights", "td.ckpt-000050.weights", "td.weights"]
+
+def test_checkpointer_snapshots_at_submit(tmp_path):
+    path = str(tmp_path / "td.json")
+    weights = np.arange(4, dtype=np.float64)
+    checkpointer = weight_store.AsyncCheckpointer(path, keep=1)
+    checkpointer.submit(weights, 1)
+    weights += 100  # training carries on while the snapshot is written
+    checkpointer.close()
+    with open(path) as f:
+        assert f.read() == "[0.0, 1.0, 2.0, 3.0]"
+    with pytest.raises(RuntimeError):
+        checkpointer.submit(weights, 2)